@@ -33,8 +33,7 @@ command line. The processing of a command works as follows:
 13. Return deferred that will fire with the return from `cmdobj.func()` (unused by default).
 """
 
-from collections import defaultdict
-from weakref import WeakValueDictionary
+from collections import defaultdict, OrderedDict
 from traceback import format_exc
 from copy import copy
 from twisted.internet.defer import inlineCallbacks, returnValue
@@ -49,7 +48,139 @@ _IN_GAME_ERRORS = settings.IN_GAME_ERRORS
 
 __all__ = ("cmdhandler",)
 _GA = object.__getattribute__
-_CMDSET_MERGE_CACHE = WeakValueDictionary()
+
+
+class CmdSetMergeCache(object):
+    """
+    A size-limited least-recently-used cache of merged cmdsets.
+
+    The cache is keyed on the unique id and change-counter of every
+    cmdset taking part in a merger, so a cmdset being changed or
+    garbage-collected can never lead to a stale merger being returned.
+    Mergers involving a given cmdset can also be explicitly invalidated
+    (this is done by the `CmdSetHandler` whenever its current cmdset
+    is rebuilt).
+
+    """
+    def __init__(self, maxsize=1000):
+        """
+        Initialize the cache.
+
+        Args:
+            maxsize (int, optional): Max number of mergers to cache.
+
+        """
+        self.maxsize = maxsize
+        self.cache = OrderedDict()
+        # maps cmdset uid -> merge keys the cmdset is part of
+        self.uid_index = defaultdict(set)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.cache)
+
+    def get_key(self, cmdsets):
+        """
+        Get the cache key for merging the given cmdsets.
+
+        Args:
+            cmdsets (list): The cmdsets to merge, in merge order.
+
+        Returns:
+            key (tuple): The key to use for this merger.
+
+        """
+        return tuple([(cmdset._uid, cmdset._version) for cmdset in cmdsets])
+
+    def get(self, key):
+        """
+        Get a cached merger, marking it as recently used.
+
+        Args:
+            key (tuple): The merge key, from `get_key`.
+
+        Returns:
+            cmdset (CmdSet or None): The cached merged cmdset or `None`
+                if no merger was cached.
+
+        """
+        try:
+            cmdset = self.cache.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self.cache[key] = cmdset
+        self.hits += 1
+        return cmdset
+
+    def add(self, key, cmdset):
+        """
+        Store a merger, evicting the least recently used one if needed.
+
+        Args:
+            key (tuple): The merge key, from `get_key`.
+            cmdset (CmdSet): The merged cmdset.
+
+        """
+        if key in self.cache:
+            del self.cache[key]
+        elif self.maxsize > 0:
+            while len(self.cache) >= self.maxsize:
+                self._forget(self.cache.popitem(last=False)[0])
+                self.evictions += 1
+        else:
+            return
+        self.cache[key] = cmdset
+        for uid, _ in key:
+            self.uid_index[uid].add(key)
+
+    def _forget(self, key):
+        "Remove a key from the uid index"
+        for uid, _ in key:
+            keys = self.uid_index.get(uid)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self.uid_index[uid]
+
+    def invalidate(self, cmdset):
+        """
+        Remove all cached mergers the given cmdset is part of.
+
+        Args:
+            cmdset (CmdSet): The cmdset that was changed or retired.
+
+        """
+        for key in self.uid_index.pop(cmdset._uid, ()):
+            if self.cache.pop(key, None) is not None:
+                self.invalidations += 1
+                self._forget(key)
+
+    def clear(self):
+        """
+        Empty the cache. The statistics are not reset.
+
+        """
+        self.cache.clear()
+        self.uid_index.clear()
+
+    def stats(self):
+        """
+        Get cache statistics.
+
+        Returns:
+            stats (dict): Contains `size`, `maxsize`, `hits`, `misses`,
+                `evictions` and `invalidations`.
+
+        """
+        return {"size": len(self.cache), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "invalidations": self.invalidations}
+
+_CMDSET_MERGE_CACHE = CmdSetMergeCache(settings.CMDSET_MERGE_CACHE_SIZE)
 
 # tracks recursive calls by each caller
 # to avoid infinite loops (commands calling themselves)
@@ -227,10 +358,13 @@ def get_and_merge_cmdsets(caller, session, player, obj, callertype):
                     location = None
                 if location and not obj_cmdset.no_objs:
                     # Gather all cmdsets stored on objects in the room and
-                    # also in the caller's inventory and the location itself
-                    local_objlist = yield (location.contents_get(exclude=obj) +
-                                           obj.contents_get() + [location])
-                    local_objlist = [o for o in local_objlist if not o._is_deleted]
+                    # also in the caller's inventory and the location itself.
+                    # The contents caches only give us the objects actually
+                    # providing cmdsets.
+                    location_objlist = [] if location._is_deleted else [location]
+                    local_objlist = yield (location.contents_cache.get_cmdset_providers(exclude=obj) +
+                                           obj.contents_cache.get_cmdset_providers() +
+                                           location_objlist)
                     for lobj in local_objlist:
                         try:
                             # call hook in case we need to do dynamic changing to cmdset
@@ -239,11 +373,17 @@ def get_and_merge_cmdsets(caller, session, player, obj, callertype):
                             logger.log_trace()
                     # the call-type lock is checked here, it makes sure a player
                     # is not seeing e.g. the commands on a fellow player (which is why
-                    # the no_superuser_bypass must be True)
+                    # the no_superuser_bypass must be True). The results of this
+                    # are cached by the contents caches.
+                    local_objlist = yield (
+                        location.contents_cache.get_cmdset_providers(exclude=obj, caller=caller) +
+                        obj.contents_cache.get_cmdset_providers(caller=caller))
+                    local_objlist.extend(lobj for lobj in location_objlist
+                                         if lobj.access(caller, access_type='call',
+                                                        no_superuser_bypass=True))
                     local_obj_cmdsets = \
                         yield [lobj.cmdset.current for lobj in local_objlist
-                           if (lobj.cmdset.current and
-                           lobj.access(caller, access_type='call', no_superuser_bypass=True))]
+                               if lobj.cmdset.current]
                     for cset in local_obj_cmdsets:
                         #This is necessary for object sets, or we won't be able to
                         # separate the command sets from each other in a busy room. We
@@ -315,12 +455,9 @@ def get_and_merge_cmdsets(caller, session, player, obj, callertype):
                if cmdset.key == "_CMDSET_ERROR"]
 
         if cmdsets:
-            # faster to do tuple on list than to build tuple directly
-            mergehash = tuple([id(cmdset) for cmdset in cmdsets])
-            if mergehash in _CMDSET_MERGE_CACHE:
-                # cached merge exist; use that
-                cmdset = _CMDSET_MERGE_CACHE[mergehash]
-            else:
+            mergehash = _CMDSET_MERGE_CACHE.get_key(cmdsets)
+            cmdset = _CMDSET_MERGE_CACHE.get(mergehash)
+            if cmdset is None:
                 # we group and merge all same-prio cmdsets separately (this avoids
                 # order-dependent clashes in certain cases, such as
                 # when duplicates=True)
@@ -343,7 +480,7 @@ def get_and_merge_cmdsets(caller, session, player, obj, callertype):
                 # store the full sets for diagnosis
                 cmdset.merged_from = cmdsets
                 # cache
-                _CMDSET_MERGE_CACHE[mergehash] = cmdset
+                _CMDSET_MERGE_CACHE.add(mergehash, cmdset)
         else:
             cmdset = None
 
@@ -432,8 +569,8 @@ def cmdhandler(called_by, raw_string, _testing=False, callertype="session", sess
 
             if hasattr(cmd, 'obj') and hasattr(cmd.obj, 'scripts'):
                 # cmd.obj is automatically made available by the cmdhandler.
-                # we make sure to validate its scripts.
-                yield cmd.obj.scripts.validate()
+                # we make sure to validate its scripts if they changed.
+                yield cmd.obj.scripts.validate(only_changed=True)
 
             if _testing:
                 # only return the command instance
@@ -28,11 +28,15 @@ Set theory.
 """
 from future.utils import listvalues, with_metaclass
 
-from weakref import WeakKeyDictionary
+from itertools import count
 from django.utils.translation import ugettext as _
+from evennia.utils.logger import log_trace
 from evennia.utils.utils import inherits_from, is_iter
 __all__ = ("CmdSet",)
 
+# unique ids for cmdset instances, used for caching mergers
+_CMDSET_UID = count()
+
 
 class _CmdSetMeta(type):
     """
@@ -187,8 +191,14 @@ class CmdSet(with_metaclass(_CmdSetMeta, object)):
         self.merged_from = []
 
         # initialize system
+        # unique identifier and change counter, used for caching mergers
+        self._uid = next(_CMDSET_UID)
+        self._version = 0
+        # lazily built key/alias index, see _get_name_index
+        self._name_index = None
         self.at_cmdset_creation()
-        self._contains_cache = WeakKeyDictionary()#{}
+        # lazily built lowercase name index, see get_prefix_matches
+        self._prefix_index = None
 
     # Priority-sensitive merge operations for cmdsets
 
@@ -345,11 +355,74 @@ class CmdSet(with_metaclass(_CmdSetMeta, object)):
         like 'if cmd in cmdset'
 
         """
-        ret = self._contains_cache.get(othercmd)
-        if ret is None:
-            ret = othercmd in self.commands
-            self._contains_cache[othercmd] = ret
-        return ret
+        names = self._get_name_index()
+        try:
+            matchset = othercmd._matchset
+        except AttributeError:
+            # a key string
+            try:
+                return othercmd in names
+            except TypeError:
+                return False
+        for cmdname in matchset:
+            if cmdname in names:
+                return True
+        return False
+
+    def _get_name_index(self):
+        """
+        Get the index of the keys and aliases of the commands in the
+        set. This is what makes `in`, `get` and the merge operations
+        independent of the number of commands.
+
+        Returns:
+            names (dict): Maps each key and alias to `(position,
+                cmd)` for the first command in `self.commands` having it.
+
+        Notes:
+            The index is built lazily and is rebuilt if the set's
+            commands are replaced or change in number. As for
+            `get_prefix_matches`, re-add a command already in the set
+            after changing its key or aliases.
+
+        """
+        index = self._name_index
+        commands = self.commands
+        if not index or index[0] is not commands or index[1] != len(commands):
+            names = {}
+            for position, cmd in enumerate(commands):
+                for cmdname in cmd._matchset:
+                    if cmdname not in names:
+                        names[cmdname] = (position, cmd)
+            index = self._name_index = (commands, len(commands), names)
+        return index[2]
+
+    def _find(self, cmd):
+        """
+        Find the first command in the set equal to `cmd`, which is
+        any command sharing a key or alias with it.
+
+        Args:
+            cmd (Command or str): The command or a key to look for.
+
+        Returns:
+            found (tuple or None): `(position, cmd)` of the found
+                command in `self.commands`, or `None`.
+
+        """
+        names = self._get_name_index()
+        try:
+            found = [names[cmdname] for cmdname in cmd._matchset if cmdname in names]
+        except AttributeError:
+            # a key string
+            try:
+                return names.get(cmd)
+            except TypeError:
+                # unhashable; can't match any key
+                return None
+        if found:
+            return min(found, key=lambda tup: tup[0])
+        return None
 
     def __add__(self, cmdset_b):
         """
@@ -432,7 +505,8 @@ class CmdSet(with_metaclass(_CmdSetMeta, object)):
         cmdset_c.actual_mergetype = mergetype
 
         # return the system commands to the cmdset
-        cmdset_c.add(sys_commands)
+        if sys_commands:
+            cmdset_c.add(sys_commands)
         return cmdset_c
 
     def add(self, cmd):
@@ -477,19 +551,27 @@ class CmdSet(with_metaclass(_CmdSetMeta, object)):
             cmds = [self._instantiate(c) for c in cmd]
         else:
             cmds = [self._instantiate(cmd)]
+        self._version += 1
         commands = self.commands
         system_commands = self.system_commands
+        replaced = False
         for cmd in cmds:
             # add all commands
             if not hasattr(cmd, 'obj'):
                 cmd.obj = self.cmdsetobj
-            try:
-                ic = commands.index(cmd)
-                commands[ic] = cmd  # replace
-            except ValueError:
+            found = self._find(cmd)
+            if found:
+                commands[found[0]] = cmd  # replace
+                self._name_index = None
+                replaced = True
+            else:
                 commands.append(cmd)
-            # extra run to make sure to avoid doublets
-            self.commands = list(set(commands))
+                # keep the index up to date
+                names = self._name_index[2]
+                for cmdname in cmd._matchset:
+                    if cmdname not in names:
+                        names[cmdname] = (len(commands) - 1, cmd)
+                self._name_index = (commands, len(commands), names)
             # add system_command to separate list as well,
             # for quick look-up
             if cmd.key.startswith("__"):
@@ -498,6 +580,11 @@ class CmdSet(with_metaclass(_CmdSetMeta, object)):
                     system_commands[ic] = cmd  # replace
                 except ValueError:
                     system_commands.append(cmd)
+        if replaced:
+            # a replacing command may already be in the set
+            unique = set()
+            self.commands = [cmd for cmd in commands
+                             if not (id(cmd) in unique or unique.add(id(cmd)))]
 
     def remove(self, cmd):
         """
@@ -508,6 +595,7 @@ class CmdSet(with_metaclass(_CmdSetMeta, object)):
                 or the key of such a command.
 
         """
+        self._version += 1
         cmd = self._instantiate(cmd)
         if cmd.key.startswith("__"):
             try:
@@ -530,10 +618,9 @@ class CmdSet(with_metaclass(_CmdSetMeta, object)):
             cmd (Command): The first matching Command in the set.
 
         """
-        cmd = self._instantiate(cmd)
-        for thiscmd in self.commands:
-            if thiscmd == cmd:
-                return thiscmd
+        found = self._find(self._instantiate(cmd))
+        if found:
+            return found[1]
 
     def count(self):
         """
@@ -560,6 +647,71 @@ class CmdSet(with_metaclass(_CmdSetMeta, object)):
         """
         return self.system_commands
 
+    def _build_prefix_index(self):
+        """
+        Build the index used by `get_prefix_matches`.
+
+        Returns:
+            index (tuple): A tuple `(commands, ncommands, names, lengths)`
+                where `commands` is the command list the index was built
+                from and `ncommands` its length at the time. `names` maps
+                each lowercase key/alias to a list of `(order, cmdname, cmd)`
+                and `lengths` is a sorted tuple of all name lengths.
+
+        """
+        commands = self.commands
+        names = {}
+        order = 0
+        for cmd in commands:
+            try:
+                for cmdname in [cmd.key] + cmd.aliases:
+                    if cmdname:
+                        names.setdefault(cmdname.lower(), []).append((order, cmdname, cmd))
+                    order += 1
+            except Exception:
+                log_trace("cmdset index error for command %s" % cmd)
+        lengths = tuple(sorted(set(len(name) for name in names)))
+        self._prefix_index = (commands, len(commands), names, lengths)
+        return self._prefix_index
+
+    def get_prefix_matches(self, string):
+        """
+        Find all commands whose key or alias the given string starts with.
+
+        Args:
+            string (str): The (lowercase) string to match, usually
+                the start of the raw input.
+
+        Returns:
+            matches (list): A list of tuples `(cmdname, cmd)`, where
+                `cmdname` is the matching key or alias of `cmd`. The
+                matches are returned in the order of the commands in the
+                set, each command's key coming before its aliases.
+
+        Notes:
+            The index is built lazily and is rebuilt if the set's
+            commands are replaced or change in number. The lookup only
+            checks one dict entry per distinct command-name length, so
+            its cost is independent of the number of commands. If
+            changing the key or aliases of a command already in the
+            set, re-add it to have the index pick up the change.
+
+        """
+        index = self._prefix_index
+        if not index or index[0] is not self.commands or index[1] != len(self.commands):
+            index = self._build_prefix_index()
+        names, strlen = index[2], len(string)
+        matches = []
+        for length in index[3]:
+            if length > strlen:
+                break
+            found = names.get(string[:length])
+            if found:
+                matches.extend(found)
+        if len(matches) > 1:
+            matches.sort(key=lambda tup: tup[0])
+        return [(cmdname, cmd) for order, cmdname, cmd in matches]
+
     def make_unique(self, caller):
         """
         Remove duplicate command-keys (unsafe)
@@ -577,6 +729,7 @@ class CmdSet(with_metaclass(_CmdSetMeta, object)):
             caller, otherwise just by first-come-first-served.
 
         """
+        self._version += 1
         unique = {}
         for cmd in self.commands:
             if cmd.key in unique:
@@ -78,6 +78,7 @@ from django.utils.translation import ugettext as _
 __all__ = ("import_cmdset", "CmdSetHandler")
 
 _CACHED_CMDSETS = {}
+_CMDSET_MERGE_CACHE = None
 _CMDSET_PATHS = utils.make_iter(settings.CMDSET_PATHS)
 _IN_GAME_ERRORS = settings.IN_GAME_ERRORS
 
@@ -355,6 +356,13 @@ class CmdSetHandler(object):
                             cmdset.permanent = cmdset.key != '_CMDSET_ERROR'
                             self.cmdset_stack.append(cmdset)
 
+        if self.current:
+            # mergers involving the old current cmdset are now obsolete
+            global _CMDSET_MERGE_CACHE
+            if _CMDSET_MERGE_CACHE is None:
+                from evennia.commands.cmdhandler import _CMDSET_MERGE_CACHE
+            _CMDSET_MERGE_CACHE.invalidate(self.current)
+
         # merge the stack into a new merged cmdset
         new_current = None
         self.mergetype_stack = []
@@ -367,6 +375,13 @@ class CmdSetHandler(object):
             self.mergetype_stack.append(new_current.actual_mergetype)
         self.current = new_current
 
+        if not init_mode:
+            # let our location know that the cmdsets we provide changed
+            location = getattr(self.obj, "db_location", None)
+            contents_cache = location and location.__dict__.get("contents_cache")
+            if contents_cache:
+                contents_cache.changed()
+
     def add(self, cmdset, emit_to_obj=None, permanent=False, default_cmdset=False):
         """
         Add a cmdset to the handler, on top of the old ones, unless it
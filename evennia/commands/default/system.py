@@ -27,6 +27,8 @@ COMMAND_DEFAULT_CLASS = class_from_module(settings.COMMAND_DEFAULT_CLASS)
 # delayed imports
 _RESOURCE = None
 _IDMAPPER = None
+_CMDHANDLER = None
+_ATTRIBUTES = None
 
 # limit symbol import for API
 __all__ = ("CmdReload", "CmdReset", "CmdShutdown", "CmdPy",
@@ -643,6 +645,10 @@ class CmdServerLoad(COMMAND_DEFAULT_CLASS):
     non-persistent storage schemes. The total amount of cached objects
     are displayed plus a breakdown of database object types.
 
+    The {wInternal caches{n show the hit/miss statistics of caches
+    used to speed up common operations, such as the merging of cmdsets
+    and the unpickling of Attribute values.
+
     The {wflushmem{n switch allows to flush the object cache. Please
     note that due to how Python's memory management works, releasing
     caches may not show you a lower Residual/Virtual memory footprint,
@@ -752,6 +758,23 @@ class CmdServerLoad(COMMAND_DEFAULT_CLASS):
 
         string += "\n{w Entity idmapper cache:{n %i items\n%s" % (total_num, memtable)
 
+        # hit/miss statistics for internal caches
+        global _CMDHANDLER
+        if not _CMDHANDLER:
+            from evennia.commands import cmdhandler as _CMDHANDLER
+        stats = _CMDHANDLER._CMDSET_MERGE_CACHE.stats()
+        cachetable = EvTable("cache", "size", "hits", "misses", "evictions", "invalidations", align="l")
+        cachetable.add_row("cmdset mergers", "%i/%i" % (stats["size"], stats["maxsize"]),
+                           stats["hits"], stats["misses"], stats["evictions"], stats["invalidations"])
+        global _ATTRIBUTES
+        if not _ATTRIBUTES:
+            from evennia.typeclasses import attributes as _ATTRIBUTES
+        stats = _ATTRIBUTES.value_cache_stats()
+        cachetable.add_row("attribute values",
+                           "on" if _ATTRIBUTES._ATTRIBUTE_VALUE_CACHE else "off",
+                           stats["hits"], stats["misses"], "-", stats["invalidations"])
+        string += "\n{w Internal caches:{n\n%s" % cachetable
+
         # return to caller
         self.caller.msg(string)
 
@@ -764,7 +787,9 @@ class CmdTickers(COMMAND_DEFAULT_CLASS):
 
     Note: Tickers are created, stopped and manipulated in Python code
     using the TickerHandler. This is merely a convenience function for
-    inspecting the current status.
+    inspecting the current status. The load table shows how long the
+    latest and the slowest tick took, and how often ticks were not done
+    before the next tick was due (overruns).
 
     """
     key = "@tickers"
@@ -784,7 +809,15 @@ class CmdTickers(COMMAND_DEFAULT_CLASS):
                           sub[1] if sub[1] else sub[2],
                           sub[4] or "[Unset]",
                           "*" if sub[5] else "-")
-        self.caller.msg("|wActive tickers|n:\n" + unicode(table))
+        loadtable = EvTable("interval (s)", "subscribers", "slots", "ticks",
+                            "last (ms)", "max (ms)", "overruns")
+        for interval, stats in sorted(TICKER_HANDLER.stats().items()):
+            loadtable.add_row(interval, stats["subscriptions"], stats["slots"], stats["ticks"],
+                              "%.1f" % (1000 * stats["duration"]),
+                              "%.1f" % (1000 * stats["max_duration"]),
+                              stats["overruns"])
+        self.caller.msg("|wActive tickers|n:\n" + unicode(table) +
+                        "\n|wTicker load|n:\n" + unicode(loadtable))
 
 
 
@@ -107,6 +107,24 @@ class TestGeneral(CommandTest):
         self.assertEqual(u"testaliasedstring2", self.char1.nicks.get("testalias", category="player"))
         self.assertEqual(u"testaliasedstring3", self.char1.nicks.get("testalias", category="object"))
 
+    def test_nickreplace(self):
+        nicks = self.char1.nicks
+        # enough nicks to need more than one combined regex
+        for inick in range(60):
+            nicks.add("nick%i $1 $2" % inick, "say %i $2 $1" % inick)
+        nicks.add("gr*", "greet")
+        nicks.add("tc", "testchannel", category="channel")
+        self.assertEqual(nicks.nickreplace("nick5 a  b\n", include_player=False), "say 5 b a")
+        self.assertEqual(nicks.nickreplace("NICK59 x y", include_player=False), "say 59 y x")
+        self.assertEqual(nicks.nickreplace("growl", include_player=False), "greet")
+        self.assertEqual(nicks.nickreplace("tc", include_player=False), "testchannel")
+        self.assertEqual(nicks.nickreplace(" nick5 a ", include_player=False), "nick5 a")
+        self.assertEqual(nicks.nickreplace("tc", categories=("inputline",), include_player=False), "tc")
+        nicks.remove("gr*")
+        self.assertEqual(nicks.nickreplace("growl", include_player=False), "growl")
+        self.player.nicks.add("tc", "playerchannel", category="channel")
+        self.assertEqual(nicks.nickreplace("tc"), "playerchannel")
+
     def test_get_and_drop(self):
         self.call(general.CmdGet(), "Obj", "You pick up Obj.")
         self.call(general.CmdDrop(), "Obj", "You drop Obj.")
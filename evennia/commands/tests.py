@@ -0,0 +1,209 @@
+"""
+Unit tests for the command parsing and cmdset functionality.
+
+"""
+import re
+from django.test import TestCase
+
+from evennia.commands.cmdset import CmdSet
+from evennia.commands.command import Command
+from evennia.commands.cmdparser import cmdparser
+from evennia.commands.cmdhandler import CmdSetMergeCache
+from evennia.utils.test_resources import EvenniaTest
+
+
+class _CmdA(Command):
+    key = "look"
+    aliases = ["l", "ls"]
+
+
+class _CmdB(Command):
+    key = "lock"
+
+
+class _CmdC(Command):
+    key = "look at"
+    arg_regex = re.compile(r"\s|$")
+
+
+class _CmdD(Command):
+    key = "Lo"
+
+
+class _CmdSetTest(CmdSet):
+    key = "testset"
+
+    def at_cmdset_creation(self):
+        self.add(_CmdA())
+        self.add(_CmdB())
+        self.add(_CmdC())
+        self.add(_CmdD())
+
+
+class TestCmdParser(TestCase):
+    def setUp(self):
+        self.cmdset = _CmdSetTest()
+
+    def _legacy_names(self, raw_string):
+        "The linear scan the prefix index replaces"
+        l_raw_string = raw_string.lower()
+        return [(cmdname, cmd) for cmd in self.cmdset for cmdname in [cmd.key] + cmd.aliases
+                if cmdname and l_raw_string.startswith(cmdname.lower())]
+
+    def test_prefix_matches(self):
+        for raw_string in ("look at me", "l", "lock", "lo", "loc", "xyz", "LOOKATME"):
+            self.assertEqual(self._legacy_names(raw_string),
+                             self.cmdset.get_prefix_matches(raw_string.lower()))
+
+    def test_index_rebuild(self):
+        self.assertEqual([], self.cmdset.get_prefix_matches("get box"))
+
+        class CmdGet(Command):
+            key = "get"
+        self.cmdset.add(CmdGet())
+        self.assertEqual("get", self.cmdset.get_prefix_matches("get box")[0][0])
+        self.cmdset.remove(CmdGet)
+        self.assertEqual([], self.cmdset.get_prefix_matches("get box"))
+
+    def test_cmdparser(self):
+        matches = cmdparser("look at me", self.cmdset, None)
+        self.assertEqual(1, len(matches))
+        self.assertEqual(("look at", " me"), matches[0][:2])
+        # arg_regex filters out 'look at' here, longest match wins
+        matches = cmdparser("look atme", self.cmdset, None)
+        self.assertEqual(("look", " atme"), matches[0][:2])
+        self.assertEqual([], cmdparser("xyz", self.cmdset, None))
+
+    def test_multimatch_index(self):
+        cmdset = CmdSet()
+        cmdset.duplicates = True
+        cmd1, cmd2 = _CmdB(), _CmdB()
+        cmdset.commands = [cmd1, cmd2]
+        self.assertEqual(2, len(cmdparser("lock", cmdset, None)))
+        self.assertTrue(cmdparser("2-lock", cmdset, None)[0][2] is cmd2)
+        self.assertTrue(cmdparser("1-lock", cmdset, None)[0][2] is cmd1)
+
+
+class TestCmdSetMerge(TestCase):
+    def setUp(self):
+        self.cmdset_a = CmdSet(key="A")
+        self.cmdset_a.add([_CmdA(), _CmdD()])
+        self.cmdset_b = _CmdSetTest()
+
+    def _keys(self, cmdset):
+        return sorted(cmd.key for cmd in cmdset)
+
+    def test_contains_and_get(self):
+        self.assertTrue("ls" in self.cmdset_a)
+        self.assertTrue(_CmdA() in self.cmdset_a)
+        self.assertFalse(_CmdB() in self.cmdset_a)
+        self.assertFalse(["l"] in self.cmdset_a)
+        self.assertTrue(self.cmdset_a.get("l") is self.cmdset_a.commands[0])
+        self.assertEqual(None, self.cmdset_a.get(_CmdB))
+        self.cmdset_a.add(_CmdB())
+        self.assertTrue(_CmdB() in self.cmdset_a)
+        self.cmdset_a.remove(_CmdB)
+        self.assertFalse(_CmdB() in self.cmdset_a)
+
+    def test_add_replace(self):
+        cmd = _CmdA()
+        self.cmdset_b.add(cmd)
+        self.assertEqual(4, self.cmdset_b.count())
+        self.assertTrue(self.cmdset_b.get("look") is cmd)
+        self.cmdset_b.add(cmd)
+        self.assertEqual(4, self.cmdset_b.count())
+
+    def test_mergetypes(self):
+        for mergetype, keys in (("Union", ["lo", "lock", "look", "look at"]),
+                                ("Intersect", ["lo", "look"]),
+                                ("Replace", ["lo", "look"]),
+                                ("Remove", ["lock", "look at"])):
+            self.cmdset_a.mergetype = mergetype
+            merged = self.cmdset_a + self.cmdset_b
+            self.assertEqual(keys, self._keys(merged))
+            if mergetype != "Remove":
+                self.assertTrue(merged.get("look") is self.cmdset_a.get("look"))
+
+
+class TestCmdSetMergeCache(TestCase):
+    def setUp(self):
+        self.cache = CmdSetMergeCache(maxsize=2)
+        self.cmdset1, self.cmdset2, self.cmdset3 = _CmdSetTest(), _CmdSetTest(), _CmdSetTest()
+
+    def test_lru(self):
+        key1 = self.cache.get_key([self.cmdset1, self.cmdset2])
+        key2 = self.cache.get_key([self.cmdset2, self.cmdset3])
+        key3 = self.cache.get_key([self.cmdset1, self.cmdset3])
+        self.cache.add(key1, self.cmdset1)
+        self.cache.add(key2, self.cmdset2)
+        self.assertTrue(self.cache.get(key1) is self.cmdset1)
+        self.cache.add(key3, self.cmdset3)
+        self.assertEqual(None, self.cache.get(key2))
+        self.assertTrue(self.cache.get(key1) is self.cmdset1)
+        self.assertEqual({"size": 2, "maxsize": 2, "hits": 2, "misses": 1,
+                          "evictions": 1, "invalidations": 0}, self.cache.stats())
+
+    def test_version_key(self):
+        key1 = self.cache.get_key([self.cmdset1, self.cmdset2])
+        self.cache.add(key1, self.cmdset1)
+        self.cmdset2.remove(_CmdB)
+        key2 = self.cache.get_key([self.cmdset1, self.cmdset2])
+        self.assertNotEqual(key1, key2)
+        self.assertEqual(None, self.cache.get(key2))
+
+    def test_invalidate(self):
+        key1 = self.cache.get_key([self.cmdset1, self.cmdset2])
+        key2 = self.cache.get_key([self.cmdset3])
+        self.cache.add(key1, self.cmdset1)
+        self.cache.add(key2, self.cmdset3)
+        self.cache.invalidate(self.cmdset2)
+        self.assertEqual(None, self.cache.get(key1))
+        self.assertTrue(self.cache.get(key2) is self.cmdset3)
+        self.assertEqual(1, self.cache.stats()["invalidations"])
+        self.assertFalse(self.cmdset1._uid in self.cache.uid_index)
+
+
+class TestCmdSetProviders(EvenniaTest):
+    def test_providers(self):
+        contents = self.room1.contents_cache
+        # the exit customizes at_cmdset_get, plain objects have no cmdsets
+        self.assertEqual(set([self.exit, self.char2]),
+                         set(contents.get_cmdset_providers(exclude=self.char1)))
+        version = contents.version
+        self.obj1.cmdset.add(_CmdSetTest)
+        self.assertTrue(contents.version > version)
+        self.assertEqual(set([self.exit, self.char2, self.obj1]),
+                         set(contents.get_cmdset_providers(exclude=self.char1)))
+        self.obj1.move_to(self.room2, quiet=True)
+        self.assertFalse(self.obj1 in contents.get_cmdset_providers(exclude=self.char1))
+        self.assertEqual([self.obj1], self.room2.contents_cache.get_cmdset_providers())
+
+    def test_call_lock_cache(self):
+        contents = self.room1.contents_cache
+        self.obj1.cmdset.add(_CmdSetTest)
+        self.obj1.locks.add("call:false()")
+        # characters are by default locked from providing their commands
+        self.assertEqual([self.exit],
+                         contents.get_cmdset_providers(exclude=self.char1, caller=self.char1))
+        self.obj1.locks.add("call:true()")
+        self.assertEqual(set([self.exit, self.obj1]),
+                         set(contents.get_cmdset_providers(exclude=self.char1, caller=self.char1)))
+
+    def test_call_lock_caller_state(self):
+        contents = self.room1.contents_cache
+        self.obj1.cmdset.add(_CmdSetTest)
+        self.obj2.move_to(self.room2, quiet=True)
+        self.obj1.locks.add("call:holds(%s)" % self.obj2.dbref)
+        self.assertEqual([self.exit], contents.get_cmdset_providers(exclude=self.char1, caller=self.char1))
+        # the room contents don't change, the caller's do
+        self.obj2.move_to(self.char1, quiet=True)
+        self.assertTrue(self.obj1 in contents.get_cmdset_providers(exclude=self.char1, caller=self.char1))
+        # locks on permissions and Attributes are always re-checked
+        self.obj1.locks.add("call:perm(Swimmers)")
+        self.assertFalse(self.obj1 in contents.get_cmdset_providers(exclude=self.char1, caller=self.char1))
+        self.char1.permissions.add("Swimmers")
+        self.assertTrue(self.obj1 in contents.get_cmdset_providers(exclude=self.char1, caller=self.char1))
+        self.obj1.locks.add("call:attr(rank, 3)")
+        self.assertFalse(self.obj1 in contents.get_cmdset_providers(exclude=self.char1, caller=self.char1))
+        self.char1.db.rank = 3
+        self.assertTrue(self.obj1 in contents.get_cmdset_providers(exclude=self.char1, caller=self.char1))
@@ -10,6 +10,8 @@ from evennia.utils import logger
 from evennia.utils.utils import make_iter
 from future.utils import with_metaclass
 
+_SESSIONS = None
+
 
 class DefaultChannel(with_metaclass(TypeclassBase, ChannelDB)):
     """
@@ -195,14 +197,20 @@ class DefaultChannel(with_metaclass(TypeclassBase, ChannelDB)):
             This is also where logging happens, if enabled.
 
         """
+        global _SESSIONS
+        if not _SESSIONS:
+            from evennia.server.sessionhandler import SESSIONS as _SESSIONS
         # get all players connected to this channel and send to them
+        receivers = []
         for entity in self.subscriptions.all():
-            try:
-                # note our addition of the from_channel keyword here. This could be checked
-                # by a custom player.msg() to treat channel-receives differently.
-                entity.msg(msgobj.message, from_obj=msgobj.senders, options={"from_channel":self.id})
-            except AttributeError as e:
-                logger.log_trace("%s\nCannot send msg to '%s'." % (e, entity))
+            if hasattr(entity, "msg"):
+                receivers.append(entity)
+            else:
+                logger.log_err("Cannot send msg to '%s'." % entity)
+        # note our addition of the from_channel keyword here. This could be checked
+        # by a custom player.msg() to treat channel-receives differently.
+        _SESSIONS.msg_multicast(receivers, msgobj.message, from_obj=msgobj.senders,
+                                options={"from_channel": self.id})
 
         if msgobj.keep_log:
             # log to file
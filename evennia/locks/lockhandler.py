@@ -139,6 +139,7 @@ def _cache_lockfuncs():
     """
     global _LOCKFUNCS
     _LOCKFUNCS = {}
+    _COMPILED_LOCKS.clear()
     for modulepath in settings.LOCK_FUNC_MODULES:
         _LOCKFUNCS.update(utils.callables_from_module(modulepath))
 
@@ -151,6 +152,108 @@ _RE_SEPS = re.compile(r"(?<=[ )])AND(?=\s)|(?<=[ )])OR(?=\s)|(?<=[ )])NOT(?=\s)"
 _RE_OK = re.compile(r"%s|and|or|not")
 
 
+#
+# Compiled lock definitions
+#
+
+# compiled lock definitions, keyed on the raw lock definition
+# ("atype:func() AND ..."). These are shared between all lockhandlers
+# using an identical definition. Since definitions like dbref(#N) are
+# unique to each object, the cache is emptied when growing too big.
+_COMPILED_LOCKS = {}
+_COMPILED_LOCKS_MAX = 10000
+
+# counts changes to the locks of any lockhandler, allowing
+# callers to know when cached lock results may be outdated.
+_LOCK_CHANGES = 0
+
+
+def lock_changes():
+    """
+    Get the number of lock changes done since the server started.
+
+    Returns:
+        changes (int): Increases every time any lock is added,
+            replaced or removed on any lockhandler.
+
+    """
+    return _LOCK_CHANGES
+
+
+def _compile_lock(evalstring, func_tup):
+    """
+    Compile a lock definition into a callable that evaluates its lock
+    functions lazily.
+
+    Args:
+        evalstring (str): The purged evalstring, on the form
+            `"%s and not %s or %s"`, with one `%s` per lock function.
+        func_tup (tuple): Tuples `(func, args, kwargs)`, one for each
+            `%s` in `evalstring`, in order.
+
+    Returns:
+        evaluator (callable): A callable `evaluator(accessing_obj,
+            accessed_obj)` returning the combined `bool` result.
+
+    Raises:
+        SyntaxError: If `evalstring` is not a valid combination of
+            `%s`, `and`, `or` and `not`.
+
+    Notes:
+        Normal Python precedence is used (`not` binds tighter than
+        `and`, which binds tighter than `or`), so the definition is
+        stored as a sequence of OR:ed groups of AND:ed (possibly
+        negated) lock functions. When evaluating, the remainder of an
+        AND-group is skipped as soon as one of its functions fails
+        and the lock passes as soon as one group succeeds. Later lock
+        functions are thus never called if their result is not needed.
+
+    """
+    groups = []
+    group = []
+    negate = False
+    expect_func = True
+    ifunc = 0
+    for token in evalstring.split():
+        if expect_func:
+            if token == "not":
+                negate = not negate
+            elif token == "%s":
+                if ifunc >= len(func_tup):
+                    raise SyntaxError("too few lock functions")
+                func, args, kwargs = func_tup[ifunc]
+                group.append((negate, func, args, kwargs))
+                ifunc += 1
+                negate = False
+                expect_func = False
+            else:
+                raise SyntaxError("unexpected '%s'" % token)
+        else:
+            if token == "and":
+                expect_func = True
+            elif token == "or":
+                groups.append(tuple(group))
+                group = []
+                expect_func = True
+            else:
+                raise SyntaxError("unexpected '%s'" % token)
+    if expect_func or ifunc != len(func_tup):
+        raise SyntaxError("incomplete lock definition")
+    groups.append(tuple(group))
+    groups = tuple(groups)
+
+    def evaluator(accessing_obj, accessed_obj):
+        for group in groups:
+            for negate, func, args, kwargs in group:
+                if bool(func(accessing_obj, accessed_obj, *args, **kwargs)) is negate:
+                    # this AND-group failed, skip its remaining funcs
+                    break
+            else:
+                return True
+        return False
+    return evaluator
+
+
 #
 #
 # Lock handler
@@ -197,6 +300,11 @@ class LockHandler(object):
         Args:
             storage_locksring (str): The lockstring to parse.
 
+        Notes:
+            Each lock definition is compiled into an evaluator (see
+            `_compile_lock`). Compiled definitions are cached and
+            shared by all lockhandlers using identical definitions.
+
         """
         locks = {}
         if not storage_lockstring:
@@ -207,43 +315,26 @@ class LockHandler(object):
         for raw_lockstring in storage_lockstring.split(';'):
             if not raw_lockstring:
                 continue
-            lock_funcs = []
-            try:
-                access_type, rhs = (part.strip() for part in raw_lockstring.split(':', 1))
-            except ValueError:
-                logger.log_trace()
-                return locks
-
-            # parse the lock functions and separators
-            funclist = _RE_FUNCS.findall(rhs)
-            evalstring = rhs
-            for pattern in ('AND', 'OR', 'NOT'):
-                evalstring = re.sub(r"\b%s\b" % pattern, pattern.lower(), evalstring)
-            nfuncs = len(funclist)
-            for funcstring in funclist:
-                funcname, rest = (part.strip().strip(')') for part in funcstring.split('(', 1))
-                func = _LOCKFUNCS.get(funcname, None)
-                if not callable(func):
-                    elist.append(_("Lock: lock-function '%s' is not available.") % funcstring)
+            compiled = _COMPILED_LOCKS.get(raw_lockstring)
+            if compiled:
+                access_type, lockdef = compiled
+            else:
+                try:
+                    access_type, rhs = (part.strip() for part in raw_lockstring.split(':', 1))
+                except ValueError:
+                    logger.log_trace()
+                    return locks
+                lockdef = self._compile_lockdef(raw_lockstring, rhs, elist)
+                if not lockdef:
                     continue
-                args = list(arg.strip() for arg in rest.split(',') if arg and not '=' in arg)
-                kwargs = dict([arg.split('=', 1) for arg in rest.split(',') if arg and '=' in arg])
-                lock_funcs.append((func, args, kwargs))
-                evalstring = evalstring.replace(funcstring, '%s')
-            if len(lock_funcs) < nfuncs:
-                continue
-            try:
-                # purge the eval string of any superfluous items, then test it
-                evalstring = " ".join(_RE_OK.findall(evalstring))
-                eval(evalstring % tuple(True for func in funclist), {}, {})
-            except Exception:
-                elist.append(_("Lock: definition '%s' has syntax errors.") % raw_lockstring)
-                continue
+                if len(_COMPILED_LOCKS) >= _COMPILED_LOCKS_MAX:
+                    _COMPILED_LOCKS.clear()
+                _COMPILED_LOCKS[raw_lockstring] = (access_type, lockdef)
             if access_type in locks:
                 duplicates += 1
                 wlist.append(_("LockHandler on %(obj)s: access type '%(access_type)s' changed from '%(source)s' to '%(goal)s' " % \
                         {"obj":self.obj, "access_type":access_type, "source":locks[access_type][2], "goal":raw_lockstring}))
-            locks[access_type] = (evalstring, tuple(lock_funcs), raw_lockstring)
+            locks[access_type] = lockdef
         if wlist:
             # a warning text was set, it's not an error, so only report
             logger.log_file("\n".join(wlist), WARNING_LOG)
@@ -253,6 +344,51 @@ class LockHandler(object):
         # return the gathered locks in an easily executable form
         return locks
 
+    def _compile_lockdef(self, raw_lockstring, rhs, elist):
+        """
+        Helper function for parsing and compiling a single lock
+        definition.
+
+        Args:
+            raw_lockstring (str): The full definition, `"atype:rhs"`.
+            rhs (str): The right-hand side of the definition.
+            elist (list): Error messages will be appended to this list.
+
+        Returns:
+            lockdef (tuple or None): A tuple `(evalstring, func_tup,
+                raw_lockstring, evaluator)` or `None` if there was
+                an error.
+
+        """
+        lock_funcs = []
+        # parse the lock functions and separators
+        funclist = _RE_FUNCS.findall(rhs)
+        evalstring = rhs
+        for pattern in ('AND', 'OR', 'NOT'):
+            evalstring = re.sub(r"\b%s\b" % pattern, pattern.lower(), evalstring)
+        nfuncs = len(funclist)
+        for funcstring in funclist:
+            funcname, rest = (part.strip().strip(')') for part in funcstring.split('(', 1))
+            func = _LOCKFUNCS.get(funcname, None)
+            if not callable(func):
+                elist.append(_("Lock: lock-function '%s' is not available.") % funcstring)
+                continue
+            args = list(arg.strip() for arg in rest.split(',') if arg and not '=' in arg)
+            kwargs = dict([arg.split('=', 1) for arg in rest.split(',') if arg and '=' in arg])
+            lock_funcs.append((func, args, kwargs))
+            evalstring = evalstring.replace(funcstring, '%s')
+        if len(lock_funcs) < nfuncs:
+            return None
+        try:
+            # purge the eval string of any superfluous items, then compile it
+            evalstring = " ".join(_RE_OK.findall(evalstring))
+            func_tup = tuple(lock_funcs)
+            evaluator = _compile_lock(evalstring, func_tup)
+        except SyntaxError:
+            elist.append(_("Lock: definition '%s' has syntax errors.") % raw_lockstring)
+            return None
+        return (evalstring, func_tup, raw_lockstring, evaluator)
+
     def _cache_locks(self, storage_lockstring):
         """
         Store data
@@ -263,6 +399,8 @@ class LockHandler(object):
         """
         Store locks to obj
         """
+        global _LOCK_CHANGES
+        _LOCK_CHANGES += 1
         self.obj.lock_storage = ";".join([tup[2] for tup in self.locks.values()])
 
     def cache_lock_bypass(self, obj):
@@ -358,7 +496,7 @@ class LockHandler(object):
         """
 
         if access_type:
-            return self.locks.get(access_type, ["", "", ""])[2]
+            return self.locks.get(access_type, ["", "", "", None])[2]
         return str(self)
 
     def all(self):
@@ -427,12 +565,10 @@ class LockHandler(object):
 
             Parsing the lockstring, we (during cache) extract the valid
             lock functions and store their function objects in the right
-            order along with their args/kwargs. These are now executed in
-            sequence, creating a list of True/False values. This is put
-            into the evalstring, which is a string of AND/OR/NOT entries
-            separated by placeholders where each function result should
-            go. We just put those results in and evaluate the string to
-            get a final, combined True/False value for the lockstring.
+            order along with their args/kwargs. The AND/OR/NOT entries
+            connecting them are compiled into an evaluator that calls
+            the lock functions in sequence, stopping as soon as the
+            final, combined True/False value of the lockstring is known.
 
             The important bit with this solution is that the full
             lockstring is never blindly evaluated, and thus there (should
@@ -453,19 +589,15 @@ class LockHandler(object):
 
         # no superuser or bypass -> normal lock operation
         if access_type in self.locks:
-            # we have a lock, test it.
-            evalstring, func_tup, raw_string = self.locks[access_type]
-            # execute all lock funcs in the correct order, producing a tuple of True/False results.
-            true_false = tuple(bool(tup[0](accessing_obj, self.obj, *tup[1], **tup[2])) for tup in func_tup)
-            # the True/False tuple goes into evalstring, which combines them
-            # with AND/OR/NOT in order to get the final result.
-            return eval(evalstring % true_false)
+            # we have a lock, test it. The compiled evaluator runs
+            # the lock funcs in order, combining them with AND/OR/NOT.
+            return self.locks[access_type][3](accessing_obj, self.obj)
         else:
             return default
 
     def _eval_access_type(self, accessing_obj, locks, access_type):
         """
-        Helper method for evaluating the access type using eval().
+        Helper method for evaluating the access type.
 
         Args:
             accessing_obj (object): Object seeking access.
@@ -473,10 +605,7 @@ class LockHandler(object):
             access_type (str): An access-type key to evaluate.
 
         """
-        evalstring, func_tup, raw_string = locks[access_type]
-        true_false = tuple(tup[0](accessing_obj, self.obj, *tup[1], **tup[2])
-                           for tup in func_tup)
-        return eval(evalstring % true_false)
+        return locks[access_type][3](accessing_obj, self.obj)
 
     def check_lockstring(self, accessing_obj, lockstring, no_superuser_bypass=False,
                          default=False, access_type=None):
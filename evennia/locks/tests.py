@@ -15,7 +15,7 @@ try:
 except ImportError:
     from django.test import TestCase
 
-from evennia.locks import lockfuncs
+from evennia.locks import lockfuncs, lockhandler
 
 # ------------------------------------------------------------
 # Lock testing
@@ -53,3 +53,48 @@ class TestLockfuncs(EvenniaTest):
         self.assertEquals(False, lockfuncs.attr_lt(self.obj2, self.obj1, 'testattr', '45'))
         self.assertEquals(True, lockfuncs.attr_le(self.obj2, self.obj1, 'testattr', '45'))
         self.assertEquals(False, lockfuncs.attr_ne(self.obj2, self.obj1, 'testattr', '45'))
+
+
+class TestCompiledLocks(TestCase):
+    def _funcs(self, *results):
+        calls = []
+        def _make(num, result):
+            def _func(accessing_obj, accessed_obj, *args, **kwargs):
+                calls.append(num)
+                return result
+            return (_func, [], {})
+        return calls, tuple(_make(num, result) for num, result in enumerate(results))
+
+    def test_precedence(self):
+        for evalstring, results in (("%s and not %s or %s", (True, True, False)),
+                                    ("not %s or %s and %s", (True, True, False)),
+                                    ("not not %s and %s", (True, True)),
+                                    ("%s or %s and not %s", (False, True, False))):
+            calls, func_tup = self._funcs(*results)
+            evaluator = lockhandler._compile_lock(evalstring, func_tup)
+            self.assertEqual(eval(evalstring % results), evaluator(None, None))
+
+    def test_short_circuit(self):
+        calls, func_tup = self._funcs(False, True, True)
+        evaluator = lockhandler._compile_lock("%s and %s or %s", func_tup)
+        self.assertTrue(evaluator(None, None))
+        self.assertEqual([0, 2], calls)
+        calls, func_tup = self._funcs(True, False, False)
+        evaluator = lockhandler._compile_lock("%s or %s and %s", func_tup)
+        self.assertTrue(evaluator(None, None))
+        self.assertEqual([0], calls)
+
+    def test_syntax_errors(self):
+        calls, func_tup = self._funcs(True, True)
+        for evalstring in ("%s %s", "%s and", "and %s %s", "%s or not"):
+            self.assertRaises(SyntaxError, lockhandler._compile_lock, evalstring, func_tup)
+
+    def test_shared_compiled_locks(self):
+        class _Obj(object):
+            lock_storage = "get:all();edit:perm(Wizards) OR NOT false()"
+        obj1, obj2 = _Obj(), _Obj()
+        handler1 = lockhandler.LockHandler(obj1)
+        handler2 = lockhandler.LockHandler(obj2)
+        self.assertTrue(handler1.locks["get"] is handler2.locks["get"])
+        self.assertTrue(handler1.check(obj2, "edit"))
+        self.assertRaises(lockhandler.LockException, handler1.add, "get:all() AND")
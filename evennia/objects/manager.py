@@ -227,6 +227,55 @@ class ObjectDBManager(TypedObjectManager):
         exclude_restriction = Q(pk__in=[_GA(obj, "id") for obj in make_iter(excludeobj)]) if excludeobj else Q()
         return self.filter(db_location=location).exclude(exclude_restriction)
 
+    def _match_key_or_alias(self, ostring, exact, candidates, typeclasses=None):
+        """
+        Match key and aliases of in-memory candidates, without querying
+        the database (except for the first time the aliases of a
+        candidate are accessed, after which they are cached).
+
+        Args:
+            ostring (str): The search criterion.
+            exact (bool): Require an exact (case-insensitive) match of
+                key or alias. Otherwise use fuzzy matching with
+                `evennia.utils.utils.string_partial_matching`.
+            candidates (list): The objects to match among.
+            typeclasses (list, optional): Only match objects with these
+                typeclass paths.
+
+        Returns:
+            matches (list): The matching objects, sorted by id.
+
+        """
+        # each object is only matched once, also if given many times
+        candidates = sorted(dict((_GA(obj, "id"), obj) for obj in make_iter(candidates) if obj).values(),
+                            key=lambda obj: _GA(obj, "id"))
+        if typeclasses:
+            typeclasses = make_iter(typeclasses)
+            candidates = [obj for obj in candidates
+                          if _GA(obj, "db_typeclass_path") in typeclasses]
+        if not candidates:
+            return []
+        ostring = to_unicode(ostring)
+        if exact:
+            ostring = ostring.lower()
+            return [obj for obj in candidates if _GA(obj, "db_key").lower() == ostring
+                    or any(alias.lower() == ostring for alias in obj.aliases.all())]
+        # fuzzy matching, first on keys, then on aliases
+        index_matches = string_partial_matching([_GA(obj, "db_key") for obj in candidates],
+                                                ostring, ret_index=True)
+        if index_matches:
+            return [candidates[ind] for ind in index_matches]
+        alias_objs, alias_strings = [], []
+        for obj in candidates:
+            for alias in obj.aliases.all():
+                alias_objs.append(obj)
+                alias_strings.append(alias)
+        matches = []
+        for ind in string_partial_matching(alias_strings, ostring, ret_index=True):
+            if alias_objs[ind] not in matches:
+                matches.append(alias_objs[ind])
+        return matches
+
     @returns_typeclass_list
     def get_objs_with_key_or_alias(self, ostring, exact=True,
                                          candidates=None, typeclasses=None):
@@ -241,6 +290,11 @@ class ObjectDBManager(TypedObjectManager):
 
         Returns:
             matches (list): A list of matches of length 0, 1 or more.
+
+        Notes:
+            If `candidates` are given, these are matched in memory
+            rather than by querying the database.
+
         """
         if not isinstance(ostring, basestring):
             if hasattr(ostring, "key"):
@@ -252,6 +306,10 @@ class ObjectDBManager(TypedObjectManager):
             # Exit early.
             return []
 
+        if candidates is not None:
+            # the candidates are already in memory, no need to query
+            return self._match_key_or_alias(ostring, exact, candidates, typeclasses)
+
         # build query objects
         candidates_id = [_GA(obj, "id") for obj in make_iter(candidates) if obj]
         cand_restriction = candidates != None and Q(pk__in=make_iter(candidates_id)) or Q()
@@ -25,12 +25,74 @@ from evennia.utils import logger
 from evennia.utils.utils import (make_iter, dbref, lazy_property)
 
 
+_DEFAULT_AT_CMDSET_GET = None
+_CUSTOM_CMDSET_HOOK = {}
+_LOCK_CHANGES = None
+_SCRIPTS_CHANGED = None
+_CACHEABLE_LOCKFUNCS = None
+# lock functions whose result only depends on the identity or the
+# contents of the accessing object, so their call-lock results can be
+# cached until those change
+_CACHEABLE_LOCKFUNC_NAMES = ("true", "all", "false", "none", "self", "dbref", "pdbref",
+                             "id", "pid", "holds", "superuser", "serversetting")
+
+
+def _has_custom_cmdset_hook(obj):
+    """
+    Check if the object's class overloads the `at_cmdset_get` hook.
+
+    Args:
+        obj (Object): The object to check.
+
+    Returns:
+        custom (bool): If the hook is anything but the default no-op.
+
+    """
+    cls = obj.__class__
+    try:
+        return _CUSTOM_CMDSET_HOOK[cls]
+    except KeyError:
+        global _DEFAULT_AT_CMDSET_GET
+        if not _DEFAULT_AT_CMDSET_GET:
+            from evennia.objects.objects import DefaultObject
+            _DEFAULT_AT_CMDSET_GET = DefaultObject.at_cmdset_get.__func__
+        hook = getattr(cls, "at_cmdset_get", None)
+        custom = getattr(hook, "__func__", hook) is not _DEFAULT_AT_CMDSET_GET
+        _CUSTOM_CMDSET_HOOK[cls] = custom
+        return custom
+
+
+def _has_cacheable_call_lock(obj):
+    """
+    Check if the result of the object's `call` lock can be cached.
+
+    Args:
+        obj (Object): The object to check.
+
+    Returns:
+        cacheable (bool): If the lock only uses lock functions that
+            don't depend on changeable state of the caller (other than
+            what it holds), like its permissions, Attributes or Tags.
+
+    """
+    global _CACHEABLE_LOCKFUNCS
+    if _CACHEABLE_LOCKFUNCS is None:
+        from evennia.locks import lockfuncs
+        _CACHEABLE_LOCKFUNCS = set(getattr(lockfuncs, name) for name in _CACHEABLE_LOCKFUNC_NAMES)
+    lockdef = obj.locks.locks.get("call")
+    return not lockdef or all(func in _CACHEABLE_LOCKFUNCS for func, _, _ in lockdef[1])
+
+
 class ContentsHandler(object):
     """
     Handles and caches the contents of an object to avoid excessive
     lookups (this is done very often due to cmdhandler needing to look
     for object-cmdsets). It is stored on the 'contents_cache' property
     of the ObjectDB.
+
+    The handler also keeps track of which of the contents provide
+    cmdsets, so the cmdhandler does not need to check every object
+    in a crowded location on every command.
     """
     def __init__(self, obj):
         """
@@ -44,6 +106,10 @@ class ContentsHandler(object):
         self.obj = obj
         self._pkcache = {}
         self._idcache = obj.__class__.__instance_cache__
+        # increased whenever contents or their cmdsets change
+        self.version = 0
+        self._providers = None
+        self._callable = {}
         self.init()
 
     def init(self):
@@ -53,6 +119,18 @@ class ContentsHandler(object):
         """
         self._pkcache.update(dict((obj.pk, None) for obj in
                             ObjectDB.objects.filter(db_location=self.obj) if obj.pk))
+        self.changed()
+
+    def changed(self):
+        """
+        Mark the contents as changed. This is called automatically
+        when objects enter or leave, or when the cmdset of one of the
+        contents change. It invalidates the cached cmdset providers.
+
+        """
+        self.version += 1
+        self._providers = None
+        self._callable = {}
 
     def get(self, exclude=None):
         """
@@ -82,6 +160,80 @@ class ContentsHandler(object):
                 logger.log_err("contents cache failed for %s." % (self.obj.key))
                 return list(ObjectDB.objects.filter(db_location=self.obj))
 
+    def get_cmdset_providers(self, exclude=None, caller=None):
+        """
+        Return the contents that may provide cmdsets to the cmdhandler.
+
+        Args:
+            exclude (Object, optional): Object to ignore.
+            caller (Object, Player or Session, optional): If given, only
+                return objects passing the `call` lock check against
+                `caller` (superusers don't bypass this check).
+
+        Returns:
+            objects (list): The Objects inside this location that either
+                have a non-empty cmdset or which customize their
+                `at_cmdset_get` hook (and so may create one on the fly).
+
+        Notes:
+            The providers are cached until the contents change. The
+            `call`-lock results are cached per caller until the contents
+            (of this location or of the caller) change or any locks are
+            changed. Call locks using lock functions that depend on
+            other state of the caller (like `perm()` or `attr()`) are
+            not cached but checked every time.
+
+        """
+        global _LOCK_CHANGES
+        if not _LOCK_CHANGES:
+            from evennia.locks.lockhandler import lock_changes as _LOCK_CHANGES
+        excl_pk = exclude.pk if exclude else None
+        if caller:
+            cachekey = (caller, excl_pk)
+            # the caller's contents matter to locks like holds()
+            caller_contents = getattr(caller, "contents_cache", None)
+            lock_version = (_LOCK_CHANGES(), caller_contents.version if caller_contents else None)
+            cached = self._callable.get(cachekey)
+            if cached and cached[0] == lock_version:
+                try:
+                    # a passed value of None means the lock must be checked
+                    return [obj for obj, passed in ((self._idcache[pk], passed) for pk, passed in cached[1])
+                            if passed or (passed is None and
+                                          obj.access(caller, access_type='call', no_superuser_bypass=True))]
+                except KeyError:
+                    # an object was flushed from the idmapper cache
+                    self.changed()
+            objs, entries = [], []
+            for obj in self.get_cmdset_providers(exclude=exclude):
+                passed = obj.access(caller, access_type='call', no_superuser_bypass=True)
+                if passed:
+                    objs.append(obj)
+                if not _has_cacheable_call_lock(obj):
+                    entries.append((obj.pk, None))
+                elif passed:
+                    entries.append((obj.pk, True))
+            self._callable[cachekey] = (lock_version, entries)
+            return objs
+
+        if self._providers is not None:
+            try:
+                return [self._idcache[pk] for pk in self._providers if pk != excl_pk]
+            except KeyError:
+                # an object was flushed from the idmapper cache
+                self.changed()
+        providers = []
+        for obj in self.get():
+            if obj._is_deleted:
+                continue
+            if _has_custom_cmdset_hook(obj):
+                providers.append(obj)
+            else:
+                current = obj.cmdset.current
+                if current and current.key != "_EMPTY_CMDSET":
+                    providers.append(obj)
+        self._providers = [obj.pk for obj in providers]
+        return [obj for obj in providers if obj.pk != excl_pk]
+
     def add(self, obj):
         """
         Add a new object to this location
@@ -91,6 +243,7 @@ class ContentsHandler(object):
 
         """
         self._pkcache[obj.pk] = None
+        self.changed()
 
     def remove(self, obj):
         """
@@ -101,6 +254,7 @@ class ContentsHandler(object):
 
         """
         self._pkcache.pop(obj.pk, None)
+        self.changed()
 
     def clear(self):
         """
@@ -295,6 +449,12 @@ class ObjectDB(TypedObject):
             new (bool): Set if this location has not yet been saved before.
 
         """
+        global _SCRIPTS_CHANGED
+        if not _SCRIPTS_CHANGED:
+            from evennia.scripts.scripthandler import scripts_changed as _SCRIPTS_CHANGED
+        # have the object's scripts validated before its next command
+        _SCRIPTS_CHANGED(self)
+
         if not hasattr(self, "_safe_contents_update"):
             # changed/set outside of the location handler
             if new:
@@ -307,6 +467,33 @@ class ObjectDB(TypedObject):
                 logger.log_warn("db_location direct save triggered contents_cache.init() for all objects!")
                 [o.contents_cache.init() for o in self.__dbclass__.get_all_cached_instances()]
 
+    def at_reconcile(self, old_values):
+        """
+        Called after this object was updated with changes saved to the
+        database by another process. If it was moved, this updates the
+        contents caches of its old and new location, like setting
+        `location` does.
+
+        Args:
+            old_values (dict): The previous values of the changed
+                fields, `{fieldname: value}`.
+
+        """
+        if "db_location" not in old_values:
+            super(ObjectDB, self).at_reconcile(old_values)
+            return
+        self._safe_contents_update = True
+        try:
+            super(ObjectDB, self).at_reconcile(old_values)
+        finally:
+            del self._safe_contents_update
+        old_location_id = old_values["db_location"]
+        old_location = ObjectDB.get_cached_instance(old_location_id) if old_location_id else None
+        if old_location and "contents_cache" in old_location.__dict__:
+            old_location.contents_cache.remove(self)
+        if self.db_location:
+            self.db_location.contents_cache.add(self)
+
     class Meta(object):
         "Define Django meta options"
         verbose_name = "Object"
@@ -492,6 +492,30 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
             `at_msg_receive` will be called on this Object.
             All extra kwargs will be passed on to the protocol.
 
+        """
+        sessions = self._msg_sessions(text=text, from_obj=from_obj, session=session, **kwargs)
+
+        kwargs["options"] = options
+
+        # relay to session(s)
+        for session in sessions:
+            session.data_out(text=text, **kwargs)
+
+    def _msg_sessions(self, text=None, from_obj=None, session=None, **kwargs):
+        """
+        Call the message hooks and get the sessions a message should be
+        relayed to. This is used by `msg` as well as when sending the same
+        message to many receivers at once.
+
+        Args:
+            text (str or tuple, optional): The message to send.
+            from_obj (obj, optional): Object that is sending.
+            session (Session or list, optional): Session(s) to relay to.
+
+        Returns:
+            sessions (list): The sessions to relay the message to. Empty
+                if `at_msg_receive` aborted the message.
+
         """
         # try send hooks
         if from_obj:
@@ -502,16 +526,10 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
         try:
             if not self.at_msg_receive(text=text, **kwargs):
                 # if at_msg_receive returns false, we abort message to this object
-                return
+                return []
         except Exception:
             logger.log_trace()
-
-        kwargs["options"] = options
-
-        # relay to session(s)
-        sessions = make_iter(session) if session else self.sessions.all()
-        for session in sessions:
-            session.data_out(text=text, **kwargs)
+        return make_iter(session) if session else self.sessions.all()
 
     def for_contents(self, func, exclude=None, **kwargs):
         """
@@ -550,10 +568,20 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
             Keyword arguments will be passed on to `obj.msg()` for all
             messaged objects.
 
+        Notes:
+            Objects that don't customize `msg()` will have the message
+            sent to all their sessions in one go, see
+            `ServerSessionHandler.msg_multicast`.
+
         """
-        def msg(obj, message, from_obj, **kwargs):
-            obj.msg(message, from_obj=from_obj, **kwargs)
-        self.for_contents(msg, exclude=exclude, from_obj=from_obj, message=message, **kwargs)
+        global _SESSIONS
+        if not _SESSIONS:
+            from evennia.server.sessionhandler import SESSIONS as _SESSIONS
+        contents = self.contents
+        if exclude:
+            exclude = make_iter(exclude)
+            contents = [obj for obj in contents if obj not in exclude]
+        _SESSIONS.msg_multicast(contents, message, from_obj=from_obj, **kwargs)
 
     def move_to(self, destination, quiet=False,
                 emit_to_obj=None, use_destination=True, to_none=False, move_hooks=True):
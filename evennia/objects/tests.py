@@ -0,0 +1,156 @@
+"""
+Unit tests for the object manager search functionality.
+
+"""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from evennia.objects.models import ObjectDB
+from evennia.utils.test_resources import EvenniaTest
+
+
+class TestCandidateSearch(EvenniaTest):
+    def setUp(self):
+        super(TestCandidateSearch, self).setUp()
+        self.obj1.key = "big shiny sword"
+        self.obj2.key = "small shiny sword"
+        self.obj1.aliases.add("blade")
+        self.candidates = self.room1.contents
+
+    def test_exact(self):
+        search = ObjectDB.objects.get_objs_with_key_or_alias
+        self.assertEqual([self.obj1], search("Big Shiny Sword", candidates=self.candidates))
+        self.assertEqual([self.obj1], search("blade", candidates=self.candidates))
+        self.assertEqual([], search("sword", candidates=self.candidates))
+        self.assertEqual([], search("blade", candidates=[self.obj2]))
+
+    def test_duplicate_candidates(self):
+        search = ObjectDB.objects.get_objs_with_key_or_alias
+        candidates = self.candidates + [self.obj1]
+        self.assertEqual([self.obj1], search("blade", candidates=candidates))
+        self.assertEqual([self.obj1], search("big", exact=False, candidates=candidates))
+        self.assertEqual([self.obj1], ObjectDB.objects.object_search("blade", candidates=candidates))
+
+    def test_fuzzy(self):
+        search = ObjectDB.objects.get_objs_with_key_or_alias
+        self.assertEqual(sorted([self.obj1, self.obj2], key=lambda obj: obj.id),
+                         search("sh sw", exact=False, candidates=self.candidates))
+        self.assertEqual([self.obj2], search("sm sw", exact=False, candidates=self.candidates))
+        self.assertEqual([self.obj1], search("bla", exact=False, candidates=self.candidates))
+
+    def test_no_queries(self):
+        ObjectDB.objects.get_objs_with_key_or_alias("blade", candidates=self.candidates)
+        with CaptureQueriesContext(connection) as context:
+            matches = ObjectDB.objects.object_search("2-shiny", exact=False, candidates=self.candidates)
+        self.assertEqual(0, len(context.captured_queries))
+        self.assertEqual(1, len(matches))
+
+
+import cPickle as pickle
+from mock import patch
+from twisted.internet import defer
+from evennia.objects.objects import DefaultRoom
+from evennia.typeclasses.models import get_typeclass, flush_typeclass_cache
+from evennia.utils import utils, dbserialize
+from evennia.utils.dbserialize import to_pickle
+from evennia.utils.idmapper.models import reconcile_cached_instances
+
+
+class TestTypeclassCache(EvenniaTest):
+    def test_get_typeclass(self):
+        flush_typeclass_cache()
+        self.assertTrue(get_typeclass("objects.objects.DefaultRoom", defaultpaths=True) is DefaultRoom)
+        with patch("evennia.typeclasses.models.class_from_module") as mock_import:
+            self.assertTrue(get_typeclass("objects.objects.DefaultRoom", defaultpaths=True) is DefaultRoom)
+            self.assertFalse(mock_import.called)
+        self.assertRaises(ImportError, get_typeclass, "objects.objects.DefaultRoom")
+
+    def test_swap_and_reload(self):
+        self.obj1.swap_typeclass("objects.objects.DefaultRoom")
+        self.assertEqual("evennia.objects.objects.DefaultRoom", self.obj1.typeclass_path)
+        ObjectDB.flush_cached_instance(self.obj1)
+        obj = ObjectDB.objects.get(id=self.obj1.id)
+        self.assertFalse(obj is self.obj1)
+        self.assertTrue(obj.__class__ is DefaultRoom)
+
+
+def _rename(obj, key):
+    "Run by the process pool test"
+    obj.key = key
+    return obj.key
+
+
+def _append(obj):
+    "Run by the process pool test"
+    obj.db.testlist.append(1)
+    return list(obj.db.testlist)
+
+
+class TestProcessReconcile(EvenniaTest):
+    def test_reconcile(self):
+        ObjectDB.objects.filter(id=self.obj1.id).update(db_key="moved", db_location=self.room2)
+        reconcile_cached_instances([("objects.ObjectDB", self.obj1.id)])
+        self.assertEqual("moved", self.obj1.key)
+        self.assertEqual(self.room2, self.obj1.location)
+        self.assertFalse(self.obj1 in self.room1.contents)
+        self.assertTrue(self.obj1 in self.room2.contents)
+
+    def test_reconcile_deleted(self):
+        ObjectDB.objects.filter(id=self.obj2.id).delete()
+        reconcile_cached_instances([("objects.ObjectDB", self.obj2.id)])
+        self.assertIsNone(ObjectDB.get_cached_instance(self.obj2.id))
+
+    def test_run_in_process(self):
+        payload = pickle.dumps((_rename, to_pickle((self.obj1, "renamed")), to_pickle({})))
+        # run the worker side in this process, keeping the test objects cached
+        with patch("evennia.utils.idmapper.models.flush_cache"):
+            with patch("evennia.utils.idmapper.models._IS_SUBPROCESS", True):
+                data = utils._run_in_process(payload)
+        success, result, modified = pickle.loads(data)
+        self.assertTrue(success)
+        self.assertEqual(set([("objects.ObjectDB", self.obj1.id)]), modified)
+        deferred = defer.Deferred()
+        deferred.addCallback(lambda result: setattr(self, "result", result))
+        utils._at_process_return(deferred, data)
+        self.assertEqual("renamed", self.result)
+
+        payload = pickle.dumps((_rename, to_pickle((None, "renamed")), to_pickle({})))
+        with patch("evennia.utils.idmapper.models.flush_cache"):
+            with patch("evennia.utils.idmapper.models._IS_SUBPROCESS", True):
+                data = utils._run_in_process(payload)
+        deferred = defer.Deferred()
+        deferred.addErrback(lambda failure: setattr(self, "failure", failure))
+        utils._at_process_return(deferred, data)
+        self.assertTrue(self.failure.check(AttributeError))
+        self.assertTrue("_rename" in self.failure.value.remote_traceback)
+
+    @patch("twisted.internet.reactor.callFromThread")
+    @patch("evennia.utils.dbserialize._DEFERRED_SAVE", True)
+    def test_run_in_process_deferred_save(self, mock_call):
+        self.obj1.db.testlist = []
+        attr = self.obj1.attributes.get("testlist", return_obj=True)
+        payload = pickle.dumps((_append, to_pickle((self.obj1,)), to_pickle({})))
+        with patch("evennia.utils.idmapper.models.flush_cache"):
+            with patch("evennia.utils.idmapper.models._IS_SUBPROCESS", True):
+                data = utils._run_in_process(payload)
+        success, result, modified = pickle.loads(data)
+        self.assertEqual([1], result)
+        # saved by the worker itself, since it runs no reactor
+        self.assertFalse(dbserialize._DIRTY_ROOTS)
+        self.assertTrue((attr.__dbclass__._meta.label, attr.id) in modified)
+        self.assertEqual([[1]], list(attr.__class__.objects.filter(id=attr.id).values_list("db_value", flat=True)))
+
+    @patch("evennia.utils.utils.logger")
+    def test_reconcile_error(self, mock_logger):
+        payload = pickle.dumps((_rename, to_pickle((self.obj1, "renamed")), to_pickle({})))
+        with patch("evennia.utils.idmapper.models.flush_cache"):
+            with patch("evennia.utils.idmapper.models._IS_SUBPROCESS", True):
+                data = utils._run_in_process(payload)
+        deferred = defer.Deferred()
+        deferred.addCallback(lambda result: setattr(self, "result", result))
+        with patch("evennia.utils.idmapper.models.reconcile_cached_instances") as mock_reconcile:
+            mock_reconcile.side_effect = ValueError
+            utils._at_process_return(deferred, data)
+        # the caller is still called back
+        self.assertEqual("renamed", self.result)
+        self.assertTrue(mock_logger.log_trace.called)
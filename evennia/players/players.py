@@ -403,6 +403,30 @@ class DefaultPlayer(with_metaclass(TypeclassBase, PlayerDB)):
         Kwargs:
             any (dict): All other keywords are passed on to the protocol.
 
+        """
+        sessions = self._msg_sessions(text=text, from_obj=from_obj, session=session, **kwargs)
+
+        kwargs["options"] = options
+
+        # session relay
+        for session in sessions:
+            session.data_out(text=text, **kwargs)
+
+    def _msg_sessions(self, text=None, from_obj=None, session=None, **kwargs):
+        """
+        Call the message hooks and get the sessions a message should be
+        relayed to. This is used by `msg` as well as when sending the same
+        message to many receivers at once.
+
+        Args:
+            text (str, optional): text data to send
+            from_obj (Object or Player, optional): Object sending.
+            session (Session or list, optional): Session(s) to relay to.
+
+        Returns:
+            sessions (list): The sessions to relay the message to. Empty
+                if `at_msg_receive` aborted the message.
+
         """
         if from_obj:
             # call hook
@@ -413,16 +437,10 @@ class DefaultPlayer(with_metaclass(TypeclassBase, PlayerDB)):
         try:
             if not self.at_msg_receive(text=text, **kwargs):
                 # abort message to this player
-                return
+                return []
         except Exception:
             pass
-
-        kwargs["options"] = options
-
-        # session relay
-        sessions = make_iter(session) if session else self.sessions.all()
-        for session in sessions:
-            session.data_out(text=text, **kwargs)
+        return make_iter(session) if session else self.sessions.all()
 
     def execute_cmd(self, raw_string, session=None, **kwargs):
         """
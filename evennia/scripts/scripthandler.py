@@ -4,15 +4,105 @@ make sure they are still relevant. A scripthandler is automatically
 added to all game objects. You access it through the property
 `scripts` on the game object.
 
+The ids of the scripts on each object are kept in an in-memory index,
+updated from the database save/delete signals of the scripts. This
+allows validating an object's scripts without querying the database
+and to skip the validation made before every command unless the
+scripts changed or the object moved since the last one.
+
 """
 from builtins import object
 
+from django.db.models.signals import post_save, post_delete
 from evennia.scripts.models import ScriptDB
 from evennia.utils import create
 from evennia.utils import logger
 
 from django.utils.translation import ugettext as _
 
+# ids of the scripts on each object, {owner: [script ids]}, where
+# owner is `("object", id)` or `("player", id)`
+_SCRIPT_INDEX = {}
+# the owners each indexed script is listed under, {script id: owners}
+_SCRIPT_OWNERS = {}
+# owners whose scripts changed since they were last validated
+_CHANGED = set()
+_OWNER_FIELDS = set(("db_obj", "db_player"))
+
+
+def _get_owner(obj):
+    """
+    Get the index key of a scripted object.
+
+    """
+    return ("player" if obj.__dbclass__.__name__ == "PlayerDB" else "object", obj.id)
+
+
+def _get_script_owners(script):
+    """
+    Get the index keys of the objects a script is stored on.
+
+    """
+    owners = []
+    if script.db_obj_id:
+        owners.append(("object", script.db_obj_id))
+    if script.db_player_id:
+        owners.append(("player", script.db_player_id))
+    return owners
+
+
+def _drop_index(owner):
+    """
+    Remove an object's scripts from the index, to have it reloaded
+    and validated on next use.
+
+    """
+    for script_id in _SCRIPT_INDEX.pop(owner, ()):
+        _SCRIPT_OWNERS.pop(script_id, None)
+    _CHANGED.add(owner)
+
+
+def _at_script_save(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    Signal handler dropping the index of objects that got or lost a
+    script.
+
+    """
+    if not isinstance(instance, ScriptDB):
+        return
+    if not created and update_fields and not _OWNER_FIELDS.intersection(update_fields):
+        return
+    owners = set(_get_script_owners(instance))
+    old_owners = set(_SCRIPT_OWNERS.get(instance.id, ()))
+    if created or owners != old_owners:
+        for owner in owners.union(old_owners):
+            _drop_index(owner)
+
+
+def _at_script_delete(sender, instance, **kwargs):
+    """
+    Signal handler dropping the index of objects losing a script.
+
+    """
+    if isinstance(instance, ScriptDB):
+        for owner in set(_get_script_owners(instance)).union(_SCRIPT_OWNERS.get(instance.id, ())):
+            _drop_index(owner)
+
+post_save.connect(_at_script_save)
+post_delete.connect(_at_script_delete)
+
+
+def scripts_changed(obj):
+    """
+    Mark the scripts of an object as needing validation before its
+    next command. This is called when an object changes location.
+
+    Args:
+        obj (Object or Player): The scripted object.
+
+    """
+    _CHANGED.add(_get_owner(obj))
+
 class ScriptHandler(object):
     """
     Implements the handler.  This sits on each game object.
@@ -136,7 +226,29 @@ class ScriptHandler(object):
         """
         return ScriptDB.objects.get_all_scripts_on_obj(self.obj)
 
-    def validate(self, init_mode=False):
+    def _get_scripts(self):
+        """
+        Get the scripts on this object from the in-memory index,
+        (re)loading the index if needed.
+
+        Returns:
+            scripts (list): The scripts on the object.
+
+        """
+        owner = _get_owner(self.obj)
+        script_ids = _SCRIPT_INDEX.get(owner)
+        if script_ids is not None:
+            scripts = [ScriptDB.get_cached_instance(script_id) for script_id in script_ids]
+            if all(scripts):
+                return scripts
+        # not indexed, or a script was flushed from the cache
+        scripts = list(ScriptDB.objects.get_all_scripts_on_obj(self.obj))
+        _SCRIPT_INDEX[owner] = [script.id for script in scripts]
+        for script in scripts:
+            _SCRIPT_OWNERS[script.id] = _get_script_owners(script)
+        return scripts
+
+    def validate(self, init_mode=False, only_changed=False):
         """
         Runs a validation on this object's scripts only.  This should
         be called regularly to crank the wheels.
@@ -147,6 +259,27 @@ class ScriptHandler(object):
                 - `False` (no init mode). Called during run.
                 - `"reset"` - server reboot. Kill non-persistent scripts
                 - `"reload"` - server reload. Keep non-persistent scripts.
+            only_changed (bool, optional): Only validate if scripts were
+                added to or removed from the object or it changed
+                location since its last validation. This is used before
+                every command.
+
+        Notes:
+            A Script whose `is_valid` depends on other things won't
+            be stopped by an `only_changed` validation. Such Scripts
+            are still validated at every repeat if timed and by the
+            server every hour, or validate explicitly after making
+            a change that affects them.
 
         """
-        ScriptDB.objects.validate(obj=self.obj, init_mode=init_mode)
+        owner = _get_owner(self.obj)
+        if init_mode:
+            _CHANGED.discard(owner)
+            ScriptDB.objects.validate(obj=self.obj, init_mode=init_mode)
+            return
+        if only_changed and owner in _SCRIPT_INDEX and owner not in _CHANGED:
+            return
+        _CHANGED.discard(owner)
+        scripts = self._get_scripts()
+        if scripts:
+            ScriptDB.objects.validate(scripts=scripts)
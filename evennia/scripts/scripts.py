@@ -5,8 +5,11 @@ ability to run timers.
 
 """
 
+import math
+from twisted.internet import reactor
 from twisted.internet.defer import Deferred, maybeDeferred
 from twisted.internet.task import LoopingCall
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils.translation import ugettext as _
 from evennia.typeclasses.models import TypeclassBase
@@ -20,6 +23,8 @@ __all__ = ["DefaultScript", "DoNothing", "Store"]
 
 _GA = object.__getattribute__
 _SESSIONS = None
+_USE_TIMER_WHEEL = settings.SCRIPT_TIMER_WHEEL
+_TIMER_WHEEL = None
 
 class ExtendedLoopingCall(LoopingCall):
     """
@@ -137,6 +142,271 @@ class ExtendedLoopingCall(LoopingCall):
         return None
 
 
+class TimerWheel(object):
+    """
+    A hierarchical timing wheel, used to schedule the repeats of many
+    timers using a single LoopingCall. Time is divided into ticks of
+    `resolution` seconds. Each level of the wheel has `nslots` slots,
+    where one slot in level `n` spans all the slots of level `n-1`.
+    Timers are stored in the lowest level where they fit and are
+    moved down a level as their time approaches, so scheduling and
+    cancelling a timer never depends on how many timers there are.
+
+    """
+
+    def __init__(self, resolution=0.1, nslots=256, nlevels=3, clock=None):
+        """
+        Initialize the wheel.
+
+        Args:
+            resolution (float, optional): Length of one tick in seconds.
+            nslots (int, optional): Number of slots in every level.
+            nlevels (int, optional): Number of levels. Timers further
+                away than `resolution * nslots ** nlevels` seconds
+                are kept in an overflow set.
+            clock (IReactorTime, optional): The clock to use, for testing.
+                Defaults to the reactor.
+
+        """
+        self.resolution = resolution
+        self.nslots = nslots
+        self.spans = [nslots ** level for level in range(nlevels + 1)]
+        self.levels = [[set() for _ in range(nslots)] for _ in range(nlevels)]
+        self.overflow = set()
+        self.clock = clock or reactor
+        self.epoch = self.clock.seconds()
+        self.tick = 0
+        self.ntimers = 0
+        self.task = LoopingCall(self._advance)
+        self.task.clock = self.clock
+
+    def _tick_at(self, seconds, round_up=False):
+        """
+        Get the tick reached at a given time, allowing for float errors.
+        With `round_up`, get the first tick at or after the time instead.
+
+        """
+        ticks = (seconds - self.epoch) / self.resolution
+        return int(math.ceil(ticks - 1e-6) if round_up else math.floor(ticks + 1e-6))
+
+    def _place(self, timer):
+        """
+        Store timer in the slot matching its due tick.
+
+        """
+        due, tick, spans = timer._due_tick, self.tick, self.spans
+        for level, slots in enumerate(self.levels):
+            if due // spans[level + 1] == tick // spans[level + 1]:
+                slot = slots[(due // spans[level]) % self.nslots]
+                break
+        else:
+            slot = self.overflow
+        slot.add(timer)
+        timer._slot = slot
+
+    def schedule(self, timer, delay):
+        """
+        Schedule a timer to fire.
+
+        Args:
+            timer (WheelTask): The timer to fire. Its `_fire` method
+                will be called after `delay` seconds.
+            delay (float): Seconds until the timer fires.
+
+        """
+        if timer._slot is not None:
+            self.cancel(timer)
+        now = self.clock.seconds()
+        if not self.ntimers:
+            # nothing has been moving; catch up without stepping
+            self.tick = self._tick_at(now)
+        timer._due_time = now + delay
+        timer._due_tick = max(self.tick + 1, self._tick_at(timer._due_time, round_up=True))
+        self._place(timer)
+        self.ntimers += 1
+        if not self.task.running:
+            self.task.start(self.resolution, now=False)
+
+    def cancel(self, timer):
+        """
+        Cancel a scheduled timer.
+
+        Args:
+            timer (WheelTask): The timer to remove.
+
+        """
+        if timer._slot is not None:
+            timer._slot.discard(timer)
+            timer._slot = None
+            self.ntimers -= 1
+            if not self.ntimers and self.task.running:
+                self.task.stop()
+
+    def _advance(self):
+        """
+        Step the wheel up to the current time, firing all due timers.
+
+        """
+        target = self._tick_at(self.clock.seconds())
+        spans, nslots = self.spans, self.nslots
+        while self.tick < target and self.ntimers:
+            self.tick += 1
+            tick = self.tick
+            # move timers down from the higher levels as we reach them
+            if tick % spans[-1] == 0:
+                timers, self.overflow = self.overflow, set()
+                for timer in timers:
+                    self._place(timer)
+            for level in range(len(self.levels) - 1, 0, -1):
+                if tick % spans[level] == 0:
+                    slot = self.levels[level][(tick // spans[level]) % nslots]
+                    timers = list(slot)
+                    slot.clear()
+                    for timer in timers:
+                        self._place(timer)
+            slot = self.levels[0][tick % nslots]
+            timers = list(slot)
+            slot.clear()
+            for timer in timers:
+                timer._slot = None
+                self.ntimers -= 1
+            for timer in timers:
+                try:
+                    timer._fire()
+                except Exception:
+                    logger.log_trace()
+        self.tick = max(self.tick, target)
+        if not self.ntimers and self.task.running:
+            self.task.stop()
+
+
+def _get_timer_wheel():
+    """
+    Get the shared TimerWheel used by Scripts, creating it as needed.
+
+    """
+    global _TIMER_WHEEL
+    if not _TIMER_WHEEL:
+        _TIMER_WHEEL = TimerWheel()
+    return _TIMER_WHEEL
+
+
+class WheelTask(object):
+    """
+    Repeating task run by a `TimerWheel`. This has the same API as
+    `ExtendedLoopingCall` but does not use a reactor timer of its own.
+
+    """
+
+    def __init__(self, f, wheel=None):
+        """
+        Args:
+            f (callable): Function to call every repeat.
+            wheel (TimerWheel, optional): The wheel to use. Defaults
+                to the wheel shared by all Scripts.
+
+        """
+        self.f = f
+        self.wheel = wheel or _get_timer_wheel()
+        self.running = False
+        self.interval = None
+        self.callcount = 0
+        self._slot = None
+        self._due_time = None
+        self._due_tick = None
+
+    def start(self, interval, now=True, start_delay=None, count_start=0):
+        """
+        Start running function every interval seconds.
+
+        Args:
+            interval (int): Repeat interval in seconds.
+            now (bool, optional): Whether to start immediately or after
+                `start_delay` seconds.
+            start_delay (int): The number of seconds before starting.
+                If None, wait interval seconds. Only valid if `now` is `False`.
+            count_start (int): Number of repeats to start at.
+
+        Raises:
+            AssertError: if trying to start a task which is already running.
+            ValueError: If interval is set to an invalid value < 0.
+
+        """
+        assert not self.running, "Tried to start an already running WheelTask."
+        if interval < 0:
+            raise ValueError("interval must be >= 0")
+        self.running = True
+        self.interval = interval
+        self.callcount = max(0, count_start)
+        if now:
+            self()
+        else:
+            self.wheel.schedule(self, interval if start_delay is None else max(0, start_delay))
+
+    def _step(self, delay):
+        """
+        Tick one step and schedule the next one after `delay` seconds.
+
+        """
+        self.callcount += 1
+        self.f()
+        if self.running and self._slot is None:
+            # f may have stopped or rescheduled us
+            self.wheel.schedule(self, delay)
+
+    def __call__(self):
+        """
+        Tick one step.
+
+        """
+        self._step(self.interval)
+
+    def _fire(self):
+        """
+        Called by the wheel when the task is due.
+
+        """
+        if self.running:
+            # keep in step with the original schedule, like LoopingCall
+            delay = self._due_time + self.interval - self.wheel.clock.seconds()
+            self._step(delay if delay > 0 else self.interval)
+
+    def stop(self):
+        """
+        Stop the task.
+
+        """
+        assert self.running, "Tried to stop a WheelTask that was not running."
+        self.running = False
+        self.wheel.cancel(self)
+
+    def force_repeat(self):
+        """
+        Force-fire the callback.
+
+        Raises:
+            AssertionError: When trying to force a task that is not
+                running.
+
+        """
+        assert self.running, "Tried to fire a WheelTask that was not running."
+        self.wheel.cancel(self)
+        self()
+
+    def next_call_time(self):
+        """
+        Get the next call time.
+
+        Returns:
+            next (float or None): The time in seconds until the next call.
+                Returns `None` if the task is not running.
+
+        """
+        if self.running and self._due_time is not None:
+            return max(0, self._due_time - self.wheel.clock.seconds())
+        return None
+
+
 class ScriptBase(with_metaclass(TypeclassBase, ScriptDB)):
     """
     Base class for scripts. Don't inherit from this, inherit from the
@@ -173,7 +443,10 @@ class DefaultScript(ScriptBase):
 
         """
 
-        self.ndb._task = ExtendedLoopingCall(self._step_task)
+        if _USE_TIMER_WHEEL:
+            self.ndb._task = WheelTask(self._step_task)
+        else:
+            self.ndb._task = ExtendedLoopingCall(self._step_task)
 
         if self.db._paused_time:
             # the script was paused; restarting
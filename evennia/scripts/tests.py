@@ -40,3 +40,199 @@ class TestScriptDB(TestCase):
         "Can deleted scripts be said to be valid?"
         self.scr.delete()
         self.assertFalse(self.scr.is_valid())  # assertRaises? See issue #509
+
+
+from mock import patch
+from twisted.internet.defer import succeed
+from evennia.scripts import tickerhandler
+
+_TICKED = []
+
+
+def _tick(num):
+    _TICKED.append(num)
+
+
+class TestStaggeredTicker(TestCase):
+    def setUp(self):
+        del _TICKED[:]
+
+    def _make_ticker(self, nsubs):
+        ticker = tickerhandler.Ticker(10)
+        for num in range(nsubs):
+            ticker.add((None, None, "path", 10, str(num), False), num, _callback=_tick, _obj=None)
+        return ticker
+
+    @patch("evennia.scripts.tickerhandler._STAGGER_SLOTS", 4)
+    def test_stagger(self):
+        ticker = self._make_ticker(40)
+        self.assertEqual(4, ticker.nslots)
+        self.assertEqual(2.5, ticker.task.interval)
+        ticker._callback()
+        self.assertTrue(0 < len(_TICKED) < 40)
+        for _ in range(3):
+            ticker._callback()
+        self.assertEqual(list(range(40)), sorted(_TICKED))
+        self.assertEqual(4, ticker.stats["ticks"])
+        ticker.remove((None, None, "path", 10, "5", False))
+        self.assertFalse(any((None, None, "path", 10, "5", False) in slot for slot in ticker.slots))
+        ticker.stop()
+
+    @patch("evennia.scripts.tickerhandler.deferLater", lambda *args: succeed(None))
+    @patch("evennia.scripts.tickerhandler._TIME_BUDGET", 1e-9)
+    def test_time_budget(self):
+        ticker = self._make_ticker(10)
+        ticker._callback()
+        self.assertEqual(list(range(10)), sorted(_TICKED))
+        self.assertTrue(ticker.stats["yields"] > 0)
+        ticker.stop()
+
+
+from evennia.server.models import ServerConfig
+
+
+class TestTickerJournal(TestCase):
+    def setUp(self):
+        self.handler = tickerhandler.TickerHandler(save_name="test_tickers")
+
+    def tearDown(self):
+        self.handler.clear()
+
+    def _nentries(self):
+        return ServerConfig.objects.filter(db_key__startswith="test_tickers_journal_").count()
+
+    def test_journal(self):
+        for num in range(5):
+            self.handler.add(10, _tick, str(num), False, num)
+        self.handler.remove(10, _tick, "2", False)
+        self.assertEqual(None, ServerConfig.objects.conf(key="test_tickers"))
+        self.assertEqual(6, self._nentries())
+
+        handler = tickerhandler.TickerHandler(save_name="test_tickers")
+        handler.restore()
+        self.assertEqual(set(["0", "1", "3", "4"]),
+                         set(store_key[4] for store_key in handler.ticker_storage))
+        self.assertEqual(0, self._nentries())
+        self.assertTrue(ServerConfig.objects.conf(key="test_tickers"))
+        handler.ticker_pool.stop()
+
+    def test_journal_before_restore(self):
+        self.handler.add(10, _tick, "0", False, 0)
+        self.handler.remove(10, _tick, "0", False)
+        # a new handler (as after a restart) changing tickers before restoring
+        handler = tickerhandler.TickerHandler(save_name="test_tickers")
+        handler.add(10, _tick, "0", False, 0)
+        self.assertEqual(3, self._nentries())
+        handler.restore()
+        self.assertEqual(["0"], [store_key[4] for store_key in handler.ticker_storage])
+        handler.ticker_pool.stop()
+
+    @patch("evennia.scripts.tickerhandler._JOURNAL_MIN_COMPACT", 3)
+    def test_compaction(self):
+        for num in range(5):
+            self.handler.add(10, _tick, str(num), False, num)
+        self.assertEqual(1, self._nentries())
+        self.assertEqual(4, len(tickerhandler.dbunserialize(ServerConfig.objects.conf(key="test_tickers"))))
+
+
+from twisted.internet.task import Clock
+from evennia.scripts.scripts import TimerWheel, WheelTask
+
+
+class TestTimerWheel(TestCase):
+    def setUp(self):
+        self.clock = Clock()
+        # a small wheel, to also test cascading and overflow
+        self.wheel = TimerWheel(resolution=0.1, nslots=4, nlevels=2, clock=self.clock)
+        self.calls = {}
+
+    def _task(self, interval, **kwargs):
+        self.calls[interval] = 0
+
+        def func():
+            self.calls[interval] += 1
+        task = WheelTask(func, wheel=self.wheel)
+        task.start(interval, **kwargs)
+        return task
+
+    def _run(self, seconds):
+        for _ in range(int(seconds * 10)):
+            self.clock.advance(0.1)
+
+    def test_repeats(self):
+        self._task(0.3, now=False)
+        self._task(1, now=False)
+        task = self._task(5, now=True)
+        self._run(10.05)
+        self.assertTrue(32 <= self.calls[0.3] <= 34)
+        self.assertEqual(10, self.calls[1])
+        self.assertEqual(3, self.calls[5])
+        self.assertEqual(3, task.callcount)
+        self.assertAlmostEqual(5, task.next_call_time(), delta=0.2)
+
+    def test_stop_force_repeat(self):
+        task = self._task(2, now=False, start_delay=1)
+        self._run(1.05)
+        self.assertEqual(1, self.calls[2])
+        task.force_repeat()
+        self.assertEqual(2, self.calls[2])
+        self.assertAlmostEqual(2, task.next_call_time(), delta=0.1)
+        task.stop()
+        self.assertEqual(None, task.next_call_time())
+        self.assertEqual(0, self.wheel.ntimers)
+        self.assertFalse(self.wheel.task.running)
+        self._run(5)
+        self.assertEqual(2, self.calls[2])
+
+
+class TestTimedScript(TestCase):
+    def setUp(self):
+        self.scr = create_script(DoNothing, interval=10, repeats=3, start_delay=True)
+
+    def tearDown(self):
+        self.scr.stop()
+
+    def test_wheel_task(self):
+        self.assertTrue(isinstance(self.scr.ndb._task, WheelTask))
+        self.assertEqual(10, self.scr.time_until_next_repeat())
+        self.assertEqual(3, self.scr.remaining_repeats())
+        self.scr.force_repeat()
+        self.assertEqual(2, self.scr.remaining_repeats())
+        self.scr.pause()
+        self.assertFalse(self.scr.ndb._task.running)
+        self.assertAlmostEqual(10, self.scr.db._paused_time, delta=1)
+        self.scr.unpause()
+        self.assertEqual(10, self.scr.time_until_next_repeat())
+        self.assertEqual(2, self.scr.remaining_repeats())
+
+
+from evennia.utils.test_resources import EvenniaTest
+
+
+class _RoomScript(DoNothing):
+    "Only valid in the room it was started in"
+    def at_script_creation(self):
+        self.key = "room_script"
+        self.db.room = self.obj.location
+
+    def is_valid(self):
+        return self.obj.location == self.db.room
+
+
+class TestScriptHandler(EvenniaTest):
+    def test_validate_only_changed(self):
+        self.char1.scripts.validate(only_changed=True)
+        with self.assertNumQueries(0):
+            self.char1.scripts.validate(only_changed=True)
+        self.char1.scripts.add(_RoomScript)
+        self.assertEqual(["room_script"], [script.key for script in self.char1.scripts._get_scripts()])
+        self.char1.scripts.validate(only_changed=True)
+        with self.assertNumQueries(0):
+            self.char1.scripts.validate(only_changed=True)
+            self.char1.scripts.validate()
+        self.assertTrue(self.char1.scripts.get("room_script"))
+        # moving flags the scripts for validation
+        self.char1.move_to(self.room2, quiet=True)
+        self.char1.scripts.validate(only_changed=True)
+        self.assertFalse(self.char1.scripts.get("room_script"))
+        self.assertEqual([], self.char1.scripts._get_scripts())
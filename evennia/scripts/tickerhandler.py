@@ -67,8 +67,12 @@ call the handler's `save()` and `restore()` methods when the server reboots.
 """
 import inspect
 from builtins import object
+from time import time
 
+from twisted.internet import reactor
 from twisted.internet.defer import inlineCallbacks
+from twisted.internet.task import deferLater
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from evennia.scripts.scripts import ExtendedLoopingCall
 from evennia.server.models import ServerConfig
@@ -79,6 +83,11 @@ from evennia.utils import variable_from_module
 _GA = object.__getattribute__
 _SA = object.__setattr__
 
+_STAGGER_SLOTS = settings.TICKERHANDLER_STAGGER_SLOTS
+_TIME_BUDGET = settings.TICKERHANDLER_TIME_BUDGET
+_MIN_SLOT_INTERVAL = 0.1  # never tick slots more often than this (seconds)
+_JOURNAL_MIN_COMPACT = 100  # smallest journal size to compact
+
 
 _ERROR_ADD_TICKER = \
 """TickerHandler: Tried to add an invalid ticker:
@@ -108,11 +117,27 @@ class Ticker(object):
         The _hook_key, which is passed down through the handler via
         kwargs is used here to identify which hook method to call.
 
+        If the subscriptions are staggered over several slots, each call
+        only handles the subscriptions in the next slot. If
+        `settings.TICKERHANDLER_TIME_BUDGET` is set, the loop will let the
+        reactor handle other events whenever the budget is used up.
+
         """
         self._to_add = []
         self._to_remove = []
         self._is_ticking = True
-        for store_key, (args, kwargs) in self.subscriptions.iteritems():
+        start = slice_start = time()
+        if self.nslots > 1:
+            subscriptions = self.slots[self.slot].items()
+            self.slot = (self.slot + 1) % self.nslots
+        else:
+            subscriptions = self.subscriptions.items()
+        for store_key, (args, kwargs) in subscriptions:
+            if _TIME_BUDGET and time() - slice_start > _TIME_BUDGET:
+                # give the reactor a chance to do other work
+                self.stats["yields"] += 1
+                yield deferLater(reactor, 0, lambda: None)
+                slice_start = time()
             callback = yield kwargs.pop("_callback", "at_tick")
             obj = yield kwargs.pop("_obj", None)
             try:
@@ -136,6 +161,15 @@ class Ticker(object):
                 # make sure to re-store
                 kwargs["_callback"] = callback
                 kwargs["_obj"] = obj
+        # update metrics
+        duration = time() - start
+        stats = self.stats
+        stats["ticks"] += 1
+        stats["duration"] = duration
+        stats["max_duration"] = max(stats["max_duration"], duration)
+        if duration > self.interval / float(self.nslots):
+            # we did not finish before the next tick was due
+            stats["overruns"] += 1
         # cleanup - we do this here to avoid changing the subscription dict while it loops
         self._is_ticking = False
         for store_key in self._to_remove:
@@ -156,6 +190,12 @@ class Ticker(object):
         """
         self.interval = interval
         self.subscriptions = {}
+        # staggered slots, each a dict like subscriptions
+        self.nslots = max(1, min(_STAGGER_SLOTS or 1, int(interval / _MIN_SLOT_INTERVAL)))
+        self.slots = [{} for _ in range(self.nslots)]
+        self.slot = 0
+        self.stats = {"ticks": 0, "duration": 0.0, "max_duration": 0.0,
+                      "overruns": 0, "yields": 0}
         self._is_ticking = False
         self._to_remove = []
         self._to_add = []
@@ -176,7 +216,8 @@ class Ticker(object):
             if not subs:
                 self.task.stop()
         elif subs:
-            self.task.start(self.interval, now=False, start_delay=start_delay)
+            self.task.start(self.interval / float(self.nslots), now=False,
+                            start_delay=start_delay)
 
     def add(self, store_key, *args, **kwargs):
         """
@@ -198,6 +239,8 @@ class Ticker(object):
         else:
             start_delay = kwargs.pop("_start_delay", None)
             self.subscriptions[store_key] = (args, kwargs)
+            if self.nslots > 1:
+                self.slots[hash(store_key) % self.nslots][store_key] = (args, kwargs)
             self.validate(start_delay=start_delay)
 
     def remove(self, store_key):
@@ -214,6 +257,8 @@ class Ticker(object):
             self._to_remove.append(store_key)
         else:
             self.subscriptions.pop(store_key, False)
+            if self.nslots > 1:
+                self.slots[hash(store_key) % self.nslots].pop(store_key, False)
             self.validate()
 
     def stop(self):
@@ -222,6 +267,7 @@ class Ticker(object):
 
         """
         self.subscriptions = {}
+        self.slots = [{} for _ in range(self.nslots)]
         self.validate()
 
 
@@ -310,6 +356,9 @@ class TickerHandler(object):
         self.ticker_storage = {}
         self.save_name = save_name
         self.ticker_pool = self.ticker_pool_class()
+        self._journal_prefix = "%s_journal_" % save_name
+        # counted on first use, since entries may remain from before a restart
+        self._journal_size = None
 
     def _get_callback(self, callback):
         """
@@ -375,12 +424,44 @@ class TickerHandler(object):
         outpath = path if path and isinstance(path, basestring) else None
         return (packed_obj, methodname, outpath, interval, idstring, persistent)
 
+    def _journal(self, *entry):
+        """
+        Persist a single change to the ticker storage by appending it to
+        a journal of changes, without re-saving all tickers. Once the
+        journal grows to half the size of the storage, everything is
+        compacted into one full save.
+
+        Args:
+            entry (tuple): Either `("add", store_key, args, kwargs)` or
+                `("remove", store_key)`.
+
+        """
+        if self._journal_size is None:
+            self._journal_size = ServerConfig.objects.filter(
+                db_key__startswith=self._journal_prefix).count()
+        if self._journal_size >= max(_JOURNAL_MIN_COMPACT, len(self.ticker_storage) // 2):
+            # ticker_storage already includes this change
+            self.save()
+        else:
+            ServerConfig.objects.conf(key="%s%i" % (self._journal_prefix, self._journal_size),
+                                      value=dbserialize(entry))
+            self._journal_size += 1
+
+    def _clear_journal(self):
+        """
+        Delete all journal entries from the database.
+
+        """
+        ServerConfig.objects.filter(db_key__startswith=self._journal_prefix).delete()
+        self._journal_size = 0
+
     def save(self):
         """
         Save ticker_storage as a serialized string into a temporary
         ServerConf field. Whereas saving is done on the fly, if called
         by server when it shuts down, the current timer of each ticker
-        will be saved so it can start over from that point.
+        will be saved so it can start over from that point. This also
+        compacts the journal of changes made since the last save.
 
         """
         if self.ticker_storage:
@@ -403,6 +484,7 @@ class TickerHandler(object):
         else:
             # make sure we have nothing lingering in the database
             ServerConfig.objects.conf(key=self.save_name, delete=True)
+        self._clear_journal()
 
     def restore(self, server_reload=True):
         """
@@ -418,10 +500,20 @@ class TickerHandler(object):
         """
         # load stored command instructions and use them to re-initialize handler
         restored_tickers = ServerConfig.objects.conf(key=self.save_name)
+        # the dbunserialize will convert all serialized dbobjs to real objects
+        restored_tickers = dbunserialize(restored_tickers) if restored_tickers else {}
+        # apply the changes made since the last full save, in order
+        journal = ServerConfig.objects.filter(db_key__startswith=self._journal_prefix).order_by("id")
+        for conf in journal:
+            try:
+                entry = dbunserialize(conf.value)
+                if entry[0] == "add":
+                    restored_tickers[entry[1]] = (entry[2], entry[3])
+                else:
+                    restored_tickers.pop(entry[1], None)
+            except Exception:
+                log_trace("Tickerhandler: Skipping malformed journal entry %s." % conf.key)
         if restored_tickers:
-            # the dbunserialize will convert all serialized dbobjs to real objects
-
-            restored_tickers = dbunserialize(restored_tickers)
             self.ticker_storage = {}
             for store_key, (args, kwargs) in restored_tickers.iteritems():
                 try:
@@ -457,6 +549,9 @@ class TickerHandler(object):
                 # if we get here we should create a new ticker
                 self.ticker_storage[store_key] = (args, kwargs)
                 self.ticker_pool.add(store_key, *args, **kwargs)
+        if journal:
+            # compact the journal into the main storage
+            self.save()
 
     def add(self, interval=60, callback=None, idstring="", persistent=True, *args, **kwargs):
         """
@@ -499,7 +594,7 @@ class TickerHandler(object):
         kwargs["_callback"] = callfunc # either method-name or callable
         self.ticker_storage[store_key] = (args, kwargs)
         self.ticker_pool.add(store_key, *args, **kwargs)
-        self.save()
+        self._journal("add", store_key, args, kwargs)
 
     def remove(self, interval=60, callback=None, idstring="", persistent=True):
         """
@@ -522,7 +617,7 @@ class TickerHandler(object):
         to_remove = self.ticker_storage.pop(store_key, None)
         if to_remove:
             self.ticker_pool.remove(store_key)
-            self.save()
+            self._journal("remove", store_key)
 
     def clear(self, interval=None):
         """
@@ -569,6 +664,26 @@ class TickerHandler(object):
             if ticker:
                 return {interval: ticker.subscriptions}
 
+    def stats(self):
+        """
+        Get the run statistics of all tickers.
+
+        Returns:
+            stats (dict): A dict `{interval: stats, ...}`, where `stats` is
+                a dict with the number of subscriptions (`subscriptions`),
+                the number of staggered slots (`slots`), the number of
+                `ticks` run, the `duration` in seconds of the latest tick and
+                the `max_duration` of any tick, the number of `overruns`
+                (ticks that were not done in time for the next one) and the
+                number of `yields` to the reactor due to the time budget.
+
+        """
+        stats = {}
+        for interval, ticker in self.ticker_pool.tickers.iteritems():
+            stats[interval] = dict(ticker.stats, subscriptions=len(ticker.subscriptions),
+                                   slots=ticker.nslots)
+        return stats
+
     def all_display(self):
         """
         Get all tickers on an easily displayable form.
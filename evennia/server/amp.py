@@ -28,8 +28,9 @@ try:
 except ImportError:
     import pickle
 from twisted.protocols import amp
-from twisted.internet import protocol
+from twisted.internet import protocol, reactor
 from twisted.internet.defer import Deferred
+from django.conf import settings
 from evennia.utils import logger
 from evennia.utils.utils import to_str, variable_from_module
 
@@ -55,6 +56,12 @@ AMP_MAXLEN = amp.MAX_VALUE_LENGTH    # max allowed data length in AMP protocol (
 BATCH_RATE = 250    # max commands/sec before switching to batch-sending
 BATCH_TIMEOUT = 0.5 # how often to poll to empty batch queue, in seconds
 
+# message batching and compression
+_BATCH_WINDOW = settings.AMP_BATCH_WINDOW
+_COMPRESSION_LEVEL = settings.AMP_COMPRESSION_LEVEL
+_COMPRESSION_THRESHOLD = settings.AMP_COMPRESSION_THRESHOLD
+_RAW, _ZLIB = chr(0), chr(1)  # wire prefix marking compressed data
+
 # buffers
 _SENDBATCH = defaultdict(list)
 _MSGBUFFER = defaultdict(list)
@@ -210,7 +217,7 @@ class Compressed(amp.String):
     def fromBox(self, name, strings, objects, proto):
         """
         Converts from box representation to python. We
-        group very long data into batches.
+        group very long data into batches and decompress it.
         """
         value = StringIO()
         value.write(strings.get(name))
@@ -220,14 +227,14 @@ class Compressed(amp.String):
             if chunk is None:
                 break
             value.write(chunk)
-        objects[name] = value.getvalue()
+        objects[name] = self.fromString(value.getvalue())
 
     def toBox(self, name, strings, objects, proto):
         """
-        Convert from data to box. We handled too-long
-        batched data and put it together here.
+        Convert from data to box. We compress the data and
+        split too-long data into batches here.
         """
-        value = StringIO(objects[name])
+        value = StringIO(self.toString(objects[name]))
         strings[name] = value.read(AMP_MAXLEN)
         for counter in count(2):
             chunk = value.read(AMP_MAXLEN)
@@ -237,15 +244,21 @@ class Compressed(amp.String):
 
     def toString(self, inObject):
         """
-        Convert to send on the wire, with compression.
+        Convert to send on the wire, with compression. Data shorter
+        than `settings.AMP_COMPRESSION_THRESHOLD` is not compressed,
+        since it is faster to send as-is.
         """
-        return zlib.compress(inObject, 9)
+        if _COMPRESSION_LEVEL and len(inObject) >= _COMPRESSION_THRESHOLD:
+            return _ZLIB + zlib.compress(inObject, _COMPRESSION_LEVEL)
+        return _RAW + inObject
 
     def fromString(self, inString):
         """
         Convert (decompress) from the wire to Python.
         """
-        return zlib.decompress(inString)
+        if inString[:1] == _ZLIB:
+            return zlib.decompress(inString[1:])
+        return inString[1:]
 
 
 class MsgPortal2Server(amp.Command):
@@ -270,6 +283,28 @@ class MsgServer2Portal(amp.Command):
     response = []
 
 
+class MsgBatchPortal2Server(amp.Command):
+    """
+    Batch of messages Portal -> Server
+
+    """
+    key = "MsgBatchPortal2Server"
+    arguments = [('packed_data', Compressed())]
+    errors = [(Exception, 'EXCEPTION')]
+    response = []
+
+
+class MsgBatchServer2Portal(amp.Command):
+    """
+    Batch of messages Server -> Portal
+
+    """
+    key = "MsgBatchServer2Portal"
+    arguments = [('packed_data', Compressed())]
+    errors = [(Exception, 'EXCEPTION')]
+    response = []
+
+
 class AdminPortal2Server(amp.Command):
     """
     Administration Portal -> Server
@@ -315,6 +350,10 @@ class FunctionCall(amp.Command):
     response = [('result', amp.String())]
 
 
+# commands whose messages are buffered and sent together
+_BATCH_COMMANDS = {MsgPortal2Server: MsgBatchPortal2Server,
+                   MsgServer2Portal: MsgBatchServer2Portal}
+
 # Helper functions for pickling.
 
 dumps = lambda data: to_str(pickle.dumps(to_str(data), pickle.HIGHEST_PROTOCOL))
@@ -400,13 +439,45 @@ class AMPProtocol(amp.AMP):
 
         Notes:
             Data will be sent across the wire pickled as a tuple
-            (sessid, kwargs).
-
-        """
+            (sessid, kwargs). Messages are buffered and sent together
+            at the end of the current reactor tick (or after
+            `settings.AMP_BATCH_WINDOW` seconds), in which case `None`
+            is returned. Other commands are sent immediately, after
+            first sending any buffered messages to keep the order.
+
+        """
+        if _BATCH_WINDOW is not None and command in _BATCH_COMMANDS:
+            _SENDBATCH[command].append((sessid, kwargs))
+            if not self.send_task:
+                self.send_task = reactor.callLater(_BATCH_WINDOW, self.send_batch)
+            return None
+        if _SENDBATCH:
+            self.send_batch()
         return self.callRemote(command,
                                packed_data=dumps((sessid, kwargs))
                                ).addErrback(self.errback, command.key)
 
+    def send_batch(self):
+        """
+        Send all buffered messages across the wire, as one AMP
+        call for each command type.
+
+        """
+        if self.send_task and self.send_task.active():
+            self.send_task.cancel()
+        self.send_task = None
+        for command in list(_SENDBATCH):
+            batch = _SENDBATCH.pop(command)
+            if len(batch) == 1:
+                self.callRemote(command,
+                                packed_data=dumps(batch[0])
+                                ).addErrback(self.errback, command.key)
+            else:
+                batch_command = _BATCH_COMMANDS[command]
+                self.callRemote(batch_command,
+                                packed_data=dumps(batch)
+                                ).addErrback(self.errback, batch_command.key)
+
     # Message definition + helper methods to call/create each message type
 
     # Portal -> Server Msg
@@ -425,6 +496,28 @@ class AMPProtocol(amp.AMP):
         self.factory.server.sessions.data_in(self.factory.server.sessions[sessid], **kwargs)
         return {}
 
+    @MsgBatchPortal2Server.responder
+    def server_receive_msgbatchportal2server(self, packed_data):
+        """
+        Receives a batch of messages arriving to server. This method
+        is executed on the Server.
+
+        Args:
+            packed_data (str): Data to receive (a pickled list of
+                tuples (sessid, kwargs))
+
+        """
+        sessions = self.factory.server.sessions
+        for sessid, kwargs in loads(packed_data):
+            # a failing message must not stop the rest of the batch
+            try:
+                session = sessions.get(sessid)
+                if session:
+                    sessions.data_in(session, **kwargs)
+            except Exception:
+                logger.log_trace()
+        return {}
+
     def send_MsgPortal2Server(self, session, **kwargs):
         """
         Access method called by the Portal and executed on the Portal.
@@ -451,9 +544,49 @@ class AMPProtocol(amp.AMP):
             packed_data (str): Pickled data (sessid, kwargs) coming over the wire.
         """
         sessid, kwargs = loads(packed_data)
-        self.factory.portal.sessions.data_out(self.factory.portal.sessions[sessid], **kwargs)
+        self._portal_data_out(sessid, kwargs)
         return {}
 
+    def _portal_data_out(self, sessid, kwargs):
+        """
+        Relay data to one or more Portal sessions. This is executed
+        on the Portal.
+
+        Args:
+            sessid (int or list): Session id, or a list of ids for
+                data multicast to many sessions.
+            kwargs (dict): The data to send.
+
+        """
+        sessions = self.factory.portal.sessions
+        if isinstance(sessid, list):
+            for sessid in sessid:
+                session = sessions.get(sessid)
+                if session:
+                    sessions.data_out(session, **kwargs)
+        else:
+            session = sessions.get(sessid)
+            if session:
+                sessions.data_out(session, **kwargs)
+
+
+    @MsgBatchServer2Portal.responder
+    def portal_receive_batchserver2portal(self, packed_data):
+        """
+        Receives a batch of messages arriving to Portal from Server.
+        This method is executed on the Portal.
+
+        Args:
+            packed_data (str): Pickled list of tuples (sessid, kwargs)
+                coming over the wire.
+        """
+        for sessid, kwargs in loads(packed_data):
+            # a failing message must not stop the rest of the batch
+            try:
+                self._portal_data_out(sessid, kwargs)
+            except Exception:
+                logger.log_trace()
+        return {}
 
     def send_MsgServer2Portal(self, session, **kwargs):
         """
@@ -461,10 +594,13 @@ class AMPProtocol(amp.AMP):
             to Portal.
 
         Args:
-            session (Session): Unique Session.
+            session (Session or list): Unique Session, or a list of
+                Sessions to send the same data to.
             kwargs (any, optiona): Extra data.
 
         """
+        if isinstance(session, list):
+            return self.send_data(MsgServer2Portal, [sess.sessid for sess in session], **kwargs)
         return self.send_data(MsgServer2Portal, session.sessid, **kwargs)
 
     # Server administration from the Portal side
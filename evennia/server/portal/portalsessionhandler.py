@@ -16,13 +16,103 @@ _MOD_IMPORT = None
 
 # throttles
 _MAX_CONNECTION_RATE = float(settings.MAX_CONNECTION_RATE)
+_MAX_CONNECTION_BURST = max(1.0, float(settings.MAX_CONNECTION_BURST))
 _MAX_COMMAND_RATE = float(settings.MAX_COMMAND_RATE)
+_MAX_SESSION_COMMAND_RATE = float(settings.MAX_SESSION_COMMAND_RATE)
+_MAX_SESSION_COMMAND_BURST = max(1.0, float(settings.MAX_SESSION_COMMAND_BURST))
+_MAX_SESSION_COMMAND_QUEUE = settings.MAX_SESSION_COMMAND_QUEUE
 
 _MIN_TIME_BETWEEN_CONNECTS = 1.0 / float(settings.MAX_CONNECTION_RATE)
 _ERROR_COMMAND_OVERFLOW = settings.COMMAND_RATE_WARNING
 
 _CONNECTION_QUEUE = deque()
 
+
+class TokenBucket(object):
+    """
+    Rate limiter allowing an average of `rate` events per second, with
+    bursts of up to `burst` events.
+
+    """
+    def __init__(self, rate, burst):
+        """
+        Args:
+            rate (float): Tokens added per second. If <= 0, the
+                bucket never runs out.
+            burst (float): Maximum number of tokens stored.
+
+        """
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time()
+
+    def _refill(self, now):
+        if self.tokens < self.burst:
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def ready(self, now):
+        """
+        Check if there is a token available.
+
+        Args:
+            now (float): The current time.
+
+        Returns:
+            ready (bool): If a token can be taken.
+
+        """
+        if self.rate <= 0:
+            return True
+        self._refill(now)
+        return self.tokens >= 1
+
+    def take(self, now):
+        """
+        Take a token, if available.
+
+        Args:
+            now (float): The current time.
+
+        Returns:
+            taken (bool): If a token was taken.
+
+        """
+        if self.ready(now):
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait(self, now):
+        """
+        Get the time until a token is available.
+
+        Args:
+            now (float): The current time.
+
+        Returns:
+            wait (float): Seconds to wait.
+
+        """
+        if self.ready(now):
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class InputThrottle(object):
+    """
+    The input throttle of a Session. This holds its token bucket, the
+    queue of input waiting to be relayed to the Server and statistics.
+
+    """
+    def __init__(self):
+        self.bucket = TokenBucket(_MAX_SESSION_COMMAND_RATE, _MAX_SESSION_COMMAND_BURST)
+        self.queue = deque()
+        self.scheduled = False
+        self.warned = False
+        self.stats = {"relayed": 0, "queued": 0, "dropped": 0}
+
 #------------------------------------------------------------
 # Portal-SessionHandler class
 #------------------------------------------------------------
@@ -49,11 +139,15 @@ class PortalSessionHandler(SessionHandler):
         self.uptime = time()
         self.connection_time = 0
 
-        self.connection_last = time()
+        self.connection_bucket = TokenBucket(_MAX_CONNECTION_RATE, _MAX_CONNECTION_BURST)
         self.connection_task = None
-        self.command_counter = 0
-        self.command_counter_reset = time()
-        self.command_overflow = False
+
+        # input throttling, {sessid: InputThrottle}
+        self.throttles = {}
+        self.command_bucket = TokenBucket(_MAX_COMMAND_RATE, max(1.0, _MAX_COMMAND_RATE))
+        # sessids with queued input, in relay order
+        self.input_schedule = deque()
+        self.input_task = None
 
     def at_server_connection(self):
         """
@@ -62,6 +156,8 @@ class PortalSessionHandler(SessionHandler):
 
         """
         self.connection_time = time()
+        # admit connections that arrived while the Server was away
+        self.admit_connections()
 
     def connect(self, session):
         """
@@ -76,7 +172,12 @@ class PortalSessionHandler(SessionHandler):
             We implement a throttling mechanism here to limit the speed at
             which new connections are accepted - this is both a stop
             against DoS attacks as well as helps using the Dummyrunner
-            tester with a large number of connector dummies.
+            tester with a large number of connector dummies. Up to
+            `MAX_CONNECTION_BURST` connections are accepted at once,
+            after which they are queued and accepted at
+            `MAX_CONNECTION_RATE` per second. Sessions that were already
+            connected are not affected by this when the Server reloads;
+            they are all resynced at once when it reconnects.
 
         """
         global _CONNECTION_QUEUE
@@ -87,25 +188,24 @@ class PortalSessionHandler(SessionHandler):
             session.sessid = self.latest_sessid
             session.server_connected = False
             _CONNECTION_QUEUE.appendleft(session)
-            if len(_CONNECTION_QUEUE) > 1:
-                session.data_out(text=[["%s DoS protection is active. You are queued to connect in %g seconds ..." % (
-                                 settings.SERVERNAME,
-                                 len(_CONNECTION_QUEUE)*_MIN_TIME_BETWEEN_CONNECTS)],{}])
-        now = time()
-        if (now - self.connection_last < _MIN_TIME_BETWEEN_CONNECTS) or not self.portal.amp_protocol:
-            if not session or not self.connection_task:
-                self.connection_task = reactor.callLater(_MIN_TIME_BETWEEN_CONNECTS, self.connect, None)
-            self.connection_last = now
+        self.admit_connections()
+        if session and _CONNECTION_QUEUE and _CONNECTION_QUEUE[0] is session:
+            session.data_out(text=[["%s DoS protection is active. You are queued to connect in %g seconds ..." % (
+                             settings.SERVERNAME,
+                             len(_CONNECTION_QUEUE)*_MIN_TIME_BETWEEN_CONNECTS)],{}])
+
+    def admit_connections(self):
+        """
+        Sync queued sessions with the Server as fast as the connection
+        rate allows, and schedule the rest to be admitted later.
+
+        """
+        global _CONNECTION_QUEUE
+        if not (self.portal and self.portal.amp_protocol):
+            # retried when the Server connects
             return
-        elif not session:
-            if _CONNECTION_QUEUE:
-                # keep launching tasks until queue is empty
-                self.connection_task = reactor.callLater(_MIN_TIME_BETWEEN_CONNECTS, self.connect, None)
-            else:
-                self.connection_task = None
-        self.connection_last = now
-
-        if _CONNECTION_QUEUE:
+        now = time()
+        while _CONNECTION_QUEUE and self.connection_bucket.take(now):
             # sync with server-side
             session = _CONNECTION_QUEUE.pop()
             sessdata = session.get_sync_data()
@@ -115,6 +215,10 @@ class PortalSessionHandler(SessionHandler):
             self.portal.amp_protocol.send_AdminPortal2Server(session,
                                                              operation=PCONN,
                                                              sessiondata=sessdata)
+        if _CONNECTION_QUEUE and not (self.connection_task and self.connection_task.active()):
+            # keep launching tasks until queue is empty
+            self.connection_task = reactor.callLater(self.connection_bucket.wait(now),
+                                                     self.admit_connections)
 
     def sync(self, session):
         """
@@ -160,6 +264,8 @@ class PortalSessionHandler(SessionHandler):
             # to forward this to the Server, so now we just remove it.
             _CONNECTION_QUEUE.remove(session)
             return
+        # drop any queued input
+        self.throttles.pop(session.sessid, None)
         self.portal.amp_protocol.send_AdminPortal2Server(session,
                                                          operation=PDISCONN)
 
@@ -209,6 +315,7 @@ class PortalSessionHandler(SessionHandler):
             if session.sessid in self:
                 # in case sess.disconnect doesn't delete it
                 del self[session.sessid]
+            self.throttles.pop(session.sessid, None)
             del session
 
     def server_disconnect_all(self, reason=""):
@@ -222,6 +329,7 @@ class PortalSessionHandler(SessionHandler):
         for session in self.values():
             session.disconnect(reason)
             del session
+        self.throttles = {}
         self = {}
 
     def server_logged_in(self, session, data):
@@ -304,6 +412,27 @@ class PortalSessionHandler(SessionHandler):
         for session in self.values():
             self.data_out(session, text=[[message],{}])
 
+    def get_input_stats(self, session):
+        """
+        Get the input throttling statistics of a session.
+
+        Args:
+            session (PortalSession): The session to check.
+
+        Returns:
+            stats (dict): The number of inputs `relayed` to the Server,
+                `queued` because they came too fast and `dropped`
+                because the queue was full, as well as the current
+                queue `depth`.
+
+        """
+        throttle = self.throttles.get(session.sessid)
+        if not throttle:
+            return {"relayed": 0, "queued": 0, "dropped": 0, "depth": 0}
+        stats = dict(throttle.stats)
+        stats["depth"] = len(throttle.queue)
+        return stats
+
     def data_in(self, session, **kwargs):
         """
         Called by portal sessions for relaying data coming
@@ -318,36 +447,90 @@ class PortalSessionHandler(SessionHandler):
         Notes:
             Data is serialized before passed on.
 
+            Each session may send `MAX_SESSION_COMMAND_RATE` inputs per
+            second on average and all sessions together
+            `MAX_COMMAND_RATE`. Input above these rates is queued per
+            session and relayed in turn by `relay_queued_input`.
+
         """
         #from evennia.server.profiling.timetrace import timetrace
         #text = timetrace(text, "portalsessionhandler.data_in")
 
         if session:
             now = time()
-            if self.command_counter > _MAX_COMMAND_RATE:
-                # data throttle (anti DoS measure)
-                dT = now - self.command_counter_reset
-                self.command_counter = 0
-                self.command_counter_reset = now
-                self.command_overflow = dT < 1.0
-                if self.command_overflow:
-                    reactor.callLater(1.0, self.data_in, None)
-            if self.command_overflow:
-                self.data_out(session, text=[[_ERROR_COMMAND_OVERFLOW],{}])
-                return
+            throttle = self.throttles.get(session.sessid)
+            if not throttle:
+                throttle = self.throttles[session.sessid] = InputThrottle()
+
             # scrub data
             kwargs = self.clean_senddata(session, kwargs)
-
-            # relay data to Server
-            self.command_counter += 1
             session.cmd_last = now
-            self.portal.amp_protocol.send_MsgPortal2Server(session,
-                                                           **kwargs)
-        else:
-           # called by the callLater callback
-            if self.command_overflow:
-                self.command_overflow = False
-                reactor.callLater(1.0, self.data_in, None)
+
+            if (not throttle.queue and self.command_bucket.ready(now)
+                    and throttle.bucket.take(now)):
+                # relay data to Server
+                self.command_bucket.take(now)
+                throttle.stats["relayed"] += 1
+                self.portal.amp_protocol.send_MsgPortal2Server(session,
+                                                               **kwargs)
+                return
+
+            # data throttle (anti DoS measure)
+            if len(throttle.queue) >= _MAX_SESSION_COMMAND_QUEUE:
+                throttle.stats["dropped"] += 1
+                if not throttle.warned:
+                    throttle.warned = True
+                    self.data_out(session, text=[[_ERROR_COMMAND_OVERFLOW],{}])
+                return
+            throttle.queue.append(kwargs)
+            throttle.stats["queued"] += 1
+            if not throttle.scheduled:
+                throttle.scheduled = True
+                self.input_schedule.append(session.sessid)
+            if not self.input_task:
+                self.input_task = reactor.callLater(0, self.relay_queued_input)
+
+    def relay_queued_input(self):
+        """
+        Relay queued input to the Server, taking one input from each
+        session in turn for as long as the rate limits allow, then
+        reschedule for when more can be relayed.
+
+        """
+        self.input_task = None
+        now = time()
+        schedule = self.input_schedule
+        relayed = True
+        while schedule and relayed and self.command_bucket.ready(now):
+            # one round over the sessions with queued input
+            relayed = False
+            for _ in range(len(schedule)):
+                if not self.command_bucket.ready(now):
+                    break
+                sessid = schedule.popleft()
+                session = self.get(sessid)
+                throttle = self.throttles.get(sessid)
+                if not (session and throttle):
+                    # disconnected
+                    continue
+                if throttle.bucket.take(now):
+                    self.command_bucket.take(now)
+                    kwargs = throttle.queue.popleft()
+                    throttle.stats["relayed"] += 1
+                    relayed = True
+                    self.portal.amp_protocol.send_MsgPortal2Server(session,
+                                                                   **kwargs)
+                if throttle.queue:
+                    schedule.append(sessid)
+                else:
+                    throttle.scheduled = False
+                    throttle.warned = False
+        if schedule:
+            delay = self.command_bucket.wait(now)
+            if not delay:
+                delay = min([throttle.bucket.wait(now) for throttle in
+                             (self.throttles.get(sessid) for sessid in schedule) if throttle] or [0])
+            self.input_task = reactor.callLater(delay, self.relay_queued_input)
 
     def data_out(self, session, **kwargs):
         """
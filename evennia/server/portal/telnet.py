@@ -8,6 +8,7 @@ sessions etc.
 """
 
 import re
+from twisted.internet import reactor
 from twisted.internet.task import LoopingCall
 from twisted.conch.telnet import Telnet, StatefulTelnetProtocol, IAC, NOP, LINEMODE, GA, WILL, WONT, ECHO, NULL
 from django.conf import settings
@@ -22,6 +23,8 @@ _RE_N = re.compile(r"\{n$")
 _RE_LEND = re.compile(r"\n$|\r$|\r\n$|\r\x00$|", re.MULTILINE)
 _RE_SCREENREADER_REGEX = re.compile(r"%s" % settings.SCREENREADER_REGEX_STRIP, re.DOTALL + re.MULTILINE)
 _IDLE_COMMAND = settings.IDLE_COMMAND + "\n"
+_OUTPUT_WINDOW = settings.TELNET_OUTPUT_WINDOW
+_OUTPUT_MAX_BUFFER = settings.TELNET_OUTPUT_MAX_BUFFER
 
 class TelnetProtocol(Telnet, StatefulTelnetProtocol, Session):
     """
@@ -31,6 +34,14 @@ class TelnetProtocol(Telnet, StatefulTelnetProtocol, Session):
     """
     def __init__(self, *args, **kwargs):
         self.protocol_name = "telnet"
+        # outgoing data waiting to be written, see write_output
+        self.output_buffer = []
+        self.output_buffer_size = 0
+        self.output_task = None
+        # messages queued, writes made to the connection, bytes before
+        # and after compression
+        self.output_stats = {"messages": 0, "flushes": 0,
+                             "bytes_in": 0, "bytes_out": 0}
         super(TelnetProtocol, self).__init__(*args, **kwargs)
 
     def connectionMade(self):
@@ -168,6 +179,7 @@ class TelnetProtocol(Telnet, StatefulTelnetProtocol, Session):
             reason (str): Motivation for losing connection.
 
         """
+        self.flush_output()
         self.sessionhandler.disconnect(self)
         self.transport.loseConnection()
 
@@ -233,11 +245,61 @@ class TelnetProtocol(Telnet, StatefulTelnetProtocol, Session):
         StatefulTelnetProtocol.dataReceived(self, data)
 
     def _write(self, data):
-        "hook overloading the one used in plain telnet"
+        """
+        hook overloading the one used in plain telnet. This is used
+        for telnet negotiations, which may change the MCCP state, so
+        it's written right away (after any output written before it).
+
+        """
         data = data.replace('\n', '\r\n').replace('\r\r\n', '\r\n')
         #data = data.replace('\n', '\r\n')
+        self.flush_output()
         super(TelnetProtocol, self)._write(mccp_compress(self, data))
 
+    def write_output(self, data):
+        """
+        Queue data to be written to the client. All data queued during
+        the same reactor tick is written (and compressed, with MCCP) in
+        one go.
+
+        Args:
+            data (str): Data to write, already telnet-escaped.
+
+        Notes:
+            The data is written after at most
+            `settings.TELNET_OUTPUT_WINDOW` seconds, or right away if
+            this is `None` or the queue grows beyond
+            `settings.TELNET_OUTPUT_MAX_BUFFER` bytes.
+
+        """
+        self.output_buffer.append(data)
+        self.output_buffer_size += len(data)
+        self.output_stats["messages"] += 1
+        if _OUTPUT_WINDOW is None or self.output_buffer_size >= _OUTPUT_MAX_BUFFER:
+            self.flush_output()
+        elif not self.output_task:
+            self.output_task = reactor.callLater(_OUTPUT_WINDOW, self.flush_output)
+
+    def flush_output(self):
+        """
+        Write all queued output to the client.
+
+        """
+        if self.output_task and self.output_task.active():
+            self.output_task.cancel()
+        self.output_task = None
+        if not self.output_buffer:
+            return
+        data = "".join(self.output_buffer)
+        self.output_buffer = []
+        self.output_buffer_size = 0
+        compressed = mccp_compress(self, data)
+        stats = self.output_stats
+        stats["flushes"] += 1
+        stats["bytes_in"] += len(data)
+        stats["bytes_out"] += len(compressed)
+        self.transport.write(compressed)
+
     def sendLine(self, line):
         """
         Hook overloading the one used by linereceiver.
@@ -249,7 +311,7 @@ class TelnetProtocol(Telnet, StatefulTelnetProtocol, Session):
         #escape IAC in line mode, and correctly add \r\n
         line += self.delimiter
         line = line.replace(IAC, IAC + IAC).replace('\n', '\r\n')
-        return self.transport.write(mccp_compress(self, line))
+        self.write_output(line)
 
     def lineReceived(self, string):
         """
@@ -352,7 +414,7 @@ class TelnetProtocol(Telnet, StatefulTelnetProtocol, Session):
                     prompt = mxp_parse(prompt)
             prompt = prompt.replace(IAC, IAC + IAC).replace('\n', '\r\n')
             prompt += IAC + GA
-            self.transport.write(mccp_compress(self, prompt))
+            self.write_output(prompt)
         else:
             if echo is not None:
                 # turn on/off echo. Note that this is a bit turned around since we use
@@ -362,11 +424,11 @@ class TelnetProtocol(Telnet, StatefulTelnetProtocol, Session):
                     # by telling the client that WE WON'T echo, the client knows
                     # that IT should echo. This is the expected behavior from
                     # our perspective.
-                    self.transport.write(mccp_compress(self, IAC+WONT+ECHO))
+                    self.write_output(IAC+WONT+ECHO)
                 else:
                     # by telling the client that WE WILL echo, the client can
                     # safely turn OFF its OWN echo.
-                    self.transport.write(mccp_compress(self, IAC+WILL+ECHO))
+                    self.write_output(IAC+WILL+ECHO)
             if raw:
                 # no processing
                 self.sendLine(text)
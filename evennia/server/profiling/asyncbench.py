@@ -0,0 +1,140 @@
+"""
+Benchmark of `run_async` with CPU-heavy work, comparing running it in
+threads with running it in worker processes (`use_process=True`).
+
+Run from the command line with
+
+    python -m evennia.server.profiling.asyncbench [ntasks] [maxprocs]
+
+This runs `ntasks` (default 16) pathfinding searches on a large grid,
+first in threads and then in process pools of 1, 2, 4 ... up to
+`maxprocs` (default the number of CPU cores) workers. For each it
+prints the total time and the longest time the reactor was blocked,
+which is how long the Server would not respond to players. No
+database is needed.
+
+"""
+from __future__ import print_function
+import os
+import sys
+import random
+import multiprocessing
+from collections import deque
+from time import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "evennia.settings_default")
+import django
+django.setup()
+
+from twisted.internet import reactor, defer, task
+from evennia.utils import utils
+
+GRID_SIZE = 300
+TICK = 0.01
+
+
+def pathfind(seed, size=GRID_SIZE):
+    """
+    Find the shortest path across a randomly blocked grid with a
+    breadth-first search. This must be a module-level function to be
+    run in a process.
+
+    Args:
+        seed (int): Seed for the random grid.
+        size (int, optional): Width and height of the grid.
+
+    Returns:
+        length (int or None): Length of the shortest path from one
+            corner to the other, or None if there is none.
+
+    """
+    rand = random.Random(seed)
+    blocked = set((x, y) for x in range(size) for y in range(size) if rand.random() < 0.25)
+    blocked.discard((0, 0))
+    goal = (size - 1, size - 1)
+    blocked.discard(goal)
+    dist = {(0, 0): 0}
+    queue = deque([(0, 0)])
+    while queue:
+        x, y = pos = queue.popleft()
+        if pos == goal:
+            return dist[pos]
+        for nxt in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if (nxt not in dist and nxt not in blocked and
+                    0 <= nxt[0] < size and 0 <= nxt[1] < size):
+                dist[nxt] = dist[pos] + 1
+                queue.append(nxt)
+    return None
+
+
+def _bench(ntasks, use_process):
+    """
+    Run the tasks and measure the time and reactor stalls.
+
+    """
+    done = defer.Deferred()
+    results = []
+    stall = [0.0, time()]
+
+    def _tick():
+        now = time()
+        stall[0] = max(stall[0], now - stall[1] - TICK)
+        stall[1] = now
+    ticker = task.LoopingCall(_tick)
+    ticker.start(TICK)
+
+    def _at_return(result):
+        results.append(result)
+        if len(results) == ntasks:
+            ticker.stop()
+            done.callback((time() - t0, stall[0]))
+
+    t0 = time()
+    for seed in range(ntasks):
+        utils.run_async(pathfind, seed, at_return=_at_return, use_process=use_process)
+    return done
+
+
+@defer.inlineCallbacks
+def _run(ntasks, maxprocs):
+    """
+    Run all benchmark rounds in turn.
+
+    """
+    try:
+        print("%i pathfinding tasks on a %ix%i grid, %i CPU cores" % (
+            ntasks, GRID_SIZE, GRID_SIZE, multiprocessing.cpu_count()))
+        print("%-12s %10s %16s" % ("mode", "time (s)", "max stall (ms)"))
+        elapsed, stall = yield _bench(ntasks, False)
+        print("%-12s %10.2f %16.1f" % ("threads", elapsed, 1000 * stall))
+        nprocs = 1
+        while nprocs <= maxprocs:
+            # start a new pool of the given size
+            if utils._PPOOL:
+                utils._PPOOL.terminate()
+                utils._PPOOL = None
+            utils._PPOOL_SIZE = nprocs
+            elapsed, stall = yield _bench(ntasks, True)
+            print("%-12s %10.2f %16.1f" % ("%i process%s" % (nprocs, "es" if nprocs > 1 else ""),
+                                          elapsed, 1000 * stall))
+            nprocs *= 2
+    finally:
+        reactor.stop()
+
+
+def run(ntasks=16, maxprocs=None):
+    """
+    Run the benchmark and print the results.
+
+    Args:
+        ntasks (int, optional): Number of tasks to run.
+        maxprocs (int, optional): Largest process pool to try. Defaults
+            to the number of CPU cores.
+
+    """
+    reactor.callWhenRunning(_run, ntasks, maxprocs or multiprocessing.cpu_count())
+    reactor.run()
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 16,
+        int(sys.argv[2]) if len(sys.argv) > 2 else None)
@@ -0,0 +1,75 @@
+"""
+Benchmark of CmdSet merging, as done by the cmdhandler when a
+merged cmdset is not found in its cache.
+
+Run from the command line with
+
+    python -m evennia.server.profiling.cmdsetbench [ncmdsets] [ncommands]
+
+This creates `ncmdsets` (default 6) cmdsets of different priorities
+with `ncommands` (default 150) commands each, two thirds of which
+share their keys between the sets. It then times creating the sets
+(by adding the commands one by one) and merging all of them, with
+each mergetype used by the highest-priority set. No database is
+needed.
+
+"""
+from __future__ import print_function
+import os
+import sys
+from time import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "evennia.settings_default")
+import django
+django.setup()
+
+from evennia.commands.cmdset import CmdSet
+from evennia.commands.command import Command
+
+NMERGES = 20
+
+
+def _make_cmdset(iset, ncommands):
+    """
+    Create a cmdset with the given index as priority.
+
+    """
+    cmdset = CmdSet(key="cmdset%i" % iset)
+    cmdset.priority = iset
+    nshared = ncommands * 2 // 3
+    for icmd in range(ncommands):
+        key = "cmd%i" % icmd if icmd < nshared else "set%icmd%i" % (iset, icmd)
+        cmdset.add(type("BenchCmd", (Command,), {"key": key, "aliases": [key + "a", key + "b"]})())
+    return cmdset
+
+
+def run(ncmdsets=6, ncommands=150):
+    """
+    Run the benchmark and print the results.
+
+    Args:
+        ncmdsets (int, optional): Number of cmdsets to merge.
+        ncommands (int, optional): Number of commands in each cmdset.
+
+    """
+    print("%i cmdsets of %i commands" % (ncmdsets, ncommands))
+    print("%-10s %12s %12s %10s" % ("mergetype", "create (ms)", "merge (ms)", "commands"))
+    for mergetype in ("Union", "Intersect", "Replace", "Remove"):
+        t_create = t_merge = 0
+        for _ in range(NMERGES):
+            # new cmdsets every time, like after a cache miss
+            t0 = time()
+            cmdsets = [_make_cmdset(iset, ncommands) for iset in range(ncmdsets)]
+            cmdsets[-1].mergetype = mergetype
+            t1 = time()
+            merged = cmdsets[0]
+            for cmdset in cmdsets[1:]:
+                merged = cmdset + merged
+            t_create += t1 - t0
+            t_merge += time() - t1
+        print("%-10s %12.3f %12.3f %10i" % (mergetype, 1000 * t_create / NMERGES,
+                                            1000 * t_merge / NMERGES, merged.count()))
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 6,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 150)
@@ -0,0 +1,67 @@
+"""
+Benchmark of the ANSI -> html conversion done for every text sent to
+the webclient.
+
+Run from the command line with
+
+    python -m evennia.server.profiling.htmlbench [nrepeats] [nparses]
+
+This converts a coloured room description, repeated 1, 10, 100 and
+`nrepeats` (default 1000) times, `nparses` (default 20) times each.
+It reports the time per conversion of a new text (using a unique
+string every time) and of a text that was converted before. A linear
+converter should show the first time growing with the length of
+the text only. No database is needed.
+
+"""
+from __future__ import print_function
+import os
+import sys
+from time import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "evennia.settings_default")
+import django
+django.setup()
+
+from evennia.utils.text2html import TextToHTMLparser
+
+DESC = ("|rThe |Rold |gtower|n rises  above the |[bmoat|n. |500Flames|n lick "
+        "its |uwalls|n and a |hsign|n reads <look at http://evennia.com>.|/")
+
+
+def _bench(text, nparses):
+    """
+    Time the conversion of text.
+
+    """
+    parser = TextToHTMLparser()
+    t0 = time()
+    for iparse in range(nparses):
+        parser.parse(text + str(iparse))
+    t_new = (time() - t0) / nparses
+    t0 = time()
+    for iparse in range(nparses):
+        parser.parse(text + "0")
+    t_cached = (time() - t0) / nparses
+    return t_new, t_cached
+
+
+def run(nrepeats=1000, nparses=20):
+    """
+    Run the benchmark and print the results.
+
+    Args:
+        nrepeats (int, optional): Max number of times to repeat the
+            description in one text.
+        nparses (int, optional): Number of conversions to time.
+
+    """
+    print("%10s %10s %12s %12s" % ("repeats", "chars", "new (ms)", "cached (ms)"))
+    for repeats in sorted(set((1, 10, 100, nrepeats))):
+        text = DESC * repeats
+        t_new, t_cached = _bench(text, nparses)
+        print("%10i %10i %12.3f %12.3f" % (repeats, len(text), 1000 * t_new, 1000 * t_cached))
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 20)
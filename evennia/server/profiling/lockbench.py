@@ -0,0 +1,97 @@
+"""
+Microbenchmark comparing the compiled lock evaluation of the
+LockHandler with the old eval()-based evaluation of the same
+lock definitions.
+
+Run from the command line with
+
+    python -m evennia.server.profiling.lockbench [iterations]
+
+The benchmark uses its own dummy lock functions, so it does not
+need a game directory or a database.
+
+"""
+from __future__ import print_function
+import os
+import sys
+import timeit
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "evennia.settings_default")
+
+from evennia.locks import lockhandler
+
+# lock definitions to test, from trivial to lengthy
+LOCKDEFS = (
+    "cmd:all()",
+    "edit:perm(Wizards) OR id(4)",
+    "get:NOT holds() AND attr(weight) AND perm(Builders)",
+    "traverse:false() AND perm(Wizards) OR true() OR perm(Builders) OR id(4)")
+
+
+def _all(*args, **kwargs):
+    return True
+
+
+def _false(*args, **kwargs):
+    return False
+
+
+def _perm(accessing_obj, accessed_obj, *args, **kwargs):
+    return args[0] in accessing_obj.permissions
+
+
+def _id(accessing_obj, accessed_obj, *args, **kwargs):
+    return accessing_obj.id == int(args[0])
+
+
+def _attr(accessing_obj, accessed_obj, *args, **kwargs):
+    return hasattr(accessing_obj, args[0])
+
+
+class _Obj(object):
+    "Minimal stand-in for a typeclassed object"
+    id = 5
+    permissions = ("Builders",)
+    is_superuser = False
+    lock_storage = ";".join(LOCKDEFS)
+
+
+def _legacy_check(handler, accessing_obj, access_type):
+    "The pre-compilation way of evaluating a lock"
+    evalstring, func_tup = handler.locks[access_type][:2]
+    true_false = tuple(bool(tup[0](accessing_obj, handler.obj, *tup[1], **tup[2])) for tup in func_tup)
+    return eval(evalstring % true_false)
+
+
+def run(iterations=100000):
+    """
+    Run the benchmark and print the results.
+
+    Args:
+        iterations (int, optional): Number of checks per lock definition.
+
+    """
+    lockhandler._LOCKFUNCS.update({"all": _all, "true": _all, "false": _false,
+                                   "holds": _false, "perm": _perm, "id": _id,
+                                   "attr": _attr})
+    obj = _Obj()
+    obj.locks = lockhandler.LockHandler(obj)
+    accessing_obj = _Obj()
+    accessing_obj.locks = lockhandler.LockHandler(accessing_obj)
+
+    print("%-12s %12s %12s %8s" % ("access_type", "eval (us)", "compiled (us)", "speedup"))
+    for lockdef in LOCKDEFS:
+        access_type = lockdef.split(":", 1)[0]
+        assert obj.locks.check(accessing_obj, access_type) == \
+            _legacy_check(obj.locks, accessing_obj, access_type)
+        t_legacy = timeit.timeit(lambda: _legacy_check(obj.locks, accessing_obj, access_type),
+                                 number=iterations)
+        t_compiled = timeit.timeit(lambda: obj.locks.check(accessing_obj, access_type),
+                                   number=iterations)
+        print("%-12s %12.3f %12.3f %7.1fx" % (access_type,
+                                             1e6 * t_legacy / iterations,
+                                             1e6 * t_compiled / iterations,
+                                             t_legacy / t_compiled))
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
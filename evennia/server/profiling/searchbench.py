@@ -0,0 +1,70 @@
+"""
+Benchmark of local object searches (like `get sword` or `look bob`),
+comparing the in-memory candidate matching of
+`ObjectDB.objects.get_objs_with_key_or_alias` with the database
+query previously used for the same search.
+
+This needs a working database and should be run from inside
+`evennia shell` in a (test) game directory:
+
+    from evennia.server.profiling import searchbench
+    searchbench.run()
+
+Temporary objects are created in a new room and deleted again
+afterwards.
+
+"""
+from __future__ import print_function
+import timeit
+
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+
+from evennia.objects.models import ObjectDB
+from evennia.utils import create
+
+
+def _db_search(ostring, candidates):
+    "The database query used for exact candidate searches before"
+    return list(ObjectDB.objects.filter(
+        Q(pk__in=[obj.id for obj in candidates]) &
+        (Q(db_key__iexact=ostring) |
+         Q(db_tags__db_key__iexact=ostring) & Q(db_tags__db_tagtype__iexact="alias"))).distinct())
+
+
+def run(nobjs=200, iterations=1000):
+    """
+    Run the benchmark and print the results.
+
+    Args:
+        nobjs (int, optional): Number of objects to put in the room.
+        iterations (int, optional): Number of searches to time.
+
+    """
+    room = create.create_object("evennia.objects.objects.DefaultRoom", key="benchroom")
+    objs = [create.create_object("evennia.objects.objects.DefaultObject",
+                                 key="object %i" % inum, location=room,
+                                 aliases=["obj%i" % inum])
+            for inum in range(nobjs)]
+    try:
+        candidates = room.contents
+        for ostring in ("object %i" % (nobjs // 2), "obj%i" % (nobjs - 1), "missing"):
+            assert ObjectDB.objects.get_objs_with_key_or_alias(ostring, candidates=candidates) == \
+                _db_search(ostring, candidates)
+            with CaptureQueriesContext(connection) as context:
+                _db_search(ostring, candidates)
+            db_queries = len(context.captured_queries)
+            with CaptureQueriesContext(connection) as context:
+                ObjectDB.objects.get_objs_with_key_or_alias(ostring, candidates=candidates)
+            mem_queries = len(context.captured_queries)
+            t_db = timeit.timeit(lambda: _db_search(ostring, candidates), number=iterations)
+            t_mem = timeit.timeit(lambda: ObjectDB.objects.get_objs_with_key_or_alias(
+                ostring, candidates=candidates), number=iterations)
+            print("search '%s' among %i objects:" % (ostring, nobjs))
+            print("  database:  %i queries, %.3f ms/search" % (db_queries, 1000 * t_db / iterations))
+            print("  in-memory: %i queries, %.3f ms/search" % (mem_queries, 1000 * t_mem / iterations))
+    finally:
+        for obj in objs:
+            obj.delete()
+        room.delete()
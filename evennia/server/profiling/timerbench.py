@@ -0,0 +1,103 @@
+"""
+Stress benchmark comparing the shared TimerWheel used to repeat
+Scripts with giving every Script its own ExtendedLoopingCall.
+
+Run from the command line with
+
+    python -m evennia.server.profiling.timerbench [ntimers] [seconds]
+
+This starts `ntimers` (default 100 000) repeating timers with
+intervals of 1-10 seconds, like that many timed Scripts would, runs
+the reactor for `seconds` (default 10) and then stops them all. It
+reports the time needed to start and stop the timers, the total
+number of repeats, the CPU time used and the worst reactor stall
+(how late a 50ms heartbeat was at most). No database is needed.
+
+"""
+from __future__ import print_function
+import os
+import sys
+import random
+from time import time, clock
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "evennia.settings_default")
+import django
+django.setup()
+
+from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
+from evennia.scripts.scripts import ExtendedLoopingCall, WheelTask
+
+HEARTBEAT = 0.05
+
+
+class _Stats(object):
+    "Collects the results of one run"
+    calls = 0
+    max_stall = 0.0
+    last_beat = None
+
+
+def _bench(task_class, ntimers, seconds):
+    """
+    Run one benchmark round with the given task class.
+
+    """
+    stats = _Stats()
+    random.seed(1)
+
+    def repeat():
+        stats.calls += 1
+
+    def heartbeat():
+        now = time()
+        if stats.last_beat is not None:
+            stats.max_stall = max(stats.max_stall, now - stats.last_beat - HEARTBEAT)
+        stats.last_beat = now
+
+    t0 = time()
+    tasks = [task_class(repeat) for _ in range(ntimers)]
+    for task in tasks:
+        task.start(random.randint(1, 10), now=False)
+    t_start = time() - t0
+
+    beat = LoopingCall(heartbeat)
+    beat.start(HEARTBEAT)
+    cpu0 = clock()
+    # run the reactor for a while; iterate manually so we can repeat rounds
+    end = time() + seconds
+    while time() < end:
+        reactor.iterate(HEARTBEAT / 5)
+    cpu = clock() - cpu0
+    beat.stop()
+
+    t0 = time()
+    for task in tasks:
+        task.stop()
+    t_stop = time() - t0
+    # let the reactor process the cancellations
+    reactor.iterate(0)
+    return t_start, t_stop, stats.calls, cpu, stats.max_stall
+
+
+def run(ntimers=100000, seconds=10):
+    """
+    Run the benchmark and print the results.
+
+    Args:
+        ntimers (int, optional): Number of timers to start.
+        seconds (float, optional): How long to run the reactor.
+
+    """
+    print("%i timers, %is run" % (ntimers, seconds))
+    print("%-20s %10s %10s %10s %10s %12s" % ("timer", "start (s)", "stop (s)",
+                                           "repeats", "cpu (s)", "max stall (ms)"))
+    for name, task_class in (("ExtendedLoopingCall", ExtendedLoopingCall),
+                             ("WheelTask", WheelTask)):
+        t_start, t_stop, calls, cpu, stall = _bench(task_class, ntimers, seconds)
+        print("%-20s %10.3f %10.3f %10i %10.3f %12.1f" % (name, t_start, t_stop,
+                                                      calls, cpu, 1000 * stall))
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 10)
@@ -0,0 +1,67 @@
+"""
+Benchmark of building typeclassed objects, as done for every object
+loaded from the database at startup or after an idmapper flush.
+
+Run from the command line with
+
+    python -m evennia.server.profiling.typeclassbench [nobjs]
+
+This instantiates `nobjs` (default 50000) objects spread over a few
+typeclass paths from field values, the way the database loads them.
+This is done once with the typeclass cache emptied before every object
+(resolving the path each time, as was done before the cache) and once
+with the cache in use. No database is needed.
+
+"""
+from __future__ import print_function
+import os
+import sys
+from time import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "evennia.settings_default")
+import django
+django.setup()
+
+from evennia.objects.models import ObjectDB
+from evennia.typeclasses.models import flush_typeclass_cache
+
+_PATHS = ("evennia.objects.objects.DefaultObject",
+          "evennia.objects.objects.DefaultCharacter",
+          "evennia.objects.objects.DefaultRoom",
+          "evennia.objects.objects.DefaultExit")
+
+
+def _bench(nobjs, flush):
+    """
+    Time building the objects.
+
+    """
+    field_names = [field.attname for field in ObjectDB._meta.concrete_fields]
+    rows = []
+    for inum in range(nobjs):
+        obj = ObjectDB(db_key="obj%i" % inum, db_typeclass_path=_PATHS[inum % len(_PATHS)])
+        rows.append([getattr(obj, field_name) for field_name in field_names])
+    t0 = time()
+    for row in rows:
+        if flush:
+            flush_typeclass_cache()
+        ObjectDB.from_db("default", field_names, row)
+    return time() - t0
+
+
+def run(nobjs=50000):
+    """
+    Run the benchmark and print the results.
+
+    Args:
+        nobjs (int, optional): Number of objects to build.
+
+    """
+    print("building %i objects" % nobjs)
+    t_resolve = _bench(nobjs, True)
+    t_cached = _bench(nobjs, False)
+    print("  resolving typeclass: %8.3f s (%.2f us/object)" % (t_resolve, 1e6 * t_resolve / nobjs))
+    print("  cached typeclass:    %8.3f s (%.2f us/object)" % (t_cached, 1e6 * t_cached / nobjs))
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
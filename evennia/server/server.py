@@ -382,6 +382,10 @@ class Evennia(object):
         from evennia.scripts.tickerhandler import TICKER_HANDLER
         TICKER_HANDLER.save()
 
+        # write any pending deferred Attribute changes to the database
+        from evennia.utils.dbserialize import flush_deferred_saves
+        flush_deferred_saves()
+
         # always called, also for a reload
         self.at_server_stop()
 
@@ -200,7 +200,8 @@ class ServerSession(Session):
             # hooks, echoes or access checks.
             obj = _ObjectDB.objects.get(id=self.puid)
             obj.sessions.add(self)
-            obj.player = self.player
+            if obj.player != self.player:
+                obj.player = self.player
             self.puid = obj.id
             self.puppet = obj
             #obj.scripts.validate()
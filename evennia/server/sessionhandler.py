@@ -37,7 +37,9 @@ _PlayerDB = None
 _ServerSession = None
 _ServerConfig = None
 _ScriptDB = None
+_ObjectDB = None
 _OOB_HANDLER = None
+_DEFAULT_MSG_FUNCS = None
 
 class DummySession(object):
     sessid = 0
@@ -58,11 +60,26 @@ PCONNSYNC = chr(12)   # portal post-syncing session
 # i18n
 from django.utils.translation import ugettext as _
 
+
+def _may_have_inlinefunc(data):
+    """
+    Check if any string in data could contain an inlinefunc. Those
+    may give different results for every session, so such data
+    must be cleaned separately for each of them.
+
+    """
+    if isinstance(data, basestring):
+        return "$" in data
+    elif isinstance(data, dict):
+        return any(_may_have_inlinefunc(part) for part in data.values())
+    elif hasattr(data, "__iter__"):
+        return any(_may_have_inlinefunc(part) for part in data)
+    return False
+
 _SERVERNAME = settings.SERVERNAME
 _MULTISESSION_MODE = settings.MULTISESSION_MODE
 _IDLE_TIMEOUT = settings.IDLE_TIMEOUT
 _MAX_SERVER_COMMANDS_PER_SECOND = 100.0
-_MAX_SESSION_COMMANDS_PER_SECOND = 5.0
 _MODEL_MAP = None
 
 # input handlers
@@ -76,7 +93,7 @@ def delayed_import():
     Helper method for delayed import of all needed entities.
 
     """
-    global _ServerSession, _PlayerDB, _ServerConfig, _ScriptDB
+    global _ServerSession, _PlayerDB, _ServerConfig, _ScriptDB, _ObjectDB
     if not _ServerSession:
         # we allow optional arbitrary serversession class for overloading
         modulename, classname = settings.SERVER_SESSION_CLASS.rsplit(".", 1)
@@ -87,8 +104,10 @@ def delayed_import():
         from evennia.server.models import ServerConfig as _ServerConfig
     if not _ScriptDB:
         from evennia.scripts.models import ScriptDB as _ScriptDB
+    if not _ObjectDB:
+        from evennia.objects.models import ObjectDB as _ObjectDB
     # including once to avoid warnings in Python syntax checkers
-    _ServerSession, _PlayerDB, _ServerConfig, _ScriptDB
+    _ServerSession, _PlayerDB, _ServerConfig, _ScriptDB, _ObjectDB
 
 
 #-----------------------------------------------------------
@@ -303,22 +322,43 @@ class ServerSessionHandler(SessionHandler):
               `{sessid: {property:value},...}` defining each session and
               the properties in it which should be synced.
 
+        Notes:
+            The players and puppets of all sessions are loaded with one
+            query each, rather than one per session.
+
         """
         delayed_import()
-        global _ServerSession, _PlayerDB, _ServerConfig, _ScriptDB
+        global _ServerSession, _PlayerDB, _ServerConfig, _ScriptDB, _ObjectDB
 
         for sess in self.values():
             # we delete the old session to make sure to catch eventual
             # lingering references.
             del sess
 
+        sessions = []
         for sessid, sessdict in portalsessionsdata.items():
             sess = _ServerSession()
             sess.sessionhandler = self
             sess.load_sync_data(sessdict)
-            if sess.uid:
-                sess.player = _PlayerDB.objects.get_player_from_uid(sess.uid)
             self[sessid] = sess
+            sessions.append(sess)
+
+        # load all players and puppets into the idmapper cache at once
+        uids = set(sess.uid for sess in sessions if sess.uid)
+        players = dict((player.id, player) for player in
+                       _PlayerDB.objects.filter(id__in=uids)) if uids else {}
+        puids = set(sess.puid for sess in sessions if sess.puid)
+        if puids:
+            # also give the puppets their (already loaded) players, since
+            # the db_player relation does not look in the idmapper cache
+            player_cache = _ObjectDB._meta.get_field("db_player").get_cache_name()
+            for obj in _ObjectDB.objects.filter(id__in=puids):
+                if obj.db_player_id in players:
+                    setattr(obj, player_cache, players[obj.db_player_id])
+
+        for sess in sessions:
+            if sess.uid:
+                sess.player = players.get(sess.uid)
             sess.at_sync()
 
         # after sync is complete we force-validate all scripts
@@ -625,8 +665,7 @@ class ServerSessionHandler(SessionHandler):
             message (str): Message to send.
 
         """
-        for sess in self.values():
-            self.data_out(sess, text=message)
+        self.multicast(self.values(), text=message)
 
     def data_out(self, session, **kwargs):
         """
@@ -647,6 +686,76 @@ class ServerSessionHandler(SessionHandler):
         self.server.amp_protocol.send_MsgServer2Portal(session,
                                                        **kwargs)
 
+    def multicast(self, sessions, **kwargs):
+        """
+        Sending the same data Server -> Portal to many sessions. The
+        data is only cleaned once for every group of sessions using the
+        same encoding, and is sent to the Portal as one message that
+        the Portal relays to each session in the group.
+
+        Args:
+            sessions (list): Sessions to relay to.
+            text (str, optional): text data to return
+
+        Notes:
+            Data containing inlinefuncs is still cleaned separately for
+            every session, since inlinefuncs may depend on the session.
+
+        """
+        sessions = list(sessions)
+        if len(sessions) < 2:
+            for session in sessions:
+                self.data_out(session, **kwargs)
+            return
+        options = kwargs.get("options") or {}
+        per_session = (_INLINEFUNC_ENABLED and not options.get("raw", False)
+                       and _may_have_inlinefunc(kwargs))
+        groups = {}
+        for session in sessions:
+            key = session.sessid if per_session else session.protocol_flags.get("ENCODING")
+            groups.setdefault(key, []).append(session)
+        for group in groups.values():
+            # clean_senddata modifies the dict, so give it a copy
+            ckwargs = self.clean_senddata(group[0], dict(kwargs))
+            self.server.amp_protocol.send_MsgServer2Portal(group, **ckwargs)
+
+    def msg_multicast(self, receivers, text=None, from_obj=None, options=None, **kwargs):
+        """
+        Send the same message to many Objects and/or Players, such as
+        everyone in a room or on a channel. This is equivalent to calling
+        `receiver.msg()` on every receiver, but the messages to all
+        receivers that don't customize their `msg()` method are
+        sent using `multicast`.
+
+        Args:
+            receivers (list): Objects and/or Players to send to.
+            text (str or tuple, optional): The message to send.
+            from_obj (Object or Player, optional): The sender. If given,
+                its `at_msg_send` hook will be called for each receiver.
+            options (dict, optional): Protocol options.
+
+        Kwargs:
+            any: Other send-commands, passed on like for `msg()`.
+
+        """
+        global _DEFAULT_MSG_FUNCS
+        if _DEFAULT_MSG_FUNCS is None:
+            from evennia.objects.objects import DefaultObject
+            from evennia.players.players import DefaultPlayer
+            _DEFAULT_MSG_FUNCS = (DefaultObject.msg.__func__, DefaultPlayer.msg.__func__)
+        sessions = []
+        for receiver in receivers:
+            try:
+                if getattr(receiver.msg, "__func__", None) in _DEFAULT_MSG_FUNCS:
+                    sessions.extend(receiver._msg_sessions(text=text, from_obj=from_obj, **kwargs))
+                else:
+                    receiver.msg(text, from_obj=from_obj, options=options, **kwargs)
+            except Exception:
+                log_trace("Cannot send msg to '%s'." % receiver)
+        if sessions:
+            kwargs["options"] = options
+            self.multicast(sessions, text=text, **kwargs)
+
     def get_inputfuncs(self):
         """
         Get all registered inputfuncs (access function)
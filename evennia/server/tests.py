@@ -45,3 +45,279 @@ class EvenniaTestSuiteRunner(DiscoverRunner):
         import evennia
         evennia._init()
         return super(EvenniaTestSuiteRunner, self).build_suite(test_labels, extra_tests=extra_tests, **kwargs)
+
+
+from mock import Mock, patch
+from evennia.server import amp
+
+
+class TestAMPBatching(TestCase):
+    def setUp(self):
+        self.proto = amp.AMPProtocol()
+        self.proto.callRemote = Mock()
+        self.session = amp.DummySession()
+
+    def tearDown(self):
+        amp._SENDBATCH.clear()
+
+    @patch("evennia.server.amp.reactor")
+    def test_batch(self, mock_reactor):
+        for i in range(100):
+            self.proto.send_MsgServer2Portal(self.session, text="test %i" % i)
+        self.assertFalse(self.proto.callRemote.called)
+        self.assertEqual(1, mock_reactor.callLater.call_count)
+        self.proto.send_batch()
+        self.assertEqual(1, self.proto.callRemote.call_count)
+        args, kwargs = self.proto.callRemote.call_args
+        self.assertTrue(args[0] is amp.MsgBatchServer2Portal)
+        batch = amp.loads(kwargs["packed_data"])
+        self.assertEqual(100, len(batch))
+        self.assertEqual((0, {"text": "test 99"}), batch[-1])
+
+    @patch("evennia.server.amp.reactor")
+    def test_order(self, mock_reactor):
+        self.proto.send_MsgServer2Portal(self.session, text="test")
+        self.proto.send_AdminServer2Portal(self.session, operation=amp.SDISCONN)
+        self.assertEqual([amp.MsgServer2Portal, amp.AdminServer2Portal],
+                         [call[0][0] for call in self.proto.callRemote.call_args_list])
+        self.assertFalse(amp._SENDBATCH)
+
+    def _box_roundtrip(self, data):
+        "Send data through a Compressed argument, returning the box strings"
+        compressed, strings, objects = amp.Compressed(), {}, {}
+        compressed.toBox("data", strings, {"data": data}, None)
+        compressed.fromBox("data", strings, objects, None)
+        self.assertEqual(data, objects["data"])
+        return strings
+
+    def test_compression(self):
+        self.assertEqual({"data": amp._RAW + "short"}, self._box_roundtrip("short"))
+        strings = self._box_roundtrip("x" * 2000)
+        self.assertEqual(amp._ZLIB, strings["data"][:1])
+        self.assertTrue(len(strings["data"]) < 100)
+
+    def test_compression_chunks(self):
+        # incompressible data longer than the AMP max length is split up
+        data = os.urandom(amp.AMP_MAXLEN * 2)
+        strings = self._box_roundtrip(data)
+        self.assertEqual(["data", "data.2", "data.3"], sorted(strings))
+
+    def test_portal_multicast(self):
+        self.proto.factory = Mock()
+        sessions = self.proto.factory.portal.sessions
+        sessions.get.side_effect = {1: "sess1", 2: "sess2"}.get
+        self.proto.portal_receive_server2portal(amp.dumps(([1, 2, 3], {"text": [["test"], {}]})))
+        self.assertEqual([(("sess1",), {"text": [["test"], {}]}), (("sess2",), {"text": [["test"], {}]})],
+                         [tuple(call) for call in sessions.data_out.call_args_list])
+
+    @patch("evennia.server.amp.logger")
+    def test_batch_failures(self, mock_logger):
+        self.proto.factory = Mock()
+        for sessions, receive, relay in (
+                (self.proto.factory.server.sessions, self.proto.server_receive_msgbatchportal2server, "data_in"),
+                (self.proto.factory.portal.sessions, self.proto.portal_receive_batchserver2portal, "data_out")):
+            sessions.get.side_effect = {1: "sess1", 2: "sess2"}.get
+            getattr(sessions, relay).side_effect = lambda session, **kwargs: 1 / (session != "sess1")
+            # a missing session and a failing one don't stop the batch
+            receive(amp.dumps([(3, {"text": "a"}), (1, {"text": "b"}), (2, {"text": "c"})]))
+            self.assertEqual([(("sess1",), {"text": "b"}), (("sess2",), {"text": "c"})],
+                             [tuple(call) for call in getattr(sessions, relay).call_args_list])
+        self.assertEqual(2, mock_logger.log_trace.call_count)
+
+
+from evennia.server.sessionhandler import ServerSessionHandler, SESSIONS
+from evennia.utils.test_resources import EvenniaTest
+
+
+class TestMulticast(TestCase):
+    def setUp(self):
+        self.handler = ServerSessionHandler()
+        self.handler.server = Mock()
+        self.sessions = []
+        for sessid, encoding in enumerate(("utf-8", "utf-8", "latin-1", "utf-8")):
+            session = Mock()
+            session.sessid = sessid
+            session.protocol_flags = {"ENCODING": encoding}
+            self.sessions.append(session)
+
+    def test_multicast(self):
+        self.handler.multicast(self.sessions, text="test")
+        send = self.handler.server.amp_protocol.send_MsgServer2Portal
+        self.assertEqual(2, send.call_count)
+        groups = sorted([call[0][0] for call in send.call_args_list], key=len)
+        self.assertEqual([[self.sessions[2]], [self.sessions[0], self.sessions[1], self.sessions[3]]],
+                         groups)
+        self.assertEqual({"text": [["test"], {"options": {}}]}, send.call_args[1])
+
+    @patch("evennia.server.sessionhandler._INLINEFUNC_ENABLED", True)
+    def test_multicast_inlinefunc(self):
+        self.handler.multicast(self.sessions, text="$pad(test, 10)")
+        self.assertEqual(4, self.handler.server.amp_protocol.send_MsgServer2Portal.call_count)
+
+
+class TestMsgContents(EvenniaTest):
+    def test_msg_contents(self):
+        SESSIONS.data_out.reset_mock()
+        self.obj1.msg = Mock()
+        self.room1.msg_contents("test", exclude=self.obj2)
+        self.obj1.msg.assert_called_once_with("test", from_obj=None, options=None)
+        SESSIONS.data_out.assert_called_once_with(self.session, text="test", options=None)
+
+
+import zlib
+from evennia.server.portal import telnet
+
+
+class TestTelnetOutput(TestCase):
+    def setUp(self):
+        self.proto = telnet.TelnetProtocol()
+        self.proto.transport = Mock()
+
+    @patch("evennia.server.portal.telnet.reactor")
+    def test_coalesce(self, mock_reactor):
+        for i in range(30):
+            self.proto.sendLine("line %i" % i)
+        self.assertFalse(self.proto.transport.write.called)
+        self.assertEqual(1, mock_reactor.callLater.call_count)
+        self.proto.flush_output()
+        self.assertEqual(1, self.proto.transport.write.call_count)
+        data = self.proto.transport.write.call_args[0][0]
+        self.assertTrue(data.startswith("line 0\r\nline 1\r\n"))
+        self.assertTrue(data.endswith("line 29\r\n"))
+        self.assertEqual(30, self.proto.output_stats["messages"])
+        self.assertEqual(1, self.proto.output_stats["flushes"])
+
+    @patch("evennia.server.portal.telnet.reactor")
+    def test_mccp(self, mock_reactor):
+        self.proto.zlib = zlib.compressobj(9)
+        for i in range(30):
+            self.proto.sendLine("You hit the goblin.")
+        self.proto.flush_output()
+        data = self.proto.transport.write.call_args[0][0]
+        self.assertEqual("You hit the goblin.\r\n" * 30, zlib.decompressobj().decompress(data))
+        stats = self.proto.output_stats
+        self.assertEqual(len(data), stats["bytes_out"])
+        self.assertTrue(stats["bytes_out"] < stats["bytes_in"])
+
+    @patch("evennia.server.portal.telnet.reactor")
+    def test_order(self, mock_reactor):
+        self.proto.sendLine("text")
+        self.proto._write(telnet.IAC + telnet.NOP)
+        self.assertEqual(["text\r\n", telnet.IAC + telnet.NOP],
+                         [call[0][0] for call in self.proto.transport.write.call_args_list])
+        self.assertFalse(self.proto.output_buffer)
+
+
+from collections import deque
+from evennia.server.portal import portalsessionhandler
+
+
+class TestPortalInputThrottle(TestCase):
+    def setUp(self):
+        self.now = 100.0
+        patcher = patch("evennia.server.portal.portalsessionhandler.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.handler = portalsessionhandler.PortalSessionHandler()
+        self.handler.portal = Mock()
+        self.handler.command_bucket = portalsessionhandler.TokenBucket(4, 4)
+        self.sess1, self.sess2 = self._session(1), self._session(2)
+
+    def _session(self, sessid):
+        session = Mock()
+        session.sessid = sessid
+        session.protocol_flags = {"ENCODING": "utf-8"}
+        self.handler[sessid] = session
+        return session
+
+    def _relayed(self):
+        return [(call[0][0].sessid, call[1]["text"][0][0]) for call in
+                self.handler.portal.amp_protocol.send_MsgPortal2Server.call_args_list]
+
+    @patch("evennia.server.portal.portalsessionhandler.reactor")
+    def test_fair_queue(self, mock_reactor):
+        for num in range(10):
+            self.handler.data_in(self.sess1, text="spam%i" % num)
+        self.handler.data_in(self.sess2, text="look")
+        self.handler.data_in(self.sess2, text="north")
+        self.assertEqual([(1, "spam0"), (1, "spam1"), (1, "spam2"), (1, "spam3")], self._relayed())
+        self.assertEqual(1, mock_reactor.callLater.call_count)
+        self.now += 1
+        self.handler.relay_queued_input()
+        self.assertEqual([(1, "spam4"), (2, "look"), (1, "spam5"), (2, "north")], self._relayed()[4:])
+        self.assertEqual({"relayed": 6, "queued": 6, "dropped": 0, "depth": 4},
+                         self.handler.get_input_stats(self.sess1))
+        self.assertEqual({"relayed": 2, "queued": 2, "dropped": 0, "depth": 0},
+                         self.handler.get_input_stats(self.sess2))
+        # rescheduled for when the next input may be relayed
+        self.assertAlmostEqual(0.25, mock_reactor.callLater.call_args[0][0])
+
+    @patch("evennia.server.portal.portalsessionhandler.reactor")
+    @patch("evennia.server.portal.portalsessionhandler._MAX_SESSION_COMMAND_BURST", 1)
+    @patch("evennia.server.portal.portalsessionhandler._MAX_SESSION_COMMAND_QUEUE", 3)
+    def test_session_overflow(self, mock_reactor):
+        for num in range(6):
+            self.handler.data_in(self.sess1, text="spam%i" % num)
+        self.handler.data_in(self.sess2, text="look")
+        self.assertEqual([(1, "spam0"), (2, "look")], self._relayed())
+        self.assertEqual({"relayed": 1, "queued": 3, "dropped": 2, "depth": 3},
+                         self.handler.get_input_stats(self.sess1))
+        self.assertEqual(1, self.sess1.send_text.call_count)
+        self.handler.disconnect(self.sess1)
+        self.now += 1
+        self.handler.relay_queued_input()
+        self.assertEqual(2, len(self._relayed()))
+        self.assertFalse(self.handler.input_schedule)
+
+    @patch("evennia.server.portal.portalsessionhandler.reactor")
+    @patch("evennia.server.portal.portalsessionhandler._CONNECTION_QUEUE", deque())
+    def test_connection_burst(self, mock_reactor):
+        self.handler.connection_bucket = portalsessionhandler.TokenBucket(2, 3)
+        sessions = [Mock(sessid=None) for _ in range(5)]
+        for session in sessions:
+            self.handler.connect(session)
+        send = self.handler.portal.amp_protocol.send_AdminPortal2Server
+        self.assertEqual(sessions[:3], [call[0][0] for call in send.call_args_list])
+        self.assertFalse(sessions[2].data_out.called)
+        self.assertTrue(sessions[4].data_out.called)
+        self.assertAlmostEqual(0.5, mock_reactor.callLater.call_args[0][0])
+        self.now += 1
+        self.handler.admit_connections()
+        self.assertEqual(5, send.call_count)
+        self.assertEqual(set(range(1, 6)), set(session.sessid for session in sessions))
+
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from evennia.utils import create
+
+
+class TestPortalSessionsSync(EvenniaTest):
+    def _sync(self, nsessions):
+        "Sync nsessions sessions, each with its own uncached player and puppet"
+        handler = ServerSessionHandler()
+        handler.server = Mock()
+        sessdata, objs = {}, []
+        for sessid in range(100, 100 + nsessions):
+            key = "Sync%i_%i" % (nsessions, sessid)
+            player = create.create_player(key, email="test@test.com", password="testpassword",
+                                          typeclass=self.player_typeclass)
+            char = create.create_object(self.character_typeclass, key=key,
+                                        location=self.room1, home=self.room1)
+            char.player = player
+            objs.extend((player, char))
+            sessdata[sessid] = {"sessid": sessid, "uid": player.id, "puid": char.id,
+                                "logged_in": True, "protocol_flags": {}}
+        for obj in objs:
+            obj.__dbclass__.flush_cached_instance(obj)
+        with CaptureQueriesContext(connection) as queries:
+            handler.portal_sessions_sync(sessdata)
+        return handler, objs, len(queries)
+
+    def test_bulk_sync(self):
+        handler, objs, nqueries_few = self._sync(2)
+        handler, objs, nqueries_many = self._sync(20)
+        self.assertEqual(nqueries_few, nqueries_many)
+        session = handler[101]
+        self.assertEqual(objs[2].id, session.player.id)
+        self.assertEqual(objs[3].id, session.puppet.id)
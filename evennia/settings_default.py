@@ -39,6 +39,15 @@ TELNET_INTERFACES = ['0.0.0.0']
 # server-side (see INPUT_FUNC_MODULES). TELNET_ENABLED is required for this
 # to work.
 TELNET_OOB_ENABLED = False
+# Text sent to a telnet session is collected and written to the
+# connection in one go (under MCCP, as one compressed flush). This is
+# the longest time (in seconds) output may wait for more output before
+# being written. 0 writes at the end of the current reactor tick. Set
+# to None to write every message on its own.
+TELNET_OUTPUT_WINDOW = 0
+# Collected output is written right away once it grows beyond this
+# many bytes.
+TELNET_OUTPUT_MAX_BUFFER = 65536
 # Start the evennia django+twisted webserver so you can
 # browse the evennia website and the admin interface
 # (Obs - further web configuration can be found below
@@ -164,6 +173,17 @@ SCREENREADER_REGEX_STRIP = r"\+-+|\+$|\+~|--+|~~+|==+"
 AMP_HOST = 'localhost'
 AMP_PORT = 5000
 AMP_INTERFACE = '127.0.0.1'
+# Messages between the Portal and Server that are sent during the same
+# reactor tick are collected and sent as one batch over AMP. This sets
+# how long (in seconds) to wait for more messages before sending the
+# batch. 0 sends at the end of the current tick. Set to None to send
+# every message on its own.
+AMP_BATCH_WINDOW = 0
+# The zlib compression level (1-9) for data sent over AMP, where higher
+# compresses better but is slower. 0 turns off compression. Data shorter
+# than AMP_COMPRESSION_THRESHOLD bytes is always sent uncompressed.
+AMP_COMPRESSION_LEVEL = 6
+AMP_COMPRESSION_THRESHOLD = 512
 # Database objects are cached in what is known as the idmapper. The idmapper
 # caching results in a massive speedup of the server (since it dramatically
 # limits the number of database accesses needed) and also allows for
@@ -193,12 +213,27 @@ IDMAPPER_CACHE_MAXSIZE = 200      # (MB)
 # connections will be queued to this rate, so none will be lost.
 # Must be set to a value > 0.
 MAX_CONNECTION_RATE = 2
-# Determine how many commands per second a given Session is allowed
-# to send to the Portal via a connected protocol. Too high rate will
-# drop the command and echo a warning. Note that this will also cap
-# OOB messages so don't set it too low if you expect a lot of events
-# from the client! To turn the limiter off, set to <= 0.
+# This many new connections are accepted at once before the rate above
+# applies, for example for players connecting while the Server
+# reloads. Sessions that were already connected before a reload are
+# always resynced at once.
+MAX_CONNECTION_BURST = 20
+# Determine how many commands per second the Portal relays to the
+# Server, from all Sessions together. Above this rate, the input of
+# each Session is queued and the queues are relayed in turn, so every
+# Session gets its share. Note that this will also cap OOB messages
+# so don't set it too low if you expect a lot of events from the
+# clients! To turn the limiter off, set to <= 0.
 MAX_COMMAND_RATE = 80
+# Determine how many commands per second a given Session is allowed
+# to send on average, after an initial burst of up to
+# MAX_SESSION_COMMAND_BURST commands. Faster input is queued, and
+# dropped with a warning once more than MAX_SESSION_COMMAND_QUEUE
+# commands are waiting. To turn the per-Session limiter off, set
+# MAX_SESSION_COMMAND_RATE to <= 0.
+MAX_SESSION_COMMAND_RATE = 10
+MAX_SESSION_COMMAND_BURST = 20
+MAX_SESSION_COMMAND_QUEUE = 100
 # The warning to echo back to users if they send commands too fast
 COMMAND_RATE_WARNING ="You entered commands too fast. Wait a moment and try again."
 # If this is true, errors and tracebacks from the engine will be
@@ -206,6 +241,25 @@ COMMAND_RATE_WARNING ="You entered commands too fast. Wait a moment and try agai
 # debugging. Showing full tracebacks to regular users could be a
 # security problem - this should *not* be active in a production game!
 IN_GAME_ERRORS = False
+# All subscribers to a TickerHandler interval are normally called right
+# after one another, which can stall the server for a noticeable time if
+# there are very many of them. If this is set to a number > 1, the
+# subscribers of each interval are instead spread out over this many
+# evenly spaced slots within the interval (each subscriber is still
+# called once per interval).
+TICKERHANDLER_STAGGER_SLOTS = 0
+# If set, a TickerHandler tick that has run for longer than this many
+# seconds pauses to let the server handle other things (like player
+# commands) before continuing with the remaining subscribers.
+TICKERHANDLER_TIME_BUDGET = None
+# Timed Scripts are normally all scheduled using one shared timer wheel,
+# which handles very many Scripts much better than giving each Script a
+# timer of its own (which is what happens if this is set to False).
+SCRIPT_TIMER_WHEEL = True
+# Number of worker processes used for code run with
+# evennia.utils.utils.run_async(..., use_process=True). The workers
+# are started on first use. None starts one per CPU core.
+ASYNC_PROCESS_POOL_SIZE = None
 
 ######################################################################
 # Evennia Database config
@@ -315,6 +369,10 @@ CMDSET_CHARACTER = "commands.default_cmdsets.CharacterCmdSet"
 CMDSET_PLAYER = "commands.default_cmdsets.PlayerCmdSet"
 # Location to search for cmdsets if full path not given
 CMDSET_PATHS = ["commands", "evennia", "contribs"]
+# The cmdhandler caches the result of merging the cmdsets available to
+# a caller. This is the max number of such merged cmdsets to keep; the
+# least recently used merger is thrown away when the cache is full.
+CMDSET_MERGE_CACHE_SIZE = 1000
 # Parent class for all default commands. Changing this class will
 # modify all default commands, so do so carefully.
 COMMAND_DEFAULT_CLASS = "evennia.commands.default.muxcommand.MuxCommand"
@@ -368,6 +426,22 @@ START_LOCATION = "#2"
 # out of sync between the processes. Keep on unless you face such
 # issues.
 TYPECLASS_AGGRESSIVE_CACHE = True
+# Changes to nested mutables stored in Attributes (such as
+# obj.db.mylist.append(1)) are normally saved to the database
+# immediately, re-pickling the whole Attribute value every time. If this
+# is set, such changes are instead collected and each changed Attribute
+# is saved only once, the next time the server gets control back (or
+# when the current transaction commits). Reading the Attribute always
+# gives the updated value. The drawback is that changes made just
+# before a server crash may be lost.
+ATTRIBUTE_DEFERRED_SAVE = False
+# Attribute values are normally unpickled every time they are read. If
+# this is set, the unpickled value is cached on the Attribute until it
+# is changed or a database object stored in it is deleted. This saves
+# a lot of work for often-read Attributes. Note however that in-place
+# changes to stored custom class instances (which are not saved to the
+# database) will then be visible to later reads from the cache.
+ATTRIBUTE_VALUE_CACHE = False
 
 ######################################################################
 # Batch processors
@@ -14,16 +14,54 @@ import weakref
 from collections import defaultdict
 
 from django.db import models
+from django.db.models.signals import post_delete
 from django.conf import settings
 from django.utils.encoding import smart_str
 
 from evennia.locks.lockhandler import LockHandler
 from evennia.utils.idmapper.models import SharedMemoryModel
-from evennia.utils.dbserialize import to_pickle, from_pickle
+from evennia.utils.dbserialize import to_pickle, from_pickle, pack_dbobj
+from evennia.utils.dbserialize import get_packed_dbobj_refs
 from evennia.utils.picklefield import PickledObjectField
 from evennia.utils.utils import lazy_property, to_str, make_iter
 
 _TYPECLASS_AGGRESSIVE_CACHE = settings.TYPECLASS_AGGRESSIVE_CACHE
+_ATTRIBUTE_VALUE_CACHE = settings.ATTRIBUTE_VALUE_CACHE
+
+# Attributes whose cached values reference a given database object,
+# stored as {(natural_key, id): WeakSet(attributes)}
+_VALUE_CACHE_REFS = defaultdict(weakref.WeakSet)
+_VALUE_CACHE_STATS = {"hits": 0, "misses": 0, "invalidations": 0}
+
+
+def value_cache_stats():
+    """
+    Get the statistics of the Attribute value cache
+    (see `settings.ATTRIBUTE_VALUE_CACHE`).
+
+    Returns:
+        stats (dict): The number of `hits` (unpickles saved),
+            `misses` and `invalidations` of the cache since
+            the server started.
+
+    """
+    return dict(_VALUE_CACHE_STATS)
+
+
+def _invalidate_value_caches(sender, instance, **kwargs):
+    """
+    Signal handler that clears the cached value of all Attributes
+    that reference the database object just deleted.
+
+    """
+    if not _VALUE_CACHE_REFS:
+        return
+    packed = pack_dbobj(instance)
+    if packed is not instance:
+        for attr in _VALUE_CACHE_REFS.pop((packed[1], packed[3]), ()):
+            attr._cached_value = None
+            _VALUE_CACHE_STATS["invalidations"] += 1
+post_delete.connect(_invalidate_value_caches)
 
 #------------------------------------------------------------
 #
@@ -109,6 +147,11 @@ class Attribute(SharedMemoryModel):
     attrtype = property(lambda self: self.db_attrtype)
     date_created = property(lambda self: self.db_date_created)
 
+    # unsaved value, set by deferred saving of nested mutables
+    _pending_value = None
+    # (db_value, value) when caching unpickled values
+    _cached_value = None
+
     def __lock_storage_get(self):
         return self.db_lock_storage
     def __lock_storage_set(self, value):
@@ -132,18 +175,38 @@ class Attribute(SharedMemoryModel):
     def __value_get(self):
         """
         Getter. Allows for `value = self.value`.
-        We cannot cache here since it makes certain cases (such
-        as storing a dbobj which is then deleted elsewhere) out-of-sync.
-        The overhead of unpickling seems hard to avoid.
+        The unpickled value is only cached if
+        `settings.ATTRIBUTE_VALUE_CACHE` is set. The cache is then
+        cleared when any database object stored in the value is
+        deleted, and is only used as long as `db_value` is unchanged.
         """
-        return from_pickle(self.db_value, db_obj=self)
+        if self._pending_value is not None:
+            # unsaved changes from a deferred save
+            return self._pending_value
+        if not _ATTRIBUTE_VALUE_CACHE:
+            return from_pickle(self.db_value, db_obj=self)
+        db_value, cached = self._cached_value or (None, None)
+        if db_value is not None and db_value is self.db_value:
+            _VALUE_CACHE_STATS["hits"] += 1
+            return cached
+        _VALUE_CACHE_STATS["misses"] += 1
+        db_value = self.db_value
+        value = from_pickle(db_value, db_obj=self)
+        refs = get_packed_dbobj_refs(db_value)
+        if db_value is not None and refs is not None:
+            for ref in refs:
+                _VALUE_CACHE_REFS[ref].add(self)
+            self._cached_value = (db_value, value)
+        return value
 
     #@value.setter
     def __value_set(self, new_value):
         """
-        Setter. Allows for self.value = value. We cannot cache here,
-        see self.__value_get.
+        Setter. Allows for self.value = value. This clears
+        the cached value, see self.__value_get.
         """
+        self._pending_value = None
+        self._cached_value = None
         self.db_value = to_pickle(new_value)
         #print "value_set, self.db_value:", repr(self.db_value)
         self.save(update_fields=["db_value"])
@@ -323,6 +386,17 @@ class AttributeHandler(object):
         self._catcache.pop(catkey, None)
         self._cache_complete = False
 
+    def reset_cache(self):
+        """
+        Empty the cache, to have it reloaded from the database on next
+        use. This is needed if the attributes were changed from another
+        process.
+
+        """
+        self._cache = {}
+        self._catcache = {}
+        self._cache_complete = False
+
     def has(self, key=None, category=None):
         """
         Checks if the given Attribute (or list of Attributes) exists on
@@ -661,6 +735,11 @@ import fnmatch
 _RE_NICK_ARG = re.compile(r"\\(\$)([1-9][0-9]?)")
 _RE_NICK_TEMPLATE_ARG = re.compile(r"(\$)([1-9][0-9]?)")
 _RE_NICK_SPACE = re.compile(r"\\ ")
+# named groups (not escaped) and trailing inline flags of a nick regex
+_RE_NICK_GROUP = re.compile(r"(?<!\\)((?:\\\\)*)\(\?P<\w+>")
+_RE_NICK_FLAGS = re.compile(r"\(\?[iLmsux]+\)$")
+# python2 regexes can't have more than 99 groups
+_NICK_MAX_GROUPS = 99
 
 
 class NickTemplateInvalid(ValueError):
@@ -738,6 +817,80 @@ class NickHandler(AttributeHandler):
     def __init__(self, *args, **kwargs):
         super(NickHandler, self).__init__(*args, **kwargs)
         self._regex_cache = {}
+        # compiled nick matchers, per tuple of categories
+        self._matchers = {}
+
+    def _get_matcher(self, categories):
+        """
+        Get the compiled matcher for all nicks in the given
+        categories. This is built on first use and cached until a
+        nick is added or removed.
+
+        Args:
+            categories (tuple): The nick categories to match.
+
+        Returns:
+            matcher (list): A list of `(regex, nicks)`, where `regex`
+                is an alternation of the regexes of up to 99 nicks (the
+                max number of groups in a regex) and `nicks` is a
+                dict mapping the group index of each alternative to the
+                nick's `(template, {argname: groupindex})`. Empty if there
+                are no nicks.
+
+        """
+        matcher = self._matchers.get(categories)
+        if matcher is not None:
+            return matcher
+
+        # a later category overrides a nick with the same key
+        nicks = {}
+        for category in categories:
+            nicks.update({nick.key: nick
+                for nick in make_iter(self.get(category=category, return_obj=True)) if nick and nick.key})
+
+        matcher = []
+        patterns, templates, ngroups = [], {}, 0
+        for nick in nicks.values():
+            nick_regex, template, _, _ = nick.value
+            regex = self._regex_cache.get(nick_regex)
+            if not regex:
+                regex = re.compile(nick_regex, re.I + re.DOTALL + re.U)
+                self._regex_cache[nick_regex] = regex
+            if ngroups + regex.groups + 1 > _NICK_MAX_GROUPS:
+                matcher.append((re.compile("|".join(patterns), re.I + re.M + re.S + re.U), templates))
+                patterns, templates, ngroups = [], {}, 0
+            # unnamed groups so names can repeat between alternatives
+            pattern = _RE_NICK_GROUP.sub(r"\1(", _RE_NICK_FLAGS.sub("", nick_regex))
+            patterns.append("(%s)" % pattern)
+            ngroups += 1
+            templates[ngroups] = (template, dict((name, ngroups + index)
+                                                 for name, index in regex.groupindex.items()))
+            ngroups += regex.groups
+        if patterns:
+            matcher.append((re.compile("|".join(patterns), re.I + re.M + re.S + re.U), templates))
+        self._matchers[categories] = matcher
+        return matcher
+
+    def _match(self, string, categories):
+        """
+        Match a string against the nicks in the given categories.
+
+        Args:
+            string (str): The (stripped) string to match.
+            categories (tuple): The nick categories to match.
+
+        Returns:
+            result (str or None): The string with the nick replacement
+                done, or `None` if no nick matched.
+
+        """
+        for regex, templates in self._get_matcher(categories):
+            match = regex.match(string)
+            if match:
+                template, args = templates[match.lastindex]
+                return template.format(**dict((name, match.group(index))
+                                              for name, index in args.items()))
+        return None
 
     def has(self, key, category="inputline"):
         """
@@ -794,6 +947,7 @@ class NickHandler(AttributeHandler):
         """
         nick_regex, nick_template = initialize_nick_templates(key, replacement)
         super(NickHandler, self).add(key, (nick_regex, nick_template, key, replacement), category=category, **kwargs)
+        self._matchers = {}
 
     def remove(self, key, category="inputline", **kwargs):
         """
@@ -808,6 +962,25 @@ class NickHandler(AttributeHandler):
 
         """
         super(NickHandler, self).remove(key, category=category, **kwargs)
+        self._matchers = {}
+
+    def clear(self, *args, **kwargs):
+        """
+        Remove all Nicks on this object. Takes the same arguments
+        as `AttributeHandler.clear`.
+
+        """
+        super(NickHandler, self).clear(*args, **kwargs)
+        self._matchers = {}
+
+    def reset_cache(self):
+        """
+        Empty the cache, to have it reloaded from the database on next
+        use.
+
+        """
+        super(NickHandler, self).reset_cache()
+        self._matchers = {}
 
     def nickreplace(self, raw_string, categories=("inputline", "channel"), include_player=True):
         """
@@ -828,25 +1001,18 @@ class NickHandler(AttributeHandler):
                 their nick equivalents.
 
         """
-        nicks = {}
-        for category in make_iter(categories):
-            nicks.update({nick.key: nick
-              for nick in make_iter(self.get(category=category, return_obj=True)) if nick and nick.key})
+        categories = tuple(make_iter(categories))
+        handlers = [self]
         if include_player and self.obj.has_player:
-            for category in make_iter(categories):
-                nicks.update({nick.key: nick
-                    for nick in make_iter(self.obj.player.nicks.get(category=category, return_obj=True))
-                        if nick and nick.key})
-        for key, nick in nicks.iteritems():
-            nick_regex, template, _, _ = nick.value
-            regex = self._regex_cache.get(nick_regex)
-            if not regex:
-                regex = re.compile(nick_regex, re.I + re.DOTALL + re.U)
-                self._regex_cache[nick_regex] = regex
-
-            is_match, raw_string = parse_nick_template(raw_string.strip(), regex, template)
-            if is_match:
-                break
+            # Player nicks override Character nicks with the same key
+            handlers.insert(0, self.obj.player.nicks)
+        string = raw_string.strip()
+        for handler in handlers:
+            if handler._get_matcher(categories):
+                raw_string = string
+                replaced = handler._match(string, categories)
+                if replaced is not None:
+                    return replaced
         return raw_string
 
 
@@ -56,6 +56,51 @@ _TYPECLASS_AGGRESSIVE_CACHE = settings.TYPECLASS_AGGRESSIVE_CACHE
 _GA = object.__getattribute__
 _SA = object.__setattr__
 
+# resolved typeclasses, {(path, use_defaultpaths): class}
+_TYPECLASS_CACHE = {}
+
+
+def get_typeclass(path, defaultpaths=False):
+    """
+    Get the class of a typeclass path. Paths that were resolved before
+    are looked up in a cache instead of being imported again.
+
+    Args:
+        path (str): Python path to the typeclass.
+        defaultpaths (bool, optional): Also search the paths in
+            `settings.TYPECLASS_PATHS`, as done for paths given by
+            the user.
+
+    Returns:
+        typeclass (class): The typeclass.
+
+    Raises:
+        ImportError: If the typeclass could not be loaded.
+
+    Notes:
+        Modules are only imported once per process, so the cache
+        stays valid until the Server process restarts, like it does
+        on a reload. Failed lookups are not cached.
+
+    """
+    key = (path, defaultpaths)
+    try:
+        return _TYPECLASS_CACHE[key]
+    except KeyError:
+        typeclass = class_from_module(path, defaultpaths=settings.TYPECLASS_PATHS
+                                      if defaultpaths else None)
+        _TYPECLASS_CACHE[key] = typeclass
+        return typeclass
+
+
+def flush_typeclass_cache():
+    """
+    Empty the cache of resolved typeclasses, for example after a
+    typeclass module was reloaded by hand.
+
+    """
+    _TYPECLASS_CACHE.clear()
+
 #------------------------------------------------------------
 #
 # Typed Objects
@@ -230,15 +275,15 @@ class TypedObject(SharedMemoryModel):
         super(TypedObject, self).__init__(*args, **kwargs)
         if typeclass_path:
             try:
-                self.__class__ = class_from_module(typeclass_path, defaultpaths=settings.TYPECLASS_PATHS)
+                self.__class__ = get_typeclass(typeclass_path, defaultpaths=True)
             except Exception:
                 log_trace()
                 try:
-                    self.__class__ = class_from_module(self.__settingsclasspath__)
+                    self.__class__ = get_typeclass(self.__settingsclasspath__)
                 except Exception:
                     log_trace()
                     try:
-                        self.__class__ = class_from_module(self.__defaultclasspath__)
+                        self.__class__ = get_typeclass(self.__defaultclasspath__)
                     except Exception:
                         log_trace()
                         self.__class__ = self._meta.proxy_for_model or self.__class__
@@ -246,11 +291,11 @@ class TypedObject(SharedMemoryModel):
                 self.db_typeclass_path = typeclass_path
         elif self.db_typeclass_path:
             try:
-                self.__class__ = class_from_module(self.db_typeclass_path)
+                self.__class__ = get_typeclass(self.db_typeclass_path)
             except Exception:
                 log_trace()
                 try:
-                    self.__class__ = class_from_module(self.__defaultclasspath__)
+                    self.__class__ = get_typeclass(self.__defaultclasspath__)
                 except Exception:
                     log_trace()
                     self.__dbclass__ = self._meta.proxy_for_model or self.__class__
@@ -291,6 +336,26 @@ class TypedObject(SharedMemoryModel):
     def nattributes(self):
         return NAttributeHandler(self)
 
+    def at_reconcile(self, old_values):
+        """
+        Called after this object was updated with changes saved to the
+        database by another process. This also empties the caches of
+        its Attributes, Tags and locks, since those may have changed
+        as well.
+
+        Args:
+            old_values (dict): The previous values of the changed
+                fields, `{fieldname: value}`.
+
+        """
+        super(TypedObject, self).at_reconcile(old_values)
+        for handlername in ("attributes", "nicks", "tags", "aliases", "permissions"):
+            handler = self.__dict__.get(handlername)
+            if handler is not None:
+                handler.reset_cache()
+        if "db_lock_storage" in old_values and "locks" in self.__dict__:
+            self.locks.reset()
+
 
     class Meta(object):
         """
@@ -453,7 +518,7 @@ class TypedObject(SharedMemoryModel):
 
         if not callable(new_typeclass):
             # this is an actual class object - build the path
-            new_typeclass = class_from_module(new_typeclass, defaultpaths=settings.TYPECLASS_PATHS)
+            new_typeclass = get_typeclass(new_typeclass, defaultpaths=True)
 
         # if we get to this point, the class is ok.
 
@@ -212,6 +212,17 @@ class TagHandler(object):
         self._catcache.pop(catkey, None)
         self._cache_complete = False
 
+    def reset_cache(self):
+        """
+        Empty the cache, to have it reloaded from the database on next
+        use. This is needed if the tags were changed from another
+        process.
+
+        """
+        self._cache = {}
+        self._catcache = {}
+        self._cache_complete = False
+
 
     def add(self, tag=None, category=None, data=None):
         """
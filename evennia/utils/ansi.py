@@ -16,6 +16,8 @@ user.
 from builtins import object, range
 
 import re
+from array import array
+from bisect import bisect_left, bisect_right
 from evennia.utils import utils
 from evennia.utils.utils import to_str, to_unicode
 from future.utils import with_metaclass
@@ -65,8 +67,11 @@ ANSI_SPACE = " "
 ANSI_ESCAPES = ("{{", "\\\\", "\|\|")
 
 from collections import OrderedDict
-_PARSE_CACHE = OrderedDict()
-_PARSE_CACHE_SIZE = 10000
+_TOKEN_CACHE = OrderedDict()
+_TOKEN_CACHE_SIZE = 10000
+
+# render targets, indexing the per-code render tuples
+_RENDER_ANSI, _RENDER_XTERM256, _RENDER_STRIP = 0, 1, 2
 
 
 class ANSIParser(object):
@@ -226,6 +231,94 @@ class ANSIParser(object):
         """
         return self.mxp_sub.sub(r'\2', string)
 
+    def render_code(self, code):
+        """
+        Get the renderings of a single markup code found by the
+        tokenizer. This is only called once per unique code.
+
+        Args:
+            code (str): The markup code, like `{r`, `|[505`, an escape
+                such as `{{` or a raw ANSI sequence already in the text.
+
+        Returns:
+            renders (tuple): The code rendered as `(16-color ANSI,
+                xterm256, stripped)`.
+
+        """
+        if self.ansi_regex.match(code):
+            # raw ANSI sequence manually inserted in the string
+            return (code, code, "")
+        if code in self.ansi_map:
+            ansi = self.ansi_map[code]
+            return (ansi, ansi, self.strip_raw_codes(ansi))
+        rgbmatch = self.xterm256_sub.match(self.ansi_bright_bgs_map.get(code, code))
+        if rgbmatch:
+            return (self.sub_xterm256(rgbmatch, False), self.sub_xterm256(rgbmatch, True), "")
+        # an escape - this is replaced with a single instance
+        return (code[0], code[0], code[0])
+
+    def tokenize(self, string):
+        """
+        Split a string into a cached token list in one pass. Plain text
+        is found at even indexes of the list and the render tuples of
+        each markup code (see `render_code`) at the odd ones.
+
+        Args:
+            string (str): The string to tokenize.
+
+        Returns:
+            tokens (list): The token list. This is shared by the cache
+                and must not be modified.
+
+        """
+        global _TOKEN_CACHE
+        tokens = _TOKEN_CACHE.get(string)
+        if tokens is not None:
+            return tokens
+
+        try:
+            code_renders = self._code_renders
+        except AttributeError:
+            code_renders = self._code_renders = {}
+        tokens = self.tokenize_sub.split(utils.to_str(string))
+        for itoken in range(1, len(tokens), 2):
+            code = tokens[itoken]
+            if code not in code_renders:
+                code_renders[code] = self.render_code(code)
+            tokens[itoken] = code_renders[code]
+
+        # cache and crop old cache
+        _TOKEN_CACHE[string] = tokens
+        if len(_TOKEN_CACHE) > _TOKEN_CACHE_SIZE:
+            _TOKEN_CACHE.popitem(last=False)
+        return tokens
+
+    def render(self, tokens, strip_ansi=False, xterm256=False, mxp=False):
+        """
+        Render a token list from `tokenize` to a string.
+
+        Args:
+            tokens (list): The tokens to render.
+            strip_ansi (boolean, optional): Strip all found ansi markup.
+            xterm256 (boolean, optional): If actually using xterm256 or if
+                these values should be converted to 16-color ANSI.
+            mxp (boolean, optional): Keep MXP commands in string.
+
+        Returns:
+            string (str): The rendered string.
+
+        """
+        if strip_ansi:
+            target = _RENDER_STRIP
+        else:
+            target = _RENDER_XTERM256 if xterm256 else _RENDER_ANSI
+        parts = tokens[:]
+        parts[1::2] = [renders[target] for renders in tokens[1::2]]
+        rendered = "".join(parts)
+        if not mxp and "|lc" in rendered:
+            rendered = self.strip_mxp(rendered)
+        return rendered
+
     def parse_ansi(self, string, strip_ansi=False, xterm256=False, mxp=False):
         """
         Parses a string, subbing color codes according to the stored
@@ -251,42 +344,8 @@ class ANSIParser(object):
         if not string:
             return ''
 
-        # check cached parsings
-        global _PARSE_CACHE
-        cachekey = "%s-%s-%s-%s" % (string, strip_ansi, xterm256, mxp)
-        if cachekey in _PARSE_CACHE:
-            return _PARSE_CACHE[cachekey]
-
-        # pre-convert bright colors to xterm256 color tags
-        string = self.brightbg_sub.sub(self.sub_brightbg, string)
-
-        def do_xterm256(part):
-            return self.sub_xterm256(part, xterm256)
-
-        in_string = utils.to_str(string)
-
-        # do string replacement
-        parsed_string =  ""
-        parts = self.ansi_escapes.split(in_string) + [" "]
-        for part, sep in zip(parts[::2], parts[1::2]):
-            pstring = self.xterm256_sub.sub(do_xterm256, part)
-            pstring = self.ansi_sub.sub(self.sub_ansi, pstring)
-            parsed_string += "%s%s" % (pstring, sep[0].strip())
-
-        if not mxp:
-            parsed_string = self.strip_mxp(parsed_string)
-
-        if strip_ansi:
-            # remove all ansi codes (including those manually
-            # inserted in string)
-            return self.strip_raw_codes(parsed_string)
-
-        # cache and crop old cache
-        _PARSE_CACHE[cachekey] = parsed_string
-        if len(_PARSE_CACHE) > _PARSE_CACHE_SIZE:
-           _PARSE_CACHE.popitem(last=False)
-
-        return parsed_string
+        return self.render(self.tokenize(string), strip_ansi=strip_ansi,
+                           xterm256=xterm256, mxp=mxp)
 
     # Mapping using {r {n etc
 
@@ -457,6 +516,14 @@ class ANSIParser(object):
     # instance of each
     ansi_escapes = re.compile(r"(%s)" % "|".join(ANSI_ESCAPES), re.DOTALL)
 
+    # all of the above in one regex, used to tokenize a string in one
+    # pass. Escapes come first since they protect the following char.
+    # The lookahead quickly skips text that can't start any markup.
+    tokenize_sub = re.compile(r"((?=[{|\\\033])(?:%s))" % r"|".join(
+        list(ANSI_ESCAPES) + [ansi_re] + [tup[0] for tup in xterm256_map] +
+        [r"(?<!\|)%s" % re.escape(tup[0]) for tup in ansi_bright_bgs] +
+        [re.escape(tup[0]) for tup in ext_ansi_map]), re.DOTALL)
+
 ANSI_PARSER = ANSIParser()
 
 
@@ -530,6 +597,28 @@ def group(lst, n):
             yield tuple(val)
 
 
+def _to_array(indexes):
+    """
+    Store a sequence of string indexes compactly.
+
+    """
+    return indexes if isinstance(indexes, array) else array('I', indexes)
+
+
+_INDEX_RANGE = array('I')
+
+def _index_range(start, end):
+    """
+    Get an array of the indexes from start up to end. This slices a
+    shared array, which is a lot faster than building it from a range.
+
+    """
+    global _INDEX_RANGE
+    if end > len(_INDEX_RANGE):
+        _INDEX_RANGE = array('I', range(0, max(end, 2 * len(_INDEX_RANGE))))
+    return _INDEX_RANGE[start:end]
+
+
 def _spacing_preflight(func):
     """
     This wrapper function is used to do some preflight checks on
@@ -593,14 +682,9 @@ def _transform(func_name):
     """
     def wrapped(self, *args, **kwargs):
         replacement_string = _query_super(func_name)(self, *args, **kwargs)
-        to_string = []
-        char_counter = 0
-        for index in range(0, len(self._raw_string)):
-            if index in self._code_indexes:
-                to_string.append(self._raw_string[index])
-            elif index in self._char_indexes:
-                to_string.append(replacement_string[char_counter])
-                char_counter += 1
+        to_string = list(self._raw_string)
+        for index, char in zip(self._char_indexes, replacement_string):
+            to_string[index] = char
         return ANSIString(
             ''.join(to_string), decoded=True,
             code_indexes=self._code_indexes, char_indexes=self._char_indexes,
@@ -657,7 +741,8 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
 
         Internally, ANSIString can also passes itself precached code/character
         indexes and clean strings to avoid doing extra work when combining
-        ANSIStrings.
+        ANSIStrings. The indexes may be left out, in which case they are only
+        calculated if they are actually needed.
 
         """
         string = args[0]
@@ -668,25 +753,26 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
         code_indexes = kwargs.pop('code_indexes', None)
         char_indexes = kwargs.pop('char_indexes', None)
         clean_string = kwargs.pop('clean_string', None)
-        # All True, or All False, not just one.
-        checks = [x is None for x in [code_indexes, char_indexes, clean_string]]
-        if not len(set(checks)) == 1:
-            raise ValueError("You must specify code_indexes, char_indexes, "
-                             "and clean_string together, or not at all.")
-        if not all(checks):
+        # Both indexes or none, and only together with the clean string.
+        if (code_indexes is None) != (char_indexes is None) or (
+                code_indexes is not None and clean_string is None):
+            raise ValueError("You must specify code_indexes and char_indexes "
+                             "together, and only along with clean_string.")
+        if clean_string is not None:
             decoded = True
         if not decoded:
             # Completely new ANSI String
-            clean_string = to_unicode(parser.parse_ansi(string, strip_ansi=True, mxp=True))
-            string = parser.parse_ansi(string, xterm256=True, mxp=True)
+            tokens = parser.tokenize(string)
+            clean_string = to_unicode(parser.render(tokens, strip_ansi=True, mxp=True))
+            string = parser.render(tokens, xterm256=True, mxp=True)
         elif clean_string is not None:
             # We have an explicit clean string.
             pass
         elif hasattr(string, '_clean_string'):
             # It's already an ANSIString
             clean_string = string._clean_string
-            code_indexes = string._code_indexes
-            char_indexes = string._char_indexes
+            if string._indexes is not None:
+                code_indexes, char_indexes = string._indexes
             string = string._raw_string
         else:
             # It's a string that has been pre-ansi decoded.
@@ -698,8 +784,10 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
         ansi_string = super(ANSIString, cls).__new__(ANSIString, to_str(clean_string), "utf-8")
         ansi_string._raw_string = string
         ansi_string._clean_string = clean_string
-        ansi_string._code_indexes = code_indexes
-        ansi_string._char_indexes = char_indexes
+        if code_indexes is None:
+            ansi_string._indexes = None
+        else:
+            ansi_string._indexes = (_to_array(code_indexes), _to_array(char_indexes))
         return ansi_string
 
     def __str__(self):
@@ -745,40 +833,72 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
         The third thing to set is the _clean_string. This is a unicode object
         that is devoid of all ANSI Escapes.
 
-        Finally, _code_indexes and _char_indexes are defined. These are lookup
-        tables for which characters in the raw string are related to ANSI
-        escapes, and which are for the readable text.
+        Finally, _code_indexes and _char_indexes are defined. These are
+        sorted lookup tables (arrays) for which characters in the raw string
+        are related to ANSI escapes, and which are for the readable text.
+        They are only built the first time they are needed, since many
+        strings are only ever combined and padded.
 
         """
         self.parser = kwargs.pop('parser', ANSI_PARSER)
         super(ANSIString, self).__init__()
-        if self._code_indexes is None:
-            self._code_indexes, self._char_indexes = self._get_indexes()
+
+    @property
+    def _code_indexes(self):
+        "Indexes of the raw string occupied by ANSI escapes"
+        if self._indexes is None:
+            self._indexes = self._get_indexes()
+        return self._indexes[0]
+
+    @property
+    def _char_indexes(self):
+        "Indexes of the raw string occupied by readable characters"
+        if self._indexes is None:
+            self._indexes = self._get_indexes()
+        return self._indexes[1]
 
     @staticmethod
     def _shifter(iterable, offset):
         """
-        Takes a list of integers, and produces a new one incrementing all
-        by a number.
+        Takes a sequence of integers, and produces a new index array
+        incrementing all by a number.
+
+        """
+        return array('I', [i + offset for i in iterable])
+
+    def _codes_between(self, start, end):
+        """
+        Get all ANSI escapes found in the raw string between two indexes.
+
+        Args:
+            start (int): Start raw index, inclusive.
+            end (int): End raw index, exclusive.
+
+        Returns:
+            codes (unicode): The escapes, in order.
 
         """
-        return [i + offset for i in iterable]
+        code_indexes = self._code_indexes
+        raw_string = self._raw_string
+        return ''.join(raw_string[index] for index in
+                       code_indexes[bisect_left(code_indexes, start):
+                                    bisect_left(code_indexes, end)])
 
     @classmethod
     def _adder(cls, first, second):
         """
-        Joins two ANSIStrings, preserving calculated info.
+        Joins two ANSIStrings, preserving calculated info. Indexes are
+        only combined if both strings already have them.
 
         """
 
         raw_string = first._raw_string + second._raw_string
         clean_string = first._clean_string + second._clean_string
-        code_indexes = first._code_indexes[:]
-        char_indexes = first._char_indexes[:]
-        code_indexes.extend(
-            cls._shifter(second._code_indexes, len(first._raw_string)))
-        char_indexes.extend(
-            cls._shifter(second._char_indexes, len(first._raw_string)))
+        if first._indexes is None or second._indexes is None:
+            return ANSIString(raw_string, clean_string=clean_string)
+        offset = len(first._raw_string)
+        code_indexes = first._code_indexes + cls._shifter(second._code_indexes, offset)
+        char_indexes = first._char_indexes + cls._shifter(second._char_indexes, offset)
         return ANSIString(raw_string, code_indexes=code_indexes,
                           char_indexes=char_indexes,
                           clean_string=clean_string)
@@ -839,20 +959,21 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
             string = self[slc.start]._raw_string
         except IndexError:
             return ANSIString('')
-        last_mark = slice_indexes[0]
-        # Check between the slice intervals for escape sequences.
-        i = None
-        for i in slice_indexes[1:]:
-            for index in range(last_mark, i):
-                if index in self._code_indexes:
-                    string += self._raw_string[index]
-            last_mark = i
-            try:
-                string += self._raw_string[i]
-            except IndexError:
-                pass
-        if i is not None:
-            append_tail = self._get_interleving(self._char_indexes.index(i) + 1)
+        raw_string = self._raw_string
+        if slc.step in (None, 1):
+            # a contiguous slice is a plain cut of the raw string, since
+            # everything between the first and last characters is kept
+            last_mark = slice_indexes[-1]
+            string += raw_string[slice_indexes[0] + 1:last_mark + 1]
+        else:
+            last_mark = slice_indexes[0]
+            # Check between the slice intervals for escape sequences.
+            for i in slice_indexes[1:]:
+                string += self._codes_between(last_mark, i) + raw_string[i]
+                last_mark = i
+        if len(slice_indexes) > 1:
+            append_tail = self._get_interleving(
+                bisect_left(self._char_indexes, last_mark) + 1)
         else:
             append_tail = ''
         return ANSIString(string + append_tail, decoded=True)
@@ -880,12 +1001,9 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
         item = self._char_indexes[item]
 
         clean = self._raw_string[item]
-        result = ''
         # Get the character they're after, and replay all escape sequences
         # previous to it.
-        for index in range(0, item + 1):
-            if index in self._code_indexes:
-                result += self._raw_string[index]
+        result = self._codes_between(0, item)
         return ANSIString(result + clean + append_tail, decoded=True)
 
     def clean(self):
@@ -946,14 +1064,14 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
 
         """
 
-        code_indexes = []
-        for match in self.parser.ansi_regex.finditer(self._raw_string):
-            code_indexes.extend(range(match.start(), match.end()))
-        if not code_indexes:
-            # Plain string, no ANSI codes.
-            return code_indexes, list(range(0, len(self._raw_string)))
+        code_indexes, char_indexes = array('I'), array('I')
         # all indexes not occupied by ansi codes are normal characters
-        char_indexes = [i for i in range(len(self._raw_string)) if i not in code_indexes]
+        last_end = 0
+        for match in self.parser.ansi_regex.finditer(self._raw_string):
+            char_indexes.extend(_index_range(last_end, match.start()))
+            code_indexes.extend(_index_range(match.start(), match.end()))
+            last_end = match.end()
+        char_indexes.extend(_index_range(last_end, len(self._raw_string)))
         return code_indexes, char_indexes
 
     def _get_interleving(self, index):
@@ -962,20 +1080,16 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
         character.
 
         """
+        char_indexes = self._char_indexes
         try:
-            index = self._char_indexes[index - 1]
+            index = char_indexes[index - 1]
         except IndexError:
             return ''
-        s = ''
-        while True:
-            index += 1
-            if index in self._char_indexes:
-                break
-            elif index in self._code_indexes:
-                s += self._raw_string[index]
-            else:
-                break
-        return s
+        # all indexes up to the next character are codes
+        next_char = bisect_right(char_indexes, index)
+        if next_char < len(char_indexes):
+            return self._raw_string[index + 1:char_indexes[next_char]]
+        return self._raw_string[index + 1:]
 
     def split(self, by, maxsplit=-1):
         """
@@ -1013,16 +1127,7 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
             return NotImplemented
         raw_string = self._raw_string * other
         clean_string = self._clean_string * other
-        code_indexes = self._code_indexes[:]
-        char_indexes = self._char_indexes[:]
-        for i in range(1, other + 1):
-            code_indexes.extend(
-                self._shifter(self._code_indexes, i * len(self._raw_string)))
-            char_indexes.extend(
-                self._shifter(self._char_indexes, i * len(self._raw_string)))
-        return ANSIString(
-            raw_string, code_indexes=code_indexes, char_indexes=char_indexes,
-            clean_string=clean_string)
+        return ANSIString(raw_string, clean_string=clean_string)
 
     def __rmul__(self, other):
         return self.__mul__(other)
@@ -1057,19 +1162,18 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
 
     def join(self, iterable):
         """
-        Joins together strings in an iterable.
+        Joins together strings in an iterable. The strings are joined
+        in one go, so this is linear in the total length.
 
         """
-        result = ANSIString('')
-        last_item = None
+        raw_strings, clean_strings = [], []
         for item in iterable:
-            if last_item is not None:
-                result += self._raw_string
             if not isinstance(item, ANSIString):
                 item = ANSIString(item)
-            result += item
-            last_item = item
-        return result
+            raw_strings.append(item._raw_string)
+            clean_strings.append(item._clean_string)
+        return ANSIString(self._raw_string.join(raw_strings),
+                          clean_string=self._clean_string.join(clean_strings))
 
     def _filler(self, char, amount):
         """
@@ -1080,8 +1184,8 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
         if not isinstance(char, ANSIString):
             line = char * amount
             return ANSIString(
-                char * amount, code_indexes=[], char_indexes=list(range(0, len(line))),
-                clean_string=char)
+                line, code_indexes=array('I'), char_indexes=_index_range(0, len(line)),
+                clean_string=line)
         try:
             start = char._code_indexes[0]
         except IndexError:
@@ -1090,10 +1194,9 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
         prefix = char._raw_string[start:end]
         postfix = char._raw_string[end + 1:]
         line = char._clean_string * amount
-        code_indexes = [i for i in range(0, len(prefix))]
         length = len(prefix) + len(line)
-        code_indexes.extend([i for i in range(length, length + len(postfix))])
-        char_indexes = self._shifter(range(0, len(line)), len(prefix))
+        code_indexes = _index_range(0, len(prefix)) + _index_range(length, length + len(postfix))
+        char_indexes = _index_range(len(prefix), length)
         raw_string = prefix + line + postfix
         return ANSIString(
             raw_string, clean_string=line, char_indexes=char_indexes,
@@ -27,13 +27,15 @@ try:
     from cPickle import dumps, loads
 except ImportError:
     from pickle import dumps, loads
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.contrib.contenttypes.models import ContentType
 from evennia.utils.utils import to_str, uses_database
 from evennia.utils import logger
 
 __all__ = ("to_pickle", "from_pickle", "do_pickle", "do_unpickle",
-            "dbserialize", "dbunserialize")
+            "dbserialize", "dbunserialize", "flush_deferred_saves",
+            "get_packed_dbobj_refs")
 
 PICKLE_PROTOCOL = 2
 
@@ -61,6 +63,9 @@ _FROM_MODEL_MAP = None
 _TO_MODEL_MAP = None
 _SESSION_HANDLER = None
 _IS_PACKED_DBOBJ = lambda o: type(o) == tuple and len(o) == 4 and o[0] == '__packed_dbobj__'
+_DEFERRED_SAVE = settings.ATTRIBUTE_DEFERRED_SAVE
+_DIRTY_ROOTS = OrderedDict()
+_FLUSH_SCHEDULED = False
 _IS_PACKED_SESSION = lambda o: type(o) == tuple and len(o) == 3 and o[0] == '__packed_session__'
 if uses_database("mysql") and _get_mysql_db_version() < '5.6.4':
     # mysql <5.6.4 don't support millisecond precision
@@ -109,6 +114,60 @@ def _init_globals():
 #
 
 
+def _defer_save(db_obj, value):
+    """
+    Mark the root object of a mutated Saver* structure as dirty
+    instead of saving it right away. All dirty roots are saved with
+    one write each the next time the reactor gets control (or when
+    the current transaction commits), no matter how many times they
+    were mutated in between.
+
+    Args:
+        db_obj (Attribute): The root object to store `value` on.
+        value (_SaverMutable): The updated root value.
+
+    """
+    global _FLUSH_SCHEDULED
+    db_obj._pending_value = value
+    _DIRTY_ROOTS[id(db_obj)] = db_obj
+    if not _FLUSH_SCHEDULED:
+        _FLUSH_SCHEDULED = True
+        from django.db import connection, transaction
+        if connection.in_atomic_block:
+            transaction.on_commit(flush_deferred_saves)
+        # also scheduled in a transaction, in case it is rolled back
+        from twisted.internet import reactor
+        reactor.callFromThread(flush_deferred_saves)
+
+
+def flush_deferred_saves():
+    """
+    Save all Attributes with deferred changes to the database. This
+    is called automatically when using `ATTRIBUTE_DEFERRED_SAVE`, but
+    must also be called before the server reloads or shuts down.
+
+    Returns:
+        nflushed (int): The number of Attributes saved.
+
+    """
+    global _FLUSH_SCHEDULED
+    _FLUSH_SCHEDULED = False
+    dirty = list(_DIRTY_ROOTS.values())
+    _DIRTY_ROOTS.clear()
+    nflushed = 0
+    for db_obj in dirty:
+        value = db_obj._pending_value
+        if value is None or not db_obj.pk:
+            # already saved by other means, or deleted
+            continue
+        try:
+            db_obj.value = value
+            nflushed += 1
+        except Exception:
+            logger.log_trace("Could not save deferred value of %s." % db_obj)
+    return nflushed
+
+
 def _save(method):
     "method decorator that saves data to Attribute"
     def save_wrapper(self, *args, **kwargs):
@@ -141,7 +200,10 @@ class _SaverMutable(object):
         if self._parent:
             self._parent._save_tree()
         elif self._db_obj:
-            self._db_obj.value = self
+            if _DEFERRED_SAVE:
+                _defer_save(self._db_obj, self)
+            else:
+                self._db_obj.value = self
         else:
             logger.log_err("_SaverMutable %s has no root Attribute to save to." % self)
 
@@ -407,6 +469,40 @@ def unpack_session(item):
         return session
     return None
 
+def get_packed_dbobj_refs(data):
+    """
+    Find which database objects are referenced by pickled data,
+    without unpacking them.
+
+    Args:
+        data (any): Data as returned by `to_pickle`.
+
+    Returns:
+        refs (set or None): A set of `(natural_key, id)` for each
+            packed database object in `data`. If `data` contains packed
+            Sessions, `None` is returned, since those may go
+            out-of-sync without any change to the database.
+
+    """
+    refs = set()
+
+    def process_item(item):
+        "Recursively collect packed dbobjs"
+        if isinstance(item, (basestring, int, float, bool)) or item is None:
+            return True
+        elif _IS_PACKED_DBOBJ(item):
+            refs.add((item[1], item[3]))
+            return True
+        elif _IS_PACKED_SESSION(item):
+            return False
+        elif hasattr(item, "items"):
+            return all(process_item(key) and process_item(val) for key, val in item.items())
+        elif hasattr(item, "__iter__"):
+            return all(process_item(val) for val in item)
+        return True
+
+    return refs if process_item(data) else None
+
 #
 # Access methods
 #
@@ -24,12 +24,18 @@ Where always_page decides if the pager is used also if the text is not
 long enough to need to scroll and **kwargs will be passed on to the
 caller.msg() construct (text will be using the pager restrictor).
 
+The text may also be an `EvTable`. Its lines are then only rendered as
+their pages are displayed, so a very large table can be paged without
+first converting it all to a string.
+
 """
 from builtins import object, range
+from itertools import islice
 
 from django.conf import settings
 from evennia import Command, CmdSet
 from evennia.commands import cmdhandler
+from evennia.utils.evtable import EvTable
 
 _CMD_NOMATCH = cmdhandler.CMD_NOMATCH
 _CMD_NOINPUT = cmdhandler.CMD_NOINPUT
@@ -100,7 +106,8 @@ class EvMore(object):
 
         Args:
             caller (Object or Player): Entity reading the text.
-            text (str): The text to put under paging.
+            text (str or EvTable): The text to put under paging. An
+                EvTable is rendered one page at a time.
             always_page (bool, optional): If `False`, the
                 pager will only kick in if `text` is too big
                 to fit the screen.
@@ -110,10 +117,11 @@ class EvMore(object):
         """
         self._caller = caller
         self._kwargs = kwargs
-        lines = text.split("\n")
         self._pages = []
         self._npages = []
         self._npos = []
+        # lines of a table not yet put on a page
+        self._lines = None
         # we use the first session here
         sessions = caller.sessions.get()
         if not sessions:
@@ -121,13 +129,20 @@ class EvMore(object):
         session = sessions[0]
         # set up individual pages for different sessions
         height = session.protocol_flags.get("SCREENHEIGHT", {0:_SCREEN_HEIGHT})[0] - 2
-        self._pages = ["\n".join(lines[i:i+height]) for i in range(0, len(lines), height)]
-        self._npages = len(self._pages)
+        self._height = height
+        if isinstance(text, EvTable):
+            # the table is measured here, its pages are rendered on demand
+            self._lines = text.iterlines()
+            self._npages = max(1, (text.cheight + height - 1) // height)
+        else:
+            lines = text.split("\n")
+            self._pages = ["\n".join(lines[i:i+height]) for i in range(0, len(lines), height)]
+            self._npages = len(self._pages)
         self._npos = 0
 
         if self._npages <= 1 and not always_page:
             # no need for paging; just pass-through.
-            caller.msg(text=text, **kwargs)
+            caller.msg(text=self._get_page(0) if self._lines is not None else text, **kwargs)
         else:
             # go into paging mode
             # first pass on the msg kwargs
@@ -137,12 +152,28 @@ class EvMore(object):
             # goto top of the text
             self.page_top()
 
+    def _get_page(self, pos):
+        """
+        Get the text of a page, rendering table lines up to it if needed.
+
+        Args:
+            pos (int): The page index.
+
+        Returns:
+            text (str): The text of the page.
+
+        """
+        while len(self._pages) <= pos:
+            lines = islice(self._lines, self._height)
+            self._pages.append("\n".join(unicode(line) for line in lines))
+        return self._pages[pos]
+
     def _display(self):
         """
         Pretty-print the page.
         """
         pos = self._pos
-        text = self._pages[pos]
+        text = self._get_page(pos)
         page = _DISPLAY.format(text=text,
                                pageno=pos + 1,
                                pagemax=self._npages)
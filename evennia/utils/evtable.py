@@ -118,14 +118,19 @@ from __future__ import print_function
 from builtins import object, range
 from future.utils import listitems
 
+import re
 from django.conf import settings
 from textwrap import TextWrapper
-from copy import deepcopy, copy
+from copy import copy
 from evennia.utils.utils import to_unicode, m_len
 from evennia.utils.ansi import ANSIString
 
 _DEFAULT_WIDTH = settings.CLIENT_DEFAULT_WIDTH
 
+# any text without these characters can not hold ANSI markup
+_RE_MARKUP = re.compile(r"[{|\\\033]")
+_ANSI_NORMAL = ANSIString("|n")
+
 def _to_ansi(obj):
     """
     convert to ANSIString.
@@ -140,6 +145,48 @@ def _to_ansi(obj):
         return ANSIString(to_unicode(obj))
 
 
+def _to_text(obj):
+    """
+    Convert to unicode, only making it an ANSIString if it actually
+    contains markup. Plain text is much faster to wrap, pad and measure.
+
+    Args:
+        obj (str): Convert incoming text to unicode or ANSIString.
+
+    """
+    if hasattr(obj, "__iter__"):
+        return [_to_text(o) for o in obj]
+    elif isinstance(obj, ANSIString):
+        return obj
+    text = to_unicode(obj, force_string=True)
+    return ANSIString(text) if _RE_MARKUP.search(text) else text
+
+
+def _ansi_join(parts):
+    """
+    Join a line from plain and ANSI strings. The ANSIStrings are not
+    re-parsed, their raw and clean strings are joined directly.
+
+    Args:
+        parts (iterable): Strings to join.
+
+    Returns:
+        line (ANSIString): The joined line.
+
+    """
+    raw_strings, clean_strings = [], []
+    for part in parts:
+        if not isinstance(part, ANSIString):
+            part = _to_text(part)
+        if isinstance(part, ANSIString):
+            raw_strings.append(part.raw())
+            clean_strings.append(part.clean())
+        else:
+            raw_strings.append(part)
+            clean_strings.append(part)
+    return ANSIString(u"".join(raw_strings), clean_string=u"".join(clean_strings))
+
+
 _unicode = unicode
 _whitespace = '\t\n\x0b\x0c\r '
 class ANSITextWrapper(TextWrapper):
@@ -189,7 +236,7 @@ class ANSITextWrapper(TextWrapper):
             pat = self.wordsep_re_uni
         else:
             pat = self.wordsep_simple_re_uni
-        chunks = pat.split(_to_ansi(text))
+        chunks = pat.split(_to_text(text))
         return [chunk for chunk in chunks if chunk]  # remove empty chunks
 
     def _wrap_chunks(self, chunks):
@@ -429,9 +476,11 @@ class EvCell(object):
         self.valign = kwargs.get("valign", "c")
 
         #self.data = self._split_lines(unicode(data))
-        self.data = self._split_lines(_to_ansi(data))
+        self.data = self._split_lines(_to_text(data))
         self.raw_width = max(m_len(line) for line in self.data)
         self.raw_height = len(self.data)
+        # (data, width, lines) of the last wrap, reused until either changes
+        self._wrapped = None
 
         # this is extra trimming required for cels in the middle of a table only
         self.trim_horizontal = 0
@@ -500,20 +549,26 @@ class EvCell(object):
             adjusted data (str): The adjusted text.
 
         Notes:
-            This also updates `raw_width`.
-
+            The wrapped lines are cached until the width or the data
+            changes, since cells get resized many times while a table
+            is balanced.
 
         """
         width = self.width
-        adjusted_data = []
-        for line in data:
-            if 0 < width < m_len(line):
-                # replace_whitespace=False, expand_tabs=False is a
-                # fix for ANSIString not supporting expand_tabs/translate
-                adjusted_data.extend([ANSIString(part + ANSIString("{n"))
-                    for part in wrap(line, width=width, drop_whitespace=False)])
-            else:
-                adjusted_data.append(line)
+        wrapped = self._wrapped
+        if wrapped and wrapped[0] is data and wrapped[1] == width:
+            adjusted_data = list(wrapped[2])
+        else:
+            adjusted_data = []
+            for line in data:
+                if 0 < width < m_len(line):
+                    # replace_whitespace=False, expand_tabs=False is a
+                    # fix for ANSIString not supporting expand_tabs/translate
+                    adjusted_data.extend([ANSIString(part + ANSIString("{n"))
+                        for part in wrap(line, width=width, drop_whitespace=False)])
+                else:
+                    adjusted_data.append(line)
+            self._wrapped = (data, width, list(adjusted_data))
         if self.enforce_size:
             # don't allow too high cells
             excess = len(adjusted_data) - self.height
@@ -646,8 +701,8 @@ class EvCell(object):
 
         """
 
-        left = self.border_left_char * self.border_left + ANSIString('|n')
-        right = ANSIString('|n') + self.border_right_char * self.border_right
+        left = _ansi_join((self.border_left_char * self.border_left, _ANSI_NORMAL))
+        right = _ansi_join((_ANSI_NORMAL, self.border_right_char * self.border_right))
 
         cwidth = self.width + self.pad_left + self.pad_right + \
                  max(0,self.border_left-1) + max(0, self.border_right-1)
@@ -662,7 +717,7 @@ class EvCell(object):
         vfill += self.corner_bottom_right_char if right else ""
         bottom = [vfill for i in range(self.border_bottom)]
 
-        return top + [left + line + right for line in data] + bottom
+        return top + [_ansi_join((left, line, right)) for line in data] + bottom
 
     def get_min_height(self):
         """
@@ -693,8 +748,14 @@ class EvCell(object):
         Returns:
             natural_height (int): Height of cell.
 
+        Notes:
+            This is measured from the wrapped data without formatting
+            the cell.
+
         """
-        return len(self.formatted) #if self.formatted else 0
+        nlines = len(self._fit_width(self.data))
+        return (self.border_top + self.pad_top + max(self.height, nlines) +
+                self.pad_bottom + self.border_bottom)
 
     def get_width(self):
         """
@@ -703,8 +764,26 @@ class EvCell(object):
         Returns:
             natural_width (int): Width of cell.
 
-        """
-        return m_len(self.formatted[0]) #if self.formatted else 0
+        Notes:
+            This is measured without formatting the cell. Like the
+            formatted cell, it is the width of its first line, which
+            may be the top border.
+
+        """
+        width = self.width + self.pad_left + self.pad_right
+        if self.border_top:
+            # corners are only added next to an actual side border
+            has_left = self.border_left > 0 and bool(self.border_left_char)
+            has_right = self.border_right > 0 and bool(self.border_right_char)
+            cwidth = width + max(0, self.border_left - 1) + max(0, self.border_right - 1)
+            return (m_len(self.corner_top_left_char) * has_left +
+                    max(0, cwidth) * m_len(self.border_top_char) +
+                    m_len(self.corner_top_right_char) * has_right)
+        if not self.pad_top:
+            # a data line, these are padded to at least the cell width
+            width = max(0, self.width) + self.pad_left + self.pad_right
+        return (m_len(self.border_left_char) * self.border_left + max(0, width) +
+                m_len(self.border_right_char) * self.border_right)
 
     def replace_data(self, data, **kwargs):
         """
@@ -719,7 +798,7 @@ class EvCell(object):
 
         """
         #self.data = self._split_lines(unicode(data))
-        self.data = self._split_lines(_to_ansi(data))
+        self.data = self._split_lines(_to_text(data))
         self.raw_width = max(m_len(line) for line in self.data)
         self.raw_height = len(self.data)
         self.reformat(**kwargs)
@@ -797,8 +876,9 @@ class EvCell(object):
             if self.height <= 0 and self.raw_height > 0:
                 raise Exception("Cell height too small, no room for data.")
 
-        # reformat (to new sizes, padding, header and borders)
-        self.formatted = self._reformat()
+        # the cell is formatted (to new sizes, padding, header and
+        # borders) the next time it's fetched
+        self.formatted = None
 
     def get(self):
         """
@@ -864,7 +944,6 @@ class EvColumn(object):
         kwargs.update(self.options)
         # use fixed width or adjust to the largest cell
         if not "width" in kwargs:
-            [cell.reformat() for cell in col] # this is necessary to get initial widths of all cells
             kwargs["width"] = max(cell.get_width() for cell in col) if col else 0
         [cell.reformat(**kwargs) for cell in col]
 
@@ -1013,7 +1092,7 @@ class EvTable(object):
         table = kwargs.pop("table", [])
 
         # header is a list of texts. We merge it to the table's top
-        header = [_to_ansi(head) for head in args]
+        header = [_to_text(head) for head in args]
         self.header = header != []
         if self.header:
             if table:
@@ -1023,7 +1102,7 @@ class EvTable(object):
                     table.extend([] for i in range(excess))
                 elif excess < 0:
                     # too short header
-                    header.extend(_to_ansi(["" for i in range(abs(excess))]))
+                    header.extend(["" for i in range(abs(excess))])
                 for ix, heading in enumerate(header):
                     table[ix].insert(0, heading)
             else:
@@ -1204,8 +1283,15 @@ class EvTable(object):
 
         # we make all modifications on a working copy of the
         # actual table. This allows us to add columns/rows
-        # and re-balance over and over without issue.
-        self.worktable = deepcopy(self.table)
+        # and re-balance over and over without issue. Cells only
+        # ever get new attributes assigned, so shallow copies of
+        # them are enough.
+        self.worktable = []
+        for col in self.table:
+            workcol = copy(col)
+            workcol.options = copy(col.options)
+            workcol.column = [copy(cell) for cell in col.column]
+            self.worktable.append(workcol)
         options = copy(self.options)
 
         # balance number of rows to make a rectangular table
@@ -1269,7 +1355,8 @@ class EvTable(object):
                 msg = "ix=%s, width=%s: %s" % (ix, cwidths[ix], e.message)
                 raise #Exception ("Error in horizontal allign:\n %s" % msg)
 
-        # equalize heights for each row (we must do this here, since it may have changed to fit new widths)
+        # equalize heights for each row (we must do this here, since it may have changed to fit new widths).
+        # This wraps the cells but does not format them; that is left for when the lines are generated.
         cheights = [max(cell.get_height() for cell in (col[iy] for col in self.worktable)) for iy in range(nrowmax)]
 
         if self.height:
@@ -1323,17 +1410,33 @@ class EvTable(object):
     def _generate_lines(self):
         """
         Generates lines across all columns
-        (each cell may contain multiple lines)
-        This will also balance the table.
+        (each cell may contain multiple lines). The
+        table must already be balanced.
         """
-        self._balance()
         for iy in range(self.nrows):
             cell_row = [col[iy] for col in self.worktable]
             # this produces a list of lists, each of equal length
             cell_data = [cell.get() for cell in cell_row]
             cell_height = min(len(lines) for lines in cell_data)
             for iline in range(cell_height):
-                yield ANSIString("").join(_to_ansi(celldata[iline] for celldata in cell_data))
+                yield _ansi_join(celldata[iline] for celldata in cell_data)
+
+    def iterlines(self):
+        """
+        Balance the table and iterate over its lines.
+
+        Returns:
+            lines (iterator): The lines of the table, in order.
+
+        Notes:
+            The size of the table is measured right away, so its total
+            height is available as `self.cheight`. Each row is however
+            only formatted once its lines are reached. This allows for
+            paging a very large table without rendering it all.
+
+        """
+        self._balance()
+        return self._generate_lines()
 
     def add_header(self, *args, **kwargs):
         """
@@ -1516,14 +1619,14 @@ class EvTable(object):
             table_lines (list): The lines of the table, in order.
 
         """
-        return [line for line in self._generate_lines()]
+        return list(self.iterlines())
 
     def __str__(self):
         "print table (this also balances it)"
-        return  str(unicode(ANSIString("\n").join([line for line in self._generate_lines()])))
+        return  str(unicode(ANSIString("\n").join(self.iterlines())))
 
     def __unicode__(self):
-        return  unicode(ANSIString("\n").join([line for line in self._generate_lines()]))
+        return  unicode(ANSIString("\n").join(self.iterlines()))
 
 def _test():
     "Test"
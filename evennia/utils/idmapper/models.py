@@ -16,7 +16,8 @@ from twisted.internet.reactor import callFromThread
 from django.core.exceptions import ObjectDoesNotExist, FieldError
 from django.db.models.signals import post_save
 from django.db.models.base import Model, ModelBase
-from django.db.models.signals import pre_delete, post_migrate
+from django.apps import apps
+from django.db.models.signals import pre_delete, post_migrate, m2m_changed
 from evennia.utils import logger
 from evennia.utils.utils import dbref, get_evennia_pids, to_str
 
@@ -219,13 +220,17 @@ class SharedMemoryModel(with_metaclass(SharedMemoryModelBase, Model)):
 
         """
         result = None
-        # Quick hack for my composites work for now.
-        if hasattr(cls._meta, 'pks'):
-            pk = cls._meta.pks[0]
-        else:
-            pk = cls._meta.pk
-        # get the index of the pk in the class fields. this should be calculated *once*, but isn't atm
-        pk_position = cls._meta.fields.index(pk)
+        try:
+            pk, pk_position = cls.__dict__["_idmapper_pk"]
+        except KeyError:
+            # Quick hack for my composites work for now.
+            if hasattr(cls._meta, 'pks'):
+                pk = cls._meta.pks[0]
+            else:
+                pk = cls._meta.pk
+            # get the index of the pk in the class fields, once per class
+            pk_position = cls._meta.fields.index(pk)
+            cls._idmapper_pk = (pk, pk_position)
         if len(args) > pk_position:
             # if it's in the args, we can get it easily by index
             result = args[pk_position]
@@ -363,7 +368,7 @@ class SharedMemoryModel(with_metaclass(SharedMemoryModelBase, Model)):
         """
         global _MONITOR_HANDLER
         if not _MONITOR_HANDLER:
-            from evennia.scripts.monitorhandler import MONITOR_HANDLER as _MONITORHANDLER
+            from evennia.scripts.monitorhandler import MONITOR_HANDLER as _MONITOR_HANDLER
 
         if _IS_SUBPROCESS:
             # we keep a store of objects modified in subprocesses so
@@ -394,7 +399,7 @@ class SharedMemoryModel(with_metaclass(SharedMemoryModelBase, Model)):
         for field in update_fields:
             fieldname = field.name
             # trigger eventual monitors
-            _MONITORHANDLER.at_update(self, fieldname)
+            _MONITOR_HANDLER.at_update(self, fieldname)
             # if a hook is defined it must be named exactly on this form
             hookname = "at_%s_postsave" % fieldname
             if hasattr(self, hookname) and callable(_GA(self, hookname)):
@@ -406,6 +411,27 @@ class SharedMemoryModel(with_metaclass(SharedMemoryModelBase, Model)):
 #            if hasattr(self, fieldtracker):
 #                _GA(self, fieldtracker)(fieldname)
 
+    def at_reconcile(self, old_values):
+        """
+        Called by `reconcile_cached_instances` after this instance was
+        updated with changes saved to the database by another process.
+        This triggers the same monitors and field hooks as a save.
+
+        Args:
+            old_values (dict): The previous values of the changed
+                fields, `{fieldname: value}`. The values of foreign
+                keys are the ids.
+
+        """
+        global _MONITOR_HANDLER
+        if not _MONITOR_HANDLER:
+            from evennia.scripts.monitorhandler import MONITOR_HANDLER as _MONITOR_HANDLER
+        for fieldname in old_values:
+            _MONITOR_HANDLER.at_update(self, fieldname)
+            hookname = "at_%s_postsave" % fieldname
+            if hasattr(self, hookname) and callable(_GA(self, hookname)):
+                _GA(self, hookname)(False)
+
 
 class WeakSharedMemoryModelBase(SharedMemoryModelBase):
     """
@@ -448,13 +474,68 @@ def flush_cache(**kwargs):
                 yield cls
 
     for cls in class_hierarchy([SharedMemoryModel]):
-        cls.flush_instance_cache()
+        cls.flush_instance_cache(force=kwargs.get("force", False))
     # run the python garbage collector
     return gc.collect()
 #request_finished.connect(flush_cache)
 post_migrate.connect(flush_cache)
 
 
+def reconcile_cached_instances(modified):
+    """
+    Update cached instances with changes saved to the database by
+    another process, such as a `run_async` worker process. Instances
+    are updated in place, so all references to them stay valid.
+
+    Args:
+        modified (iterable): The changed objects, as tuples
+            `(model label, pk)`, like `("objects.ObjectDB", 4)`.
+
+    """
+    pks_by_model = {}
+    for label, pk in modified:
+        pks_by_model.setdefault(label, set()).add(pk)
+    for label, pks in pks_by_model.items():
+        model = apps.get_model(label)
+        cached = dict((pk, model.get_cached_instance(pk)) for pk in pks)
+        cached = dict((pk, instance) for pk, instance in cached.items() if instance)
+        if not cached:
+            continue
+        fields = model._meta.concrete_fields
+        # one query per model
+        rows = model.objects.filter(pk__in=list(cached)).values_list(
+            *[field.attname for field in fields])
+        for row in rows:
+            instance = cached.pop(row[fields.index(model._meta.pk)])
+            old_values = {}
+            for field, value in zip(fields, row):
+                old_value = getattr(instance, field.attname)
+                if old_value != value:
+                    old_values[field.name] = old_value
+                    setattr(instance, field.attname, value)
+                    if field.is_relation:
+                        # drop the cached related object
+                        instance.__dict__.pop(field.get_cache_name(), None)
+            instance.at_reconcile(old_values)
+        for instance in cached.values():
+            # deleted by the other process
+            instance.flush_from_cache(force=True)
+
+
+def track_m2m_changes(sender, instance, action, **kwargs):
+    """
+    Signal handler that marks objects whose Attributes or Tags were
+    added or removed in a subprocess as modified, like `save` does for
+    field changes.
+
+    """
+    if _IS_SUBPROCESS and action.startswith("post_") and isinstance(instance, SharedMemoryModel):
+        global PROC_MODIFIED_COUNT, PROC_MODIFIED_OBJS
+        PROC_MODIFIED_COUNT += 1
+        PROC_MODIFIED_OBJS[PROC_MODIFIED_COUNT] = instance
+m2m_changed.connect(track_m2m_changes)
+
+
 def flush_cached_instance(sender, instance, **kwargs):
     """
     Flush the idmapper cache only for a given instance.
@@ -43,6 +43,11 @@ Sessionobject for the object seeing the string. This may be `None` if
 the string is sent to a non-puppetable object. The inlinefunc should
 never raise an exception.
 
+An inlinefunc whose result only depends on its arguments (and not on
+the session) can be marked by setting `funcname.pure = True` after
+defining it. Its results are then cached per set of arguments, and
+strings only using such functions are only ever parsed once.
+
 There are two reserved function names:
 - "nomatch": This is called if the user uses a functionname that is
     not registered. The nomatch function will get the name of the
@@ -156,6 +161,9 @@ def clr(*args, **kwargs):
         text += "|n"
     return text
 
+# these only depend on their arguments, so their results can be cached
+pad.pure = crop.pure = clr.pure = True
+
 
 # we specify a default nomatch function to use if no matching func was
 # found. This will be overloaded by any nomatch function defined in
@@ -202,8 +210,14 @@ _RE_TOKEN = re.compile(r"""
                         re.UNICODE + re.IGNORECASE + re.VERBOSE + re.DOTALL)
 
 
-# Cache for function lookups.
+# Cache of compiled strings, as (stack, pure). Strings without
+# complete inlinefuncs are stored as None.
 _PARSING_CACHE = utils.LimitedSizeOrderedDict(size_limit=1000)
+# Cache of the output of strings giving the same result every time,
+# keyed on (string, strip).
+_RESULT_CACHE = utils.LimitedSizeOrderedDict(size_limit=1000)
+# Cache of the results of pure inlinefuncs, keyed on (func, args).
+_PURE_CACHE = utils.LimitedSizeOrderedDict(size_limit=1000)
 
 class ParseStack(list):
     """
@@ -247,6 +261,17 @@ class ParseStack(list):
 class InlinefuncError(RuntimeError):
     pass
 
+def _is_pure(item):
+    """
+    Check if a parsed stack item only calls pure inlinefuncs, so it
+    gives the same result every time.
+
+    """
+    if isinstance(item, tuple):
+        func, arglist = item
+        return getattr(func, "pure", False) and all(_is_pure(arg) for arg in arglist)
+    return True
+
 def parse_inlinefunc(string, strip=False, **kwargs):
     """
     Parse the incoming string.
@@ -263,16 +288,24 @@ def parse_inlinefunc(string, strip=False, **kwargs):
 
     """
     global _PARSING_CACHE
+    if "$" not in string:
+        # no inlinefunc can start without this, return immediately.
+        return string
     if string in _PARSING_CACHE:
         # stack is already cached
-        stack = _PARSING_CACHE[string]
+        cached = _PARSING_CACHE[string]
+        if cached is None:
+            return string
+        stack, pure = cached
     else:
         # not a cached string.
         if not _RE_STARTTOKEN.search(string):
             # if there are no unescaped start tokens at all, return immediately.
+            _PARSING_CACHE[string] = None
             return string
 
-        # build a new cache entry
+        # build a new cache entry. Function calls are kept also when
+        # stripping, since the cached stack is used for both cases.
         stack = ParseStack()
         ncallable = 0
         for match in _RE_TOKEN.finditer(string):
@@ -289,8 +322,7 @@ def parse_inlinefunc(string, strip=False, **kwargs):
                 while stack:
                     operation = stack.pop()
                     if callable(operation):
-                        if not strip:
-                            stack.append((operation, [arg for arg in reversed(args)]))
+                        stack.append((operation, [arg for arg in reversed(args)]))
                         ncallable -= 1
                         break
                     else:
@@ -323,14 +355,16 @@ def parse_inlinefunc(string, strip=False, **kwargs):
 
         if ncallable > 0:
             # this means not all inlinefuncs were complete
+            _PARSING_CACHE[string] = None
             return string
 
         if _STACK_MAXSIZE > 0 and _STACK_MAXSIZE < len(stack):
             # if stack is larger than limit, throw away parsing
-            return string + gdict["stackfull"](*args, **kwargs)
+            return string + _INLINE_FUNCS["stackfull"](**kwargs)
         else:
             # cache the result
-            _PARSING_CACHE[string] = stack
+            pure = all(_is_pure(item) for item in stack)
+            _PARSING_CACHE[string] = (stack, pure)
 
     # run the stack recursively
     def _run_stack(item, depth=0):
@@ -348,13 +382,27 @@ def parse_inlinefunc(string, strip=False, **kwargs):
                     else:
                         # all other args should merge into one string
                         args[-1] += _run_stack(arg, depth=depth+1)
-                # execute the inlinefunc at this point or strip it.
+                # execute the inlinefunc at this point
                 kwargs["inlinefunc_stack_depth"] = depth
-                retval = "" if strip else func(*args, **kwargs)
+                if getattr(func, "pure", False):
+                    key = (func, tuple(args))
+                    if key in _PURE_CACHE:
+                        retval = _PURE_CACHE[key]
+                    else:
+                        retval = _PURE_CACHE[key] = func(*args, **kwargs)
+                else:
+                    retval = func(*args, **kwargs)
         return utils.to_str(retval, force_string=True)
 
+    if strip or pure:
+        # the result is the same every time
+        key = (string, strip)
+        if key not in _RESULT_CACHE:
+            _RESULT_CACHE[key] = "".join(_run_stack(item) for item in stack)
+        return _RESULT_CACHE[key]
+
     # execute the stack from the cache
-    return "".join(_run_stack(item) for item in _PARSING_CACHE[string])
+    return "".join(_run_stack(item) for item in stack)
 
 # Nick templating
 #
@@ -24,8 +24,8 @@ class ANSIStringTestCase(TestCase):
         """
         Verifies the indexes in an ANSIString match what they should.
         """
-        self.assertEqual(ansi._char_indexes, char)
-        self.assertEqual(ansi._code_indexes, code)
+        self.assertEqual(list(ansi._char_indexes), char)
+        self.assertEqual(list(ansi._code_indexes), code)
 
     def test_instance(self):
         """
@@ -152,6 +152,46 @@ class ANSIStringTestCase(TestCase):
         ]
         self.table_check(c, char_table, code_table)
 
+    def test_padding(self):
+        """
+        Verify padding keeps the clean string and indexes in sync.
+        """
+        a = ANSIString("{rab{n")
+        for padded in (a.ljust(5), a.rjust(5), a.center(6, "-")):
+            self.assertEqual(len(padded.clean()), len(padded))
+            self.assertEqual(len(padded.clean()), len(padded._char_indexes))
+        self.assertEqual(u"ab   ", a.ljust(5).clean())
+        self.assertEqual([9, 10, 24, 25], list((a * 2)._char_indexes))
+        # indexes are only calculated when needed
+        self.assertEqual(None, (a + a.ljust(5))._indexes)
+
+
+from evennia.utils import ansi
+
+class TestANSIParser(TestCase):
+    def setUp(self):
+        self.parser = ansi.ANSIParser()
+
+    def test_parse_ansi(self):
+        string = "{rred|[505bg{{r||r\\{123\033[4mu|lclook|ltLook|le"
+        parse = self.parser.parse_ansi
+        self.assertEqual(
+            "\033[1m\033[31mred\033[45mbg{r|r\\\033[1m\033[34m\033[4muLook",
+            parse(string))
+        self.assertEqual(
+            "\033[1m\033[31mred\033[48;5;201mbg{r|r\\\033[38;5;67m\033[4mu"
+            "|lclook|ltLook|le", parse(string, xterm256=True, mxp=True))
+        self.assertEqual("redbg{r|r\\uLook", parse(string, strip_ansi=True))
+        self.assertEqual("{/|/ ", parse("{{/|/ ", strip_ansi=True).replace("\r\n", "|/"))
+        # bright backgrounds, unless escaped
+        self.assertEqual("\033[48;5;196m{[r|[r", parse("{[r{{[r||[r", xterm256=True))
+
+    def test_token_cache(self):
+        tokens = self.parser.tokenize("{rHello {bWorld{n")
+        self.assertEqual(["", "Hello ", "World", ""], tokens[::2])
+        self.assertTrue(tokens is self.parser.tokenize("{rHello {bWorld{n"))
+        self.assertEqual("Hello World", self.parser.render(tokens, strip_ansi=True))
+
 
 class TestIsIter(TestCase):
     def test_is_iter(self):
@@ -310,6 +350,41 @@ class TestTextToHTMLparser(TestCase):
         self.assertEqual(self.parser.convert_urls('</span>http://example.com/<span class="red">'),
             '</span><a href="http://example.com/" target="_blank">http://example.com/</a><span class="red">')
 
+    def test_parse_plain(self):
+        self.assertEqual(self.parser.parse('a <b>  & c\nd'),
+            'a &lt;b&gt;&nbsp;&nbsp;&amp; c<br>d')
+
+    def test_parse_colors(self):
+        self.assertEqual(self.parser.parse('|rred|n |Rdark|n |500xterm |[bon blue|n x'),
+            '<span class="color-009">red</span> <span class="color-001">dark</span> '
+            '<span class="color-196">xterm </span><span class="color-196 bgcolor-021">on blue</span> x')
+
+    def test_parse_styles(self):
+        self.assertEqual(self.parser.parse('|hbold|n |uunder |rred|n |^blink|*inv|n'),
+            '<strong>bold</strong> <span class="underline">under </span>'
+            '<span class="color-009 underline">red</span> <span class="blink">blink</span>'
+            '<span class="blink inverse">inv</span>')
+
+    def test_parse_escapes_and_links(self):
+        self.assertEqual(self.parser.parse('{{r |lclook|lt|rLook|n|le'),
+            '{r <a id=\'mxplink\' href=\'#\' onclick=\'Evennia.msg("text",["look"],{}); return false;\'>'
+            '<span class="color-009">Look</span></a>')
+
+    def test_parse_strip_ansi(self):
+        self.assertEqual(self.parser.parse('|rred|n and|_ |uunder|n', strip_ansi=True),
+            'red and&nbsp;&nbsp;under')
+
+    def test_parse_ansistring(self):
+        from .ansi import ANSIString
+        self.assertEqual(self.parser.parse(ANSIString('|gx||r|n')),
+            '<span class="color-010">x|r</span>')
+
+    def test_parse_cache(self):
+        text = '|rcached|n text'
+        result = self.parser.parse(text)
+        self.assertIs(self.parser.parse(text), result)
+        self.assertEqual(self.parser.parse(text, strip_ansi=True), 'cached text')
+
 
 from evennia.utils import inlinefuncs
 
@@ -345,6 +420,30 @@ class TestInlineFuncs(TestCase):
             'this should be $pad("""escaped,""" and """instead,""" cropped $crop(with a long,5) text., 80)'),
             "this should be                    escaped, and instead, cropped with  text.                    ")
 
+    def test_strip(self):
+        string = "this is $pad(stripped, 20) text."
+        self.assertEqual(inlinefuncs.parse_inlinefunc(string, strip=True), "this is  text.")
+        self.assertEqual(inlinefuncs.parse_inlinefunc(string),
+            "this is       stripped       text.")
+
+    def test_pure_cache(self):
+        from mock import patch
+        calls = []
+        def impure(*args, **kwargs):
+            calls.append(args)
+            return "result"
+        with patch.dict(inlinefuncs._INLINE_FUNCS, {"impure": impure}):
+            string = "a $impure($pad(x, 3)) b"
+            self.assertEqual(inlinefuncs.parse_inlinefunc(string), "a result b")
+            self.assertEqual(inlinefuncs.parse_inlinefunc(string), "a result b")
+            self.assertEqual([(" x ",), (" x ",)], calls)
+        self.assertTrue((inlinefuncs.pad, ("x", " 3")) in inlinefuncs._PURE_CACHE)
+
+    def test_cached_nofunc(self):
+        string = "no $func(ending"
+        self.assertEqual(inlinefuncs.parse_inlinefunc(string), string)
+        self.assertEqual(inlinefuncs._PARSING_CACHE[string], None)
+
 from evennia.utils import evform
 
 class TestEvForm(TestCase):
@@ -356,3 +455,99 @@ class TestEvForm(TestCase):
         # note that in a msg() call, the result would be the  correct |-----,
         # in a print, ansi only gets called once, so ||----- is the result
         self.assertEqual(unicode(evform.EvForm(form={"FORM":"\n||-----"})), "||-----")
+
+from evennia.utils import evtable
+
+class TestEvTable(TestCase):
+    def test_table(self):
+        table = evtable.EvTable("Heading1", "Heading2",
+                        table=[[1, 2], [3, 4]], border="cells", align="c")
+        table.add_row("This is a single row")
+        self.assertEqual(ANSIString(unicode(table)).clean(), "\n".join([
+            "+----------------------+----------+",
+            "|       Heading1       | Heading2 |",
+            "+~~~~~~~~~~~~~~~~~~~~~~+~~~~~~~~~~+",
+            "|           1          |     3    |",
+            "+----------------------+----------+",
+            "|           2          |     4    |",
+            "+----------------------+----------+",
+            "| This is a single row |          |",
+            "+----------------------+----------+"]))
+
+    def test_plain_and_ansi_cells(self):
+        table = evtable.EvTable("|rred|n", "plain", table=[["a"], ["bb"]], border=None)
+        lines = table.get()
+        self.assertTrue(all(isinstance(line, ANSIString) for line in lines))
+        self.assertEqual([line.clean() for line in lines],
+                         [" red  plain ", " a    bb    "])
+        self.assertTrue("\x1b[1m\x1b[31mred" in lines[0].raw())
+
+    def test_iterlines(self):
+        table = evtable.EvTable("Name", table=[["row %i" % i for i in range(10)]], border="header")
+        lines = table.iterlines()
+        self.assertEqual(table.cheight, 12)
+        # rows are only formatted as their lines are reached
+        self.assertEqual(next(lines).clean(), " Name  ")
+        self.assertEqual(table.worktable[0][5].formatted, None)
+        self.assertEqual(list(lines)[-1].clean(), " row 9 ")
+        self.assertEqual(table.get(), list(table.iterlines()))
+
+from mock import patch
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from evennia.utils import dbserialize
+from evennia.utils.test_resources import EvenniaTest
+
+class TestDeferredSave(EvenniaTest):
+    @patch("twisted.internet.reactor.callFromThread")
+    @patch("evennia.utils.dbserialize._DEFERRED_SAVE", True)
+    def test_deferred_save(self, mock_call):
+        self.obj1.db.inv = []
+        attr = self.obj1.attributes.get("inv", return_obj=True)
+        with CaptureQueriesContext(connection) as queries:
+            for i in range(10):
+                self.obj1.db.inv.append(i)
+        self.assertEqual(0, len(queries))
+        self.assertEqual(1, mock_call.call_count)
+        self.assertEqual(list(range(10)), list(self.obj1.db.inv))
+        self.assertEqual(1, dbserialize.flush_deferred_saves())
+        self.assertEqual(None, attr._pending_value)
+        self.assertEqual(list(range(10)), list(attr.__class__.objects.get(id=attr.id).value))
+        self.assertEqual(0, dbserialize.flush_deferred_saves())
+
+    @patch("twisted.internet.reactor.callFromThread")
+    @patch("evennia.utils.dbserialize._DEFERRED_SAVE", True)
+    def test_deleted_before_flush(self, mock_call):
+        self.obj1.db.inv = {}
+        self.obj1.db.inv["a"] = 1
+        self.obj1.attributes.remove("inv")
+        self.assertEqual(0, dbserialize.flush_deferred_saves())
+
+from evennia.typeclasses import attributes
+
+class TestAttributeValueCache(EvenniaTest):
+    @patch("evennia.typeclasses.attributes._ATTRIBUTE_VALUE_CACHE", True)
+    def test_value_cache(self):
+        self.obj1.db.test = [1, 2, 3]
+        attr = self.obj1.attributes.get("test", return_obj=True)
+        hits = attributes.value_cache_stats()["hits"]
+        value = attr.value
+        self.assertTrue(attr.value is value)
+        self.assertEqual(hits + 1, attributes.value_cache_stats()["hits"])
+        # nested updates go through the setter
+        value.append(4)
+        self.assertEqual([1, 2, 3, 4], list(attr.value))
+        self.assertFalse(attr.value is value)
+        # direct changes to db_value are caught
+        attr.db_value = 5
+        self.assertEqual(5, attr.value)
+
+    @patch("evennia.typeclasses.attributes._ATTRIBUTE_VALUE_CACHE", True)
+    def test_dbobj_deleted(self):
+        self.obj1.db.test = [self.obj2]
+        attr = self.obj1.attributes.get("test", return_obj=True)
+        self.assertEqual([self.obj2], list(attr.value))
+        invalidations = attributes.value_cache_stats()["invalidations"]
+        self.obj2.delete()
+        self.assertEqual(invalidations + 1, attributes.value_cache_stats()["invalidations"])
+        self.assertEqual([None], list(attr.value))
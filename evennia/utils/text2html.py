@@ -14,17 +14,39 @@ from builtins import object
 import re
 import cgi
 from .ansi import *
+from .ansi import _RENDER_XTERM256, _RENDER_STRIP
 
+# max number of converted texts to cache
+_CACHE_SIZE = 1000
 
-# All xterm256 RGB equivalents
+# indexes into the render state
+_FG, _BG, _HILITE, _UNDERLINE, _BLINK, _INVERSE = range(6)
+_DEFAULT_STATE = (None, None, False, False, False, False)
 
-XTERM256_FG = "\033[38;5;%sm"
-XTERM256_BG = "\033[48;5;%sm"
+# the state change caused by each ansi SGR parameter. The xterm256
+# colors (38;5;N and 48;5;N) are handled separately.
+_SGR_CHANGES = {0: None,
+                1: (_HILITE, True), 22: (_HILITE, False),
+                4: (_UNDERLINE, True), 24: (_UNDERLINE, False),
+                5: (_BLINK, True), 25: (_BLINK, False),
+                7: (_INVERSE, True), 27: (_INVERSE, False),
+                39: (_FG, None), 49: (_BG, None)}
+_SGR_CHANGES.update(dict((30 + i, (_FG, i)) for i in range(8)))
+_SGR_CHANGES.update(dict((40 + i, (_BG, i)) for i in range(8)))
 
 
 class TextToHTMLparser(object):
     """
     This class describes a parser for converting from ANSI to html.
+
+    The text is split into plain text and ANSI sequences with the same
+    (cached) tokenizer used for telnet output and then converted in
+    one pass, tracking the color and style state set by the
+    sequences. Each run of text with the same state is wrapped in a
+    single `<span>` with css classes `color-NNN`, `bgcolor-NNN`,
+    `underline`, `blink` and `inverse`. Hilite brightens the 8 basic
+    colors and becomes `<strong>` otherwise.
+
     """
 
     tabstop = 4
@@ -35,144 +57,152 @@ class TextToHTMLparser(object):
     underline = ANSI_UNDERLINE
     blink = ANSI_BLINK
     inverse = ANSI_INVERSE   # this will produce an outline; no obvious css equivalent?
-    colorcodes = [
-            ('color-000', unhilite + ANSI_BLACK), # pure black
-            ('color-001', unhilite + ANSI_RED),
-            ('color-002', unhilite + ANSI_GREEN),
-            ('color-003', unhilite + ANSI_YELLOW),
-            ('color-004', unhilite + ANSI_BLUE),
-            ('color-005', unhilite + ANSI_MAGENTA),
-            ('color-006', unhilite + ANSI_CYAN),
-            ('color-007', unhilite + ANSI_WHITE), # light grey
-            ('color-008', hilite + ANSI_BLACK), # dark grey
-            ('color-009', hilite + ANSI_RED),
-            ('color-010', hilite + ANSI_GREEN),
-            ('color-011', hilite + ANSI_YELLOW),
-            ('color-012', hilite + ANSI_BLUE),
-            ('color-013', hilite + ANSI_MAGENTA),
-            ('color-014', hilite + ANSI_CYAN),
-            ('color-015', hilite + ANSI_WHITE)  # pure white
-        ] + [("color-%03i" % (i+16), XTERM256_FG % ("%i" % (i+16))) for i in xrange(240)]
-
-    colorback = [
-            ('bgcolor-000', ANSI_BACK_BLACK), # pure black
-            ('bgcolor-001', ANSI_BACK_RED),
-            ('bgcolor-002', ANSI_BACK_GREEN),
-            ('bgcolor-003', ANSI_BACK_YELLOW),
-            ('bgcolor-004', ANSI_BACK_BLUE),
-            ('bgcolor-005', ANSI_BACK_MAGENTA),
-            ('bgcolor-006', ANSI_BACK_CYAN),
-            ('bgcolor-007', ANSI_BACK_WHITE), # light grey
-            ('bgcolor-008', hilite + ANSI_BACK_BLACK), # dark grey
-            ('bgcolor-009', hilite + ANSI_BACK_RED),
-            ('bgcolor-010', hilite + ANSI_BACK_GREEN),
-            ('bgcolor-011', hilite + ANSI_BACK_YELLOW),
-            ('bgcolor-012', hilite + ANSI_BACK_BLUE),
-            ('bgcolor-013', hilite + ANSI_BACK_MAGENTA),
-            ('bgcolor-014', hilite + ANSI_BACK_CYAN),
-            ('bgcolor-015', hilite + ANSI_BACK_WHITE),  # pure white
-    ] + [("bgcolor-%03i" % (i+16), XTERM256_BG % ("%i" % (i+16))) for i in range(240)]
-
-    # make sure to escape [
-    #colorcodes = [(c, code.replace("[", r"\[")) for c, code in colorcodes]
-    #colorback = [(c, code.replace("[", r"\[")) for c, code in colorback]
-    fg_colormap = dict((code, clr) for clr, code in colorcodes)
-    bg_colormap = dict((code, clr) for clr, code in colorback)
-
-    # create stop markers
-    fgstop =  "(?:\033\[1m|\033\[22m)*\033\[3[0-8].*?m|\033\[0m|$"
-    bgstop =  "(?:\033\[1m|\033\[22m)*\033\[4[0-8].*?m|\033\[0m|$"
-
-    # extract color markers, tagging the start marker and the text marked
-    re_fgs = re.compile("((?:\033\[1m|\033\[22m)*\033\[3[0-8].*?m)(.*?)(?=" + fgstop + ")")
-    re_bgs = re.compile("((?:\033\[1m|\033\[22m)*\033\[4[0-8].*?m)(.*?)(?=" + bgstop + ")")
-
-    re_normal = re.compile(normal.replace("[", r"\["))
-    re_hilite = re.compile("(?:%s)(.*)(?=%s|%s)" % (hilite.replace("[", r"\["), fgstop, bgstop))
-    re_unhilite = re.compile("(?:%s)(.*)(?=%s|%s)" % (unhilite.replace("[", r"\["), fgstop, bgstop))
-    re_uline = re.compile("(?:%s)(.*?)(?=%s|%s)" % (underline.replace("[", r"\["), fgstop, bgstop))
-    re_blink = re.compile("(?:%s)(.*?)(?=%s|%s)" % (blink.replace("[", r"\["), fgstop, bgstop))
-    re_inverse = re.compile("(?:%s)(.*?)(?=%s|%s)" % (inverse.replace("[", r"\["), fgstop, bgstop))
+
+    re_ansi = re.compile(r"(%s)" % ANSI_PARSER.ansi_re)
+    re_sgr = re.compile(r"\033\[([0-9;]*)m")
     re_string = re.compile(r'(?P<htmlchars>[<&>])|(?P<space> [ \t]+)|(?P<lineend>\r\n|\r|\n)', re.S|re.M|re.I)
     re_url = re.compile(r'((?:ftp|www|https?)\W+(?:(?!\.(?:\s|$)|&\w+;)[^"\',;$*^\\(){}<>\[\]\s])+)(\.(?:\s|$)|&\w+;|)')
     re_mxplink =  re.compile(r'\|lc(.*?)\|lt(.*?)\|le', re.DOTALL)
 
-    def _sub_fg(self, colormatch):
-        code, text = colormatch.groups()
-        return r'''<span class="%s">%s</span>''' % (self.fg_colormap.get(code, "err"), text)
+    def __init__(self):
+        self._changes = {}
+        self._tags = {}
+        self._cache = utils.LimitedSizeOrderedDict(size_limit=_CACHE_SIZE)
 
-    def _sub_bg(self, colormatch):
-        code, text = colormatch.groups()
-        return r'''<span class="%s">%s</span>''' % (self.bg_colormap.get(code, "err"), text)
-
-    def re_color(self, text):
+    def tokenize(self, text, strip_ansi=False):
         """
-        Replace ansi colors with html color class names.  Let the
-        client choose how it will display colors, if it wishes to.
+        Split text into plain text and raw ANSI sequences.
 
         Args:
-            text (str): the string with color to replace.
+            text (str or ANSIString): Text to split.
+            strip_ansi (bool, optional): Remove all ANSI sequences.
 
         Returns:
-            text (str): Re-colored text.
+            tokens (list): Plain text is found at the even indexes
+                of the list and the ANSI sequences between them at the
+                odd ones.
 
         """
-        text = self.re_fgs.sub(self._sub_fg, text)
-        text = self.re_bgs.sub(self._sub_bg, text)
-        text = self.re_normal.sub("", text)
-        return text
-
-    def re_bold(self, text):
+        if hasattr(text, "_raw_string"):
+            # an ANSIString is already parsed
+            if strip_ansi:
+                return [text.clean()]
+            return self.re_ansi.split(text.raw())
+
+        tokens = []
+        parts = []
+        for itoken, token in enumerate(ANSI_PARSER.tokenize(text)):
+            if not itoken % 2:
+                parts.append(token)
+            elif token[_RENDER_STRIP] or strip_ansi:
+                # escapes and formatting like |/ are plain text
+                parts.append(token[_RENDER_STRIP])
+            else:
+                tokens.extend(("".join(parts), token[_RENDER_XTERM256]))
+                parts = []
+        tokens.append("".join(parts))
+        return tokens
+
+    def get_changes(self, code):
         """
-        Clean out superfluous hilights rather than set <strong>to make
-        it match the look of telnet.
+        Get the state changes caused by ANSI sequences. This is
+        cached per unique sequence.
 
         Args:
-            text (str): Text to process.
+            code (str): One or more raw ANSI SGR sequences.
 
         Returns:
-            text (str): Processed text.
+            changes (list): A list of `(index, value)` to apply to the
+                render state, in order. `None` resets the state.
 
         """
-        text = self.re_hilite.sub(r'<strong>\1</strong>', text)
-        return self.re_unhilite.sub(r'\1', text) # strip unhilite - there is no equivalent in css.
-
-    def re_underline(self, text):
+        changes = self._changes.get(code)
+        if changes is None:
+            changes = []
+            for sequence in self.re_sgr.findall(code):
+                params = [int(param) if param else 0 for param in sequence.split(";")]
+                iparam = 0
+                while iparam < len(params):
+                    param = params[iparam]
+                    if param in (38, 48) and params[iparam + 1:iparam + 2] == [5]:
+                        # xterm256 color
+                        if iparam + 2 < len(params):
+                            changes.append((_FG if param == 38 else _BG, params[iparam + 2]))
+                        iparam += 3
+                        continue
+                    if param in _SGR_CHANGES:
+                        changes.append(_SGR_CHANGES[param])
+                    iparam += 1
+            self._changes[code] = changes
+        return changes
+
+    def get_tags(self, state):
         """
-        Replace ansi underline with html underline class name.
+        Get the html tags to wrap text having a given render state
+        with. This is cached per unique state.
 
         Args:
-            text (str): Text to process.
+            state (tuple): The render state `(fg, bg, hilite,
+                underline, blink, inverse)`.
 
         Returns:
-            text (str): Processed text.
+            tags (tuple): The `(opening, closing)` tags.
 
         """
-        return self.re_uline.sub(r'<span class="underline">\1</span>', text)
-
-    def re_blinking(self, text):
+        tags = self._tags.get(state)
+        if tags is None:
+            fg, bg, hilite, underline, blink, inverse = state
+            classes = []
+            if fg is not None:
+                classes.append("color-%03i" % (fg + 8 if hilite and fg < 8 else fg))
+            if bg is not None:
+                classes.append("bgcolor-%03i" % bg)
+            classes.extend(name for name, active in (("underline", underline), ("blink", blink),
+                                                     ("inverse", inverse)) if active)
+            opening = '<span class="%s">' % " ".join(classes) if classes else ""
+            closing = "</span>" if classes else ""
+            if hilite and (fg is None or fg >= 8):
+                opening, closing = opening + "<strong>", "</strong>" + closing
+            tags = self._tags[state] = (opening, closing)
+        return tags
+
+    def render(self, tokens):
         """
-        Replace ansi blink with custom blink css class
+        Convert tokens to html in one pass.
 
         Args:
-            text (str): Text to process.
+            tokens (list): Tokens from `tokenize`.
 
         Returns:
-            text (str): Processed text.
-        """
-        return self.re_blink.sub(r'<span class="blink">\1</span>', text)
-
-    def re_inversing(self, text):
-        """
-        Replace ansi inverse with custom inverse css class
-
-        Args:
-            text (str): Text to process.
+            text (str): The html, with the plain text escaped.
 
-        Returns:
-            text (str): Processed text.
         """
-        return self.re_inverse.sub(r'<span class="inverse">\1</span>', text)
+        output = []
+        run = []
+        state = list(_DEFAULT_STATE)
+        tags = ("", "")
+        changed = False
+        for itoken, token in enumerate(tokens):
+            if itoken % 2:
+                for change in self.get_changes(token):
+                    if change is None:
+                        state[:] = _DEFAULT_STATE
+                    else:
+                        state[change[0]] = change[1]
+                changed = True
+            elif token:
+                if changed:
+                    changed = False
+                    new_tags = self.get_tags(tuple(state))
+                    if new_tags != tags:
+                        if run:
+                            output.append(tags[0] + self.re_string.sub(self.do_sub, "".join(run)) + tags[1])
+                            run = []
+                        tags = new_tags
+                run.append(token)
+        if run:
+            output.append(tags[0] + self.re_string.sub(self.do_sub, "".join(run)) + tags[1])
+        return "".join(output)
 
     def remove_bells(self, text):
         """
@@ -198,6 +228,8 @@ class TextToHTMLparser(object):
             text (str): Processed text.
 
         """
+        if "\010" not in text and "\033[K" not in text:
+            return text
         backspace_or_eol = r'(.\010)|(\033\[K)'
         n = 1
         while n > 0:
@@ -243,6 +275,8 @@ class TextToHTMLparser(object):
             text (str): Processed text.
 
         """
+        if "|lc" not in text:
+            return text
         return self.re_mxplink.sub(r"""<a id='mxplink' href='#' onclick='Evennia.msg("text",["\1"],{}); return false;'>\2</a>""", text)
 
     def do_sub(self, match):
@@ -281,23 +315,23 @@ class TextToHTMLparser(object):
         Returns:
             text (str): Parsed text.
         """
-        # parse everything to ansi first
-        text = parse_ansi(text, strip_ansi=strip_ansi, xterm256=True, mxp=True)
-        # convert all ansi to html
-        result = re.sub(self.re_string, self.do_sub, text)
-        result = self.re_color(result)
-        result = self.re_bold(result)
-        result = self.re_underline(result)
-        result = self.re_blinking(result)
-        result = self.re_inversing(result)
+        if not text:
+            return ''
+        # an ANSIString compares equal to its clean string, so
+        # it can't share the cache with normal strings
+        cachekey = None if hasattr(text, "_raw_string") else (text, strip_ansi)
+        if cachekey is not None and cachekey in self._cache:
+            return self._cache[cachekey]
+
+        result = self.render(self.tokenize(text, strip_ansi=strip_ansi))
         result = self.remove_bells(result)
         result = self.convert_linebreaks(result)
         result = self.remove_backspaces(result)
         result = self.convert_urls(result)
         result = self.convert_links(result)
-        # clean out eventual ansi that was missed
-        #result = parse_ansi(result, strip_ansi=True)
 
+        if cachekey is not None:
+            self._cache[cachekey] = result
         return result
 
 HTML_PARSER = TextToHTMLparser()
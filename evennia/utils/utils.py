@@ -18,6 +18,7 @@ import math
 import re
 import textwrap
 import random
+from traceback import format_exc
 from os.path import join as osjoin
 from importlib import import_module
 from inspect import ismodule, trace, getmembers, getmodule
@@ -939,8 +940,138 @@ def clean_object_caches(obj):
 
 
 _PPOOL = None
-_PCMD = None
-_PROC_ERR = "A process has ended with a probable error condition: process ended by signal 9."
+_PPOOL_SIZE = settings.ASYNC_PROCESS_POOL_SIZE
+# database connections inherited by a worker process, kept
+# referenced so they are never closed from the worker
+_INHERITED_CONNECTIONS = []
+
+
+def _init_process_worker():
+    """
+    Set up a worker process of the `run_async` process pool. It is
+    forked from the Server, so it must not use the Server's database
+    connections; they are left alone and new ones are opened on
+    first use. The signal handlers of the Server's reactor are also
+    removed, or the worker would ignore being terminated.
+
+    """
+    import signal
+    from django.db import connections
+    from evennia.utils import dbserialize
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.set_wakeup_fd(-1)
+    from evennia.utils.idmapper import models as idmapper
+    for conn in connections.all():
+        _INHERITED_CONNECTIONS.append(conn.connection)
+        conn.connection = None
+    idmapper._IS_SUBPROCESS = True
+    # deferred Attribute saves pending in the Server are its own to
+    # make; the worker flushes its own after every call
+    dbserialize._DIRTY_ROOTS.clear()
+    dbserialize._FLUSH_SCHEDULED = False
+
+
+def _run_in_process(payload):
+    """
+    Run a pickled call in a worker process.
+
+    Args:
+        payload (str): The pickled `(callable, args, kwargs)`.
+
+    Returns:
+        result (str): The pickled `(success, result, modified)`,
+            where `result` is the return value or, on error, a tuple
+            `(exception, traceback)` and `modified` lists
+            `(model label, pk)` for every database object changed
+            by the call.
+
+    """
+    from evennia.utils.idmapper import models as idmapper
+    from evennia.utils.dbserialize import to_pickle, from_pickle, flush_deferred_saves
+    # don't work on objects cached by an earlier call; they may
+    # have changed since
+    idmapper.flush_cache(force=True)
+    idmapper.PROC_MODIFIED_OBJS.clear()
+    try:
+        func, args, kwargs = pickle.loads(payload)
+        try:
+            ret = func(*from_pickle(args), **from_pickle(kwargs))
+        finally:
+            # the worker runs no reactor to save deferred Attribute
+            # changes, so they must be saved before they are reported
+            flush_deferred_saves()
+        result = (True, to_pickle(ret))
+    except Exception as err:
+        result = (False, (err, format_exc()))
+    modified = set((obj.__dbclass__._meta.label, obj.pk) for obj in idmapper.PROC_MODIFIED_OBJS.values())
+    idmapper.PROC_MODIFIED_OBJS.clear()
+    try:
+        return pickle.dumps(result + (modified,), pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return pickle.dumps((False, (None, format_exc()), modified), pickle.HIGHEST_PROTOCOL)
+
+
+def _get_process_pool():
+    """
+    Get the process pool of `run_async`, starting it on first use.
+
+    """
+    global _PPOOL
+    if not _PPOOL:
+        import multiprocessing
+        _PPOOL = multiprocessing.Pool(processes=_PPOOL_SIZE or None,
+                                      initializer=_init_process_worker)
+        reactor.addSystemEventTrigger("before", "shutdown", _PPOOL.terminate)
+    return _PPOOL
+
+
+def _at_process_return(deferred, data):
+    """
+    Called in the main thread with the outcome of a call run in a
+    worker process.
+
+    """
+    from evennia.utils.idmapper.models import reconcile_cached_instances
+    from evennia.utils.dbserialize import from_pickle
+    success, result, modified = pickle.loads(data)
+    if modified:
+        # update our cached copies of what the worker changed
+        try:
+            reconcile_cached_instances(modified)
+        except Exception:
+            logger.log_trace("Could not update objects changed in a worker process.")
+    if success:
+        deferred.callback(from_pickle(result))
+    else:
+        err, tb = result
+        if not isinstance(err, Exception):
+            err = RuntimeError(tb)
+        err.remote_traceback = tb
+        deferred.errback(err)
+
+
+def _defer_to_process(to_execute, *args, **kwargs):
+    """
+    Run a callable in the process pool.
+
+    Returns:
+        deferred (Deferred): Fires with the return value.
+
+    """
+    from evennia.utils.dbserialize import to_pickle
+    try:
+        payload = pickle.dumps((to_execute, to_pickle(args), to_pickle(kwargs)),
+                               pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return defer.fail()
+    deferred = defer.Deferred()
+    _get_process_pool().apply_async(
+        _run_in_process, (payload,),
+        callback=lambda data: reactor.callFromThread(_at_process_return, deferred, data))
+    return deferred
+
+
 def run_async(to_execute, *args, **kwargs):
     """
     Runs a function or executes a code snippet asynchronously.
@@ -948,8 +1079,8 @@ def run_async(to_execute, *args, **kwargs):
     Args:
         to_execute (callable): If this is a callable, it will be
             executed with *args and non-reserved *kwargs as arguments.
-            The callable will be executed using ProcPool, or in a thread
-            if ProcPool is not available.
+            The callable will be executed in a thread, or in a worker
+            process if `use_process` is set.
 
     Kwargs:
         at_return (callable): Should point to a callable with one
@@ -961,11 +1092,15 @@ def run_async(to_execute, *args, **kwargs):
             if there is an error in to_execute.
         at_err_kwargs (dict): This dictionary will be used as keyword
             arguments to the at_err errback.
+        use_process (bool): Run `to_execute` in a separate process
+            rather than in a thread. This is meant for CPU-heavy code,
+            which won't block the Server and can use several cores.
+            See Notes.
 
     Notes:
         All other `*args` and `**kwargs` will be passed on to
         `to_execute`. Run_async will relay executed code to a thread
-        or procpool.
+        or process.
 
         Use this function with restrain and only for features/commands
         that you know has no influence on the cause-and-effect order of your
@@ -979,6 +1114,15 @@ def run_async(to_execute, *args, **kwargs):
         your `to_execute` under sqlite3 you will probably run very slow or even get
         tracebacks.
 
+        With `use_process`, `to_execute` (which must be defined at the
+        top level of a module), its arguments and its return value are
+        pickled to be passed between processes. Database objects are
+        passed by reference and reloaded in the worker, which sees the
+        database as it is, not any unsaved changes. The worker
+        processes are started on first use, `settings.ASYNC_PROCESS_POOL_SIZE`
+        of them. Database objects saved by the worker are updated in
+        the Server's cache before `at_return` is called.
+
     """
 
     # handle special reserved input kwargs
@@ -986,13 +1130,15 @@ def run_async(to_execute, *args, **kwargs):
     errback = kwargs.pop("at_err", None)
     callback_kwargs = kwargs.pop("at_return_kwargs", {})
     errback_kwargs = kwargs.pop("at_err_kwargs", {})
+    use_process = kwargs.pop("use_process", False)
 
-    if callable(to_execute):
-        # no process pool available, fall back to old deferToThread mechanism.
-        deferred = threads.deferToThread(to_execute, *args, **kwargs)
-    else:
+    if not callable(to_execute):
         # no appropriate input for this server setup
         raise RuntimeError("'%s' could not be handled by run_async" % to_execute)
+    elif use_process:
+        deferred = _defer_to_process(to_execute, *args, **kwargs)
+    else:
+        deferred = threads.deferToThread(to_execute, *args, **kwargs)
 
     # attach callbacks
     if callback:
@@ -1664,9 +1810,9 @@ def m_len(target):
         length (int): The length of `target`, ignoring MXP components.
 
     """
-    # Would create circular import if in module root.
-    from evennia.utils.ansi import ANSI_PARSER
-    if inherits_from(target, basestring):
+    if isinstance(target, basestring) and "|lc" in target:
+        # Would create circular import if in module root.
+        from evennia.utils.ansi import ANSI_PARSER
         return len(ANSI_PARSER.strip_mxp(target))
     return len(target)
 